@@ -0,0 +1,460 @@
+# api.py
+"""
+ASGI API for the loan conversation, next to the Streamlit UI (app.py).
+
+    pip install -r requirements-api.txt  # the app plus an ASGI server
+    uvicorn api:app --port 8000          # or: python -m api --port 8000
+
+REST (JSON):
+    POST   /sessions                    start -> {"session_id", "state", "messages", ...}
+    POST   /sessions/{id}/messages      {"text": "..."} -> {"session_id", "state", "messages", "letter", ...}
+    GET    /sessions/{id}               state and the last API_HISTORY_PAGE history entries
+    GET    /sessions/{id}/letter        the sanction letter PDF
+    DELETE /sessions/{id}
+    GET    /healthz                     liveness and live session count
+    GET    /metrics                     Prometheus text (core.metrics)
+
+WebSocket:
+    /sessions/ws (new session) or /sessions/{id}/ws (resume)
+    server: {"type": "session", ...} on connect, {"type": "reply", ...} per message
+    client: {"text": "..."}
+
+The conversation is the same ConversationEngine the UI runs. Its turns
+are synchronous (LLM, KYC, PDF), so they run on a bounded thread pool
+(API_WORKERS) while the event loop only does I/O, and the messages of one
+session are handled one at a time. Live sessions stay in memory
+(API_MAX_SESSIONS, dropped after API_SESSION_TTL idle seconds) in front
+of the SESSION_BACKEND store, from which an evicted session, or one
+started by another API process, is loaded back.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from core import state as STATES
+from core.engine import ConversationEngine
+from core.jsonlog import get_logger
+from core.metrics import API_REQUESTS, API_SECONDS, render
+from core.pdf_generator import letter_filename
+from core.session_store import SessionBackend, backend_from_env
+from core.state import Session
+from services.kyc import verifier_from_env
+from services.llm_sales_agent import llm_sales_prefetch
+from services.prefetch import PromptPrefetcher
+
+API_WORKERS = int(os.getenv("API_WORKERS", "32"))
+MAX_SESSIONS = int(os.getenv("API_MAX_SESSIONS", "10000"))
+SESSION_TTL = float(os.getenv("API_SESSION_TTL", "1800"))
+HISTORY_PAGE = int(os.getenv("API_HISTORY_PAGE", "50"))
+
+MAX_BODY = 16 * 1024
+MAX_TEXT = 2000
+
+log = get_logger("api")
+
+
+def build_engine() -> ConversationEngine:
+    """The API's engine: letters render inside the turn, no token streaming."""
+    return ConversationEngine(
+        prefetcher=PromptPrefetcher(llm_sales_prefetch),
+        store=backend_from_env(),
+        verifier=verifier_from_env(),
+    )
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ---------------------------------------------------------
+# LIVE SESSIONS
+# ---------------------------------------------------------
+class LiveSession:
+    __slots__ = ("session", "lock", "used", "users", "deleted")
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.lock = asyncio.Lock()  # one turn at a time per conversation
+        self.used = time.monotonic()
+        self.users = 0  # open websockets and running requests
+        self.deleted = False  # set under `lock`; turns queued behind it get a 404
+
+
+class SessionRegistry:
+    """
+    Live sessions by id, least recently used first. Sessions idle for
+    `ttl` seconds, or beyond `max_sessions`, are dropped from memory
+    only: the engine persisted every turn to `store`, and get() loads
+    them back from there. Used from the event loop thread only.
+    """
+
+    def __init__(self, store: Optional[SessionBackend], max_sessions: int = MAX_SESSIONS, ttl: float = SESSION_TTL):
+        self.store = store
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._live = OrderedDict()
+        self.loaded = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def add(self, session: Session) -> LiveSession:
+        live = self._live[session.session_id] = LiveSession(session)
+        self._evict()
+        return live
+
+    async def get(self, session_id: str, run) -> Optional[LiveSession]:
+        live = self._live.get(session_id)
+        if live is None:
+            if self.store is None:
+                return None
+            session = await run(self.store.load, session_id)
+            if session is None:
+                return None
+            # another request may have loaded it while we waited
+            live = self._live.get(session_id) or self.add(session)
+            self.loaded += 1
+
+        live.used = time.monotonic()
+        self._live.move_to_end(session_id)
+        self._evict()
+        return live
+
+    def peek(self, session_id: str) -> Optional[LiveSession]:
+        """The live session, if loaded; never reads the store."""
+        return self._live.get(session_id)
+
+    def drop(self, session_id: str):
+        self._live.pop(session_id, None)
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.ttl
+        for _ in range(len(self._live)):
+            session_id, live = next(iter(self._live.items()))
+            if len(self._live) <= self.max_sessions and live.used > cutoff:
+                return
+            if live.users or live.lock.locked():
+                self._live.move_to_end(session_id)
+                continue
+            del self._live[session_id]
+            self.evicted += 1
+
+
+# ---------------------------------------------------------
+# ASGI APP
+# ---------------------------------------------------------
+class LoanAPI:
+    def __init__(self, engine: Optional[ConversationEngine] = None, workers: int = API_WORKERS,
+                 max_sessions: int = MAX_SESSIONS, session_ttl: float = SESSION_TTL):
+        # built on first use, so importing this module has no side effects
+        self.engine = engine
+        self.workers = workers
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.sessions = None
+        self._executor = None
+
+    def _ready(self):
+        if self.sessions is None:
+            if self.engine is None:
+                self.engine = build_engine()
+            self.sessions = SessionRegistry(self.engine.store, self.max_sessions, self.session_ttl)
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="api")
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        self._ready()
+        if scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._ready()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        if self.engine is not None:
+            if self.engine.store is not None:
+                self.engine.store.close()
+            if self.engine.verifier is not None:
+                self.engine.verifier.close()
+
+    # --------- Conversation ---------
+
+    def _view(self, session: Session, messages: list) -> dict:
+        state = session.get_state()
+        return {
+            "session_id": session.session_id,
+            "state": state,
+            "messages": messages,
+            "letter": f"/sessions/{session.session_id}/letter" if session.get_data("letter_id") else None,
+            "done": state == STATES.END,
+        }
+
+    def _start_sync(self) -> tuple:
+        session = Session()
+        self.engine.greet(session)
+        return session, self._view(session, self.engine.flush(session))
+
+    def _reply_sync(self, session: Session, text: str) -> dict:
+        return self._view(session, self.engine.handle_message(session, text))
+
+    async def _start(self):
+        session, view = await self._run(self._start_sync)
+        return self.sessions.add(session), view
+
+    async def _turn(self, live: LiveSession, text: str) -> dict:
+        live.users += 1
+        try:
+            async with live.lock:
+                if live.deleted:
+                    raise HTTPError(404, "unknown session")
+                return await self._run(self._reply_sync, live.session, text)
+        finally:
+            live.users -= 1
+            live.used = time.monotonic()
+
+    async def _live(self, session_id: str) -> LiveSession:
+        live = await self.sessions.get(session_id, self._run)
+        if live is None:
+            raise HTTPError(404, "unknown session")
+        return live
+
+    # --------- HTTP ---------
+
+    async def _http(self, scope, receive, send):
+        start = time.perf_counter()
+        method = scope["method"]
+        route, status = "unmatched", 500
+        try:
+            route, handler, args = self._route(method, scope["path"])
+            body = await _read_body(receive)
+            status, content_type, payload, headers = await handler(body, *args)
+        except HTTPError as e:
+            status, content_type, payload, headers = e.status, "application/json", {"error": e.message}, []
+        except Exception as e:
+            log.error("api_error", route=route, method=method, error=f"{type(e).__name__}: {e}")
+            status, content_type, payload, headers = 500, "application/json", {"error": "internal error"}, []
+
+        if status == 204:
+            payload = b""
+        elif content_type == "application/json":
+            payload = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+            headers = [(b"content-type", content_type.encode())] + headers
+        else:
+            payload = payload.encode() if isinstance(payload, str) else payload
+            headers = [(b"content-type", content_type.encode())] + headers
+
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": headers + [(b"content-length", str(len(payload)).encode())],
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+        API_REQUESTS.inc(route=route, method=method, status=str(status))
+        API_SECONDS.observe(time.perf_counter() - start, route=route)
+
+    def _route(self, method: str, path: str):
+        parts = [p for p in path.split("/") if p]
+        routes = {
+            ("healthz",): {"GET": self._healthz},
+            ("metrics",): {"GET": self._metrics},
+            ("sessions",): {"POST": self._create},
+            ("sessions", "{id}"): {"GET": self._show, "DELETE": self._delete},
+            ("sessions", "{id}", "messages"): {"POST": self._message},
+            ("sessions", "{id}", "letter"): {"GET": self._letter},
+        }
+
+        args = ()
+        if len(parts) >= 2 and parts[0] == "sessions":
+            args = (parts[1],)
+            parts = [parts[0], "{id}"] + parts[2:]
+
+        methods = routes.get(tuple(parts))
+        if methods is None:
+            raise HTTPError(404, "not found")
+        route = "/" + "/".join(parts)
+        if method not in methods:
+            raise HTTPError(405, f"{method} not allowed on {route}")
+        return route, methods[method], args
+
+    async def _healthz(self, body):
+        return 200, "application/json", {"ok": True, "sessions": len(self.sessions)}, []
+
+    async def _metrics(self, body):
+        return 200, "text/plain; version=0.0.4", render(), []
+
+    async def _create(self, body):
+        live, view = await self._start()
+        return 201, "application/json", view, []
+
+    async def _show(self, body, session_id):
+        live = await self._live(session_id)
+        # a turn may be changing the session on a worker thread
+        async with live.lock:
+            if live.deleted:
+                raise HTTPError(404, "unknown session")
+            session = live.session
+            history = [{"sender": sender, "message": msg} for sender, msg in session.get_history().tail(HISTORY_PAGE)]
+            view = self._view(session, [])
+        view["history"] = history
+        return 200, "application/json", view, []
+
+    async def _delete(self, body, session_id):
+        store = self.engine.store
+        live = self.sessions.peek(session_id)
+        if live is None:
+            if store is not None:
+                await self._run(store.delete, session_id)
+            return 204, None, None, []
+
+        # a running turn would save the session back after the delete
+        async with live.lock:
+            live.deleted = True
+            if store is not None:
+                await self._run(store.delete, session_id)
+            self.sessions.drop(session_id)
+        return 204, None, None, []
+
+    async def _message(self, body, session_id):
+        text = _message_text(body)
+        live = await self._live(session_id)
+        return 200, "application/json", await self._turn(live, text), []
+
+    async def _letter(self, body, session_id):
+        session = (await self._live(session_id)).session
+        pdf = await self._run(self.engine.get_letter, session)
+        if not pdf:
+            raise HTTPError(404, "no sanction letter for this session")
+        disposition = f'attachment; filename="{letter_filename(session.all_data())}"'
+        return 200, "application/pdf", pdf, [(b"content-disposition", disposition.encode())]
+
+    # --------- WebSocket ---------
+
+    async def _websocket(self, scope, receive, send):
+        if (await receive())["type"] != "websocket.connect":
+            return
+
+        parts = [p for p in scope["path"].split("/") if p]
+        if parts == ["sessions", "ws"]:
+            live, view = await self._start()
+        elif len(parts) == 3 and parts[0] == "sessions" and parts[2] == "ws":
+            live = await self.sessions.get(parts[1], self._run)
+            if live is None:
+                await send({"type": "websocket.close", "code": 4404})
+                return
+            view = self._view(live.session, [])
+        else:
+            await send({"type": "websocket.close", "code": 4404})
+            return
+
+        await send({"type": "websocket.accept"})
+        await _ws_send(send, {"type": "session", **view})
+
+        live.users += 1
+        try:
+            while True:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+
+                start = time.perf_counter()
+                try:
+                    text = _message_text(message.get("text") or message.get("bytes") or b"")
+                except HTTPError as e:
+                    await _ws_send(send, {"type": "error", "error": e.message})
+                    continue
+
+                try:
+                    reply = await self._turn(live, text)
+                except HTTPError as e:
+                    # the session was deleted while this socket was open
+                    await _ws_send(send, {"type": "error", "error": e.message})
+                    await send({"type": "websocket.close", "code": 4404})
+                    return
+                await _ws_send(send, {"type": "reply", **reply})
+                API_REQUESTS.inc(route="/sessions/{id}/ws", method="MESSAGE", status="200")
+                API_SECONDS.observe(time.perf_counter() - start, route="/sessions/{id}/ws")
+        finally:
+            live.users -= 1
+            live.used = time.monotonic()
+
+
+async def _read_body(receive) -> bytes:
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise HTTPError(400, "client disconnected")
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY:
+            raise HTTPError(413, "request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _message_text(body) -> str:
+    try:
+        text = json.loads(body)["text"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPError(400, 'expected a JSON object {"text": "..."}')
+    if not isinstance(text, str) or not text.strip():
+        raise HTTPError(400, "text must be a non-empty string")
+    if len(text) > MAX_TEXT:
+        raise HTTPError(413, f"text longer than {MAX_TEXT} characters")
+    return text
+
+
+async def _ws_send(send, payload: dict):
+    await send({"type": "websocket.send", "text": json.dumps(payload, separators=(",", ":"), ensure_ascii=False)})
+
+
+app = LoanAPI()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the loan conversation API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("serving the API needs an ASGI server: pip install -r requirements-api.txt")
+
+    # one process: live sessions and their locks are per process
+    uvicorn.run("api:app", host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,19 @@
+import atexit
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import streamlit as st
-import re
 
 from core.state import SessionState
 from core import state as STATES
-from core.agents import (
-    handle_master,
-    handle_sales,
-    handle_initial_underwriting,
-    handle_negotiation,
-    handle_verification,
-    handle_final_underwriting,
-    handle_sanction,
-)
-from core.pdf_generator import generate_sanction_letter
-
-# NEW NLP PARSERS
-from services.nlp_parsers import parse_loan_amount, parse_monthly_income
-
-# LLM SALES AGENT
-from services.llm_sales_agent import llm_sales_response
+from core.engine import ConversationEngine
+from core.metrics import RERUN_SECONDS, RERUNS, RERUNS_PER_TURN, start_exporter_from_env
+from core.pdf_generator import letter_filename
+from core.session_store import backend_from_env
+from services.llm_sales_agent import llm_sales_prefetch, llm_sales_stream
+from services.prefetch import PromptPrefetcher
+from services.kyc import verifier_from_env
 
 
 # ---------------------------------------------------------
@@ -27,46 +22,68 @@ from services.llm_sales_agent import llm_sales_response
 st.set_page_config(page_title="AI Loan Chatbot", page_icon="💬")
 st.title("💬 Personal Loan AI Prototype")
 
-SessionState.init()
-
-
-# ---------------------------------------------------------
-# UTILITY: Apply agent output
-# ---------------------------------------------------------
-def apply_agent_result(result: dict):
-    if not result:
-        return
-
-    for k, v in (result.get("store") or {}).items():
-        SessionState.set_data(k, v)
-
-    if result.get("next_state") is not None:
-        SessionState.set_state(result["next_state"])
-
-    SessionState.set_data("pending_messages", list(result.get("pending_messages") or []))
-
-
-def get_recent_history(n=8):
-    hist = SessionState.get_history()
-    return "\n".join([f"{sender}: {msg}" for sender, msg in hist[-n:]])
-
-
-# ---------------------------------------------------------
-# 1. FLUSH PENDING MESSAGES (ONE PER RERUN)
-# ---------------------------------------------------------
-pending = SessionState.get_data("pending_messages") or []
-
-if pending:
-    next_msg = pending.pop(0)
-    SessionState.add_bot_message(next_msg)
-    SessionState.set_data("pending_messages", pending)
-
-    if pending:
-        st.rerun()
+@st.cache_resource
+def get_engine() -> ConversationEngine:
+    # One engine (prefetch and PDF worker pools) per server process
+    workers = int(os.getenv("PDF_WORKERS", "2"))
+    if os.getenv("PDF_EXECUTOR") == "process":
+        pdf_executor = ProcessPoolExecutor(max_workers=workers)
+    else:
+        pdf_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf")
+
+    store = backend_from_env()
+    if store is not None:
+        # write out the store's write-behind queue when the server stops
+        atexit.register(store.close)
+
+    return ConversationEngine(
+        prefetcher=PromptPrefetcher(llm_sales_prefetch),
+        pdf_executor=pdf_executor,
+        store=store,
+        # LLM_STREAM=1: sales prompts are shown token by token (section 5)
+        stream_llm=llm_sales_stream if os.getenv("LLM_STREAM") == "1" else None,
+        # KYC_BASE_URL: external PAN/KYC checks after the format check
+        verifier=verifier_from_env(),
+    )
+
+
+@st.cache_resource
+def start_metrics_exporter():
+    # METRICS_PORT / METRICS_FILE, once per server process
+    return start_exporter_from_env()
+
+
+engine = get_engine()
+start_metrics_exporter()
+SessionState.init(engine.store)
+session = SessionState.session()
+
+# "batch" renders every pending message in one pass, "single" keeps the
+# original one-message-per-rerun pacing.
+FLUSH_MODE = os.getenv("FLUSH_MODE", "batch")
+# Seconds between freshly flushed bot messages (batch mode only); the
+# browser paces them with a CSS fade-in, the script never waits
+TYPING_DELAY = float(os.getenv("TYPING_DELAY", "0"))
+# Messages rendered per page of chat history
+HISTORY_PAGE = int(os.getenv("HISTORY_PAGE", "50"))
+# Longest a run waits for the background letter before rerunning
+LETTER_POLL_SECONDS = float(os.getenv("LETTER_POLL_SECONDS", "0.25"))
+
+# Rerun counter: script runs overall and since the last user message
+stats = st.session_state.setdefault("rerun_stats", {"runs": 0, "turns": 0, "runs_this_turn": 0})
+stats["runs"] += 1
+stats["runs_this_turn"] += 1
+RERUNS.inc()
+run_started = time.perf_counter()
+
+
+def rerun():
+    RERUN_SECONDS.observe(time.perf_counter() - run_started)
+    st.rerun()
 
 
 # ---------------------------------------------------------
-# 2. USER INPUT
+# 1. USER INPUT (all flow logic lives in core.engine)
 # ---------------------------------------------------------
 if SessionState.get_state() == STATES.END:
     user_input = None
@@ -75,253 +92,113 @@ else:
 
 
 if user_input:
-    SessionState.add_user_message(user_input)
-    lower = user_input.strip().lower()
-    data = SessionState.all_data()
-
-    # EXIT
-    if lower in ("exit", "quit", "stop"):
-        apply_agent_result({
-            "pending_messages": ["Session ended. Type 'start' to restart."],
-            "next_state": STATES.END
-        })
-        st.rerun()
-
-    # RESET
-    if lower == "start":
-        SessionState.reset()
-        SessionState.init()
-        SessionState.add_bot_message("Restarted! Type 'loan' to begin.")
-        st.rerun()
-
-    state = SessionState.get_state()
-
-    # -----------------------------------------------------
-    # MASTER
-    # -----------------------------------------------------
-    if state == STATES.MASTER:
-        result = handle_master(user_input)
-
-
-    # -----------------------------------------------------
-    # UNDERWRITING INITIAL
-    # -----------------------------------------------------
-    elif state == STATES.UNDERWRITING_INITIAL:
-        result = handle_initial_underwriting(data)
-
-
-    # -----------------------------------------------------
-    # SALES NEGOTIATION
-    # -----------------------------------------------------
-    elif state == STATES.SALES_NEGOTIATION:
-        result = handle_negotiation(user_input, data)
-
-
-    # -----------------------------------------------------
-    # VERIFICATION
-    # -----------------------------------------------------
-    elif state == STATES.VERIFICATION:
-        result = handle_verification(user_input)
-
-
-    # -----------------------------------------------------
-    # UNDERWRITING FINAL (auto-run below)
-    # -----------------------------------------------------
-    elif state == STATES.UNDERWRITING_FINAL:
-        result = {"pending_messages": [], "next_state": STATES.UNDERWRITING_FINAL}
-
-
-    # -----------------------------------------------------
-    # SANCTION (auto-run below)
-    # -----------------------------------------------------
-    elif state == STATES.SANCTION:
-        result = handle_sanction(data)
-
-
-    # -----------------------------------------------------
-    # END STATE
-    # -----------------------------------------------------
-    elif state == STATES.END:
-        result = {"pending_messages": ["Session closed. Type 'start' to restart."], "next_state": STATES.END}
-
-
-    # -----------------------------------------------------
-    # POST-SANCTION QUESTION
-    # -----------------------------------------------------
-    elif state == STATES.POST_SANCTION_QUERY:
-        choice = lower
-
-        if choice in ("yes", "y"):
-            result = {
-                "pending_messages": ["Sure — what else can I help you with?"],
-                "next_state": STATES.POST_SANCTION_HELP
-            }
-        elif choice in ("no", "n"):
-            result = {
-                "pending_messages": ["Alright! Thank you for using the Loan Assistant."],
-                "next_state": STATES.END
-            }
-        else:
-            result = {
-                "pending_messages": ["Please reply 'yes' or 'no'."],
-                "next_state": STATES.POST_SANCTION_QUERY
-            }
-
-
-    # -----------------------------------------------------
-    # SALES REQUIREMENTS (NAME → LOAN → INCOME)
-    # -----------------------------------------------------
-    elif state == STATES.SALES_REQUIREMENTS:
+    if stats["turns"]:
+        RERUNS_PER_TURN.observe(stats["runs_this_turn"] - 1)
+    stats["turns"] += 1
+    stats["runs_this_turn"] = 1
+    engine.process(session, user_input)
 
-        data = SessionState.all_data()
+    # chat input must disappear at END, which needs a fresh run
+    if FLUSH_MODE != "batch" or SessionState.get_state() == STATES.END:
+        rerun()
 
-        # STEP 1 — NAME
-        if data.get("name") is None:
-            # store name
-            result = handle_sales(user_input)
-            apply_agent_result(result)
 
-            # ask LLM for next missing field: loan_amount
-            history = get_recent_history()
-            llm_msg = llm_sales_response(history, "loan_amount")
-
-            apply_agent_result({
-                "pending_messages": [llm_msg],
-                "next_state": STATES.SALES_REQUIREMENTS
-            })
-            st.rerun()
-
-
-        # STEP 2 — LOAN AMOUNT
-        elif data.get("requested_amount") is None:
-
-            ok, amt = parse_loan_amount(user_input)
-
-            if ok and amt > 0:
-
-                # store loan amount first!
-                apply_agent_result({
-                    "store": {"requested_amount": amt},
-                    "pending_messages": [],
-                    "next_state": STATES.SALES_REQUIREMENTS
-                })
-
-                # now LLM asks for income (if available)
-                history = get_recent_history()
-                llm_msg = llm_sales_response(history, "monthly_income")
-
-                apply_agent_result({
-                    "pending_messages": [llm_msg] if llm_msg else ["What is your monthly income?"]
-                })
-                st.rerun()
-
-            else:
-                apply_agent_result({
-                    "pending_messages": ["Enter a valid loan amount."],
-                    "next_state": STATES.SALES_REQUIREMENTS
-                })
-                st.rerun()
-
-
-
-        # STEP 3 — MONTHLY INCOME
-        elif data.get("income") is None:
-
-            ok, inc = parse_monthly_income(user_input)
-
-            if ok and inc > 0:
-                full = SessionState.all_data().copy()
-                full["income"] = inc
-
-                # run underwriting immediately
-                result = handle_initial_underwriting(full)
-
-                # ensure income saved
-                if "store" not in result:
-                    result["store"] = {}
-                result["store"]["income"] = inc
-
-                # ❌ DO NOT CALL LLM HERE — it corrupts flow
-                # underwriting → negotiation should happen without extra prompts
-
-            else:
-                # invalid income → LLM can help here
-                history = get_recent_history()
-                llm_msg = llm_sales_response(history, "monthly_income")
-
-                result = {
-                    "pending_messages": [
-                        "Enter a valid monthly income.",
-                        llm_msg if llm_msg else "Please re-enter your monthly income."
-                    ],
-                    "next_state": STATES.SALES_REQUIREMENTS
-                }
+# ---------------------------------------------------------
+# 2. GREETING ON EMPTY CHAT
+# ---------------------------------------------------------
+if engine.greet(session) and FLUSH_MODE != "batch":
+    rerun()
 
 
+# ---------------------------------------------------------
+# 3. FLUSH PENDING MESSAGES
+# ---------------------------------------------------------
+fresh = []
 
-        else:
-            result = handle_initial_underwriting(SessionState.all_data())
+if FLUSH_MODE == "batch":
+    fresh = engine.flush(session, stream=True)
 
+else:
+    pending = SessionState.get_data("pending_messages") or []
 
-    else:
-        result = {"pending_messages": ["Unexpected state."], "next_state": STATES.MASTER}
+    if pending:
+        next_msg = pending.pop(0)
+        SessionState.add_bot_message(next_msg)
+        SessionState.set_data("pending_messages", pending)
+        engine.persist(session)
 
-    apply_agent_result(result)
-    st.rerun()
+        if pending:
+            rerun()
 
 
 # ---------------------------------------------------------
-# 3. AUTO-RUN FINAL UNDERWRITING
+# 4. RENDER CHAT HISTORY (latest HISTORY_PAGE messages, more on request)
 # ---------------------------------------------------------
-if SessionState.get_state() == STATES.UNDERWRITING_FINAL and not (SessionState.get_data("pending_messages") or []):
-    result = handle_final_underwriting(SessionState.all_data())
-    apply_agent_result(result)
-    st.rerun()
+def show_earlier():
+    st.session_state.history_shown += HISTORY_PAGE
 
 
-# ---------------------------------------------------------
-# 4. AUTO-GENERATE SANCTION LETTER
-# ---------------------------------------------------------
-if SessionState.get_state() == STATES.SANCTION and not SessionState.get_data("pdf_path"):
-    try:
-        file_path = generate_sanction_letter(SessionState.all_data())
-        SessionState.set_data("pdf_path", file_path)
-        SessionState.set_state(STATES.POST_SANCTION_QUERY)
+history = SessionState.get_history()
+shown = st.session_state.setdefault("history_shown", HISTORY_PAGE)
 
-        apply_agent_result({
-            "pending_messages": ["Your sanction letter is ready. Do you need anything else? (yes/no)"]
-        })
+if len(history) > shown:
+    st.button(f"⬆ Load earlier messages ({len(history) - shown} hidden)",
+              key="load_earlier", on_click=show_earlier)
 
-    except Exception as e:
-        apply_agent_result({
-            "pending_messages": [f"Failed to generate PDF: {e}"]
-        })
+visible = history.tail(max(shown, len(fresh)))
+settled = len(visible) - len(fresh)
+paced = TYPING_DELAY > 0 and fresh
+first_index = len(history) - len(visible)
 
-    st.rerun()
+if paced:
+    # keyed containers get a .st-key-<key> class; keys use the history
+    # index, so each message is a new element and animates only once
+    keys = [f"typing_{first_index + i}" for i in range(settled, len(visible))]
+    rules = "".join(
+        f".st-key-{key} {{ animation: typing-in 0.25s ease-out {n * TYPING_DELAY:.2f}s both; }}"
+        for n, key in enumerate(keys, 1)
+    )
+    st.markdown(
+        f"<style>@keyframes typing-in {{ from {{ opacity: 0; transform: translateY(4px); }} }} {rules}</style>",
+        unsafe_allow_html=True,
+    )
+
+for i, (sender, msg) in enumerate(visible):
+    box = st.container(key=f"typing_{first_index + i}") if paced and i >= settled else st
+    box.chat_message("assistant" if sender == "bot" else "user").write(msg)
 
 
 # ---------------------------------------------------------
-# 5. GREETING ON EMPTY CHAT
+# 5. STREAM THE NEXT SALES PROMPT (LLM_STREAM=1), after the messages
+#    queued before it; the engine saves the full text into history
 # ---------------------------------------------------------
-if len(SessionState.get_history()) == 0 and not SessionState.get_data("pending_messages"):
-    SessionState.add_bot_message("Hello! I can assist you with a Personal Loan. Type 'loan' to begin.")
-    st.rerun()
+stream = None if SessionState.get_data("pending_messages") else engine.stream_reply(session)
+if stream is not None:
+    with st.chat_message("assistant"):
+        st.write_stream(stream)
 
 
 # ---------------------------------------------------------
-# 6. RENDER CHAT HISTORY
+# 6. POLL FOR THE SANCTION LETTER (rendered on a background worker);
+#    wait briefly, then rerun, so the page stays live meanwhile
 # ---------------------------------------------------------
-for sender, msg in SessionState.get_history():
-    st.chat_message("assistant" if sender == "bot" else "user").write(msg)
+if engine.letter_pending(session):
+    st.caption("⏳ Preparing your sanction letter...")
+    engine.poll_letter(session, timeout=LETTER_POLL_SECONDS)
+    rerun()
 
 
 # ---------------------------------------------------------
 # 7. ALLOW PDF DOWNLOAD
 # ---------------------------------------------------------
-pdf = SessionState.get_data("pdf_path")
+pdf = engine.get_letter(session)
 if pdf:
-    with open(pdf, "rb") as f:
-        st.download_button("📄 Download Sanction Letter", f, file_name=pdf.split("/")[-1])
+    st.download_button(
+        "📄 Download Sanction Letter",
+        pdf,
+        file_name=letter_filename(SessionState.all_data()),
+        mime="application/pdf",
+    )
 
 
 # ---------------------------------------------------------
@@ -331,5 +208,18 @@ if SessionState.get_state() == STATES.END:
     st.write("---")
     if st.button("Start New Chat"):
         SessionState.reset()
-        SessionState.init()
-        st.rerun()
+        SessionState.init(engine.store)
+        rerun()
+
+
+# ---------------------------------------------------------
+# 9. RERUN COUNTER
+# ---------------------------------------------------------
+if os.getenv("SHOW_RERUNS"):
+    st.sidebar.caption(
+        f"Reruns this turn: {stats['runs_this_turn']} · "
+        f"total runs: {stats['runs']} · turns: {stats['turns']}"
+    )
+
+
+RERUN_SECONDS.observe(time.perf_counter() - run_started)
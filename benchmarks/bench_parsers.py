@@ -0,0 +1,131 @@
+# benchmarks/bench_parsers.py
+"""
+parse_indian_number: compiled single-pass grammar vs the previous
+multiplier-dict implementation.
+
+    python -m benchmarks.bench_parsers -n 200000
+"""
+import argparse
+import re
+import sys
+import time
+
+from services.nlp_parsers import normalize, parse_indian_number, parse_many
+
+
+SAMPLES = [
+    "50000",
+    "2.5 lakh",
+    "50k",
+    "₹1,00,000",
+    "I want a loan of 2 lakhs",
+    "1 crore",
+    "2.3cr",
+    "10000rs",
+    "My salary is 35000 per month",
+    "I earn around 20k monthly",
+    "not sure yet",
+]
+
+# inputs with a known answer, checked on every run
+EXPECTED = {
+    "Rs.50000": 50_000,
+    "Rs.50,000": 50_000,
+    "INR.75000": 75_000,
+    "rs.2 lakh": 200_000,
+    "Rs. 7,50,000 please": 750_000,
+    "5 kids and 20000": 20_000,
+    "2.5 lakh": 250_000,
+    ".5 lakh": 50_000,
+    "Rs.5 lakh": 500_000,
+    "₹.5 lakh": 50_000,
+    "1 crore 20 lakh": 12_000_000,
+    "10000rs": 10_000,
+}
+
+
+def legacy_parse_indian_number(text: str):
+    """The implementation before the compiled grammar, kept for comparison."""
+    if not text:
+        return False, 0
+
+    t = normalize(text)
+
+    if t.replace(".", "").isdigit():
+        return True, int(float(t))
+
+    t = t.replace("₹", "").replace("rs", "").replace("rupees", "")
+
+    multipliers = {
+        "k": 1_000,
+        "k.": 1_000,
+        "thousand": 1_000,
+        "thousands": 1_000,
+        "lakh": 100_000,
+        "lakhs": 100_000,
+        "lac": 100_000,
+        "lacs": 100_000,
+        "lack": 100_000,
+        "cr": 10_000_000,
+        "crore": 10_000_000,
+        "crores": 10_000_000,
+    }
+
+    for word, mul in multipliers.items():
+        if word in t:
+            nums = re.findall(r"[\d\.]+", t)
+            if nums:
+                try:
+                    value = float(nums[0]) * mul
+                    return True, int(value)
+                except:
+                    pass
+
+    nums = re.findall(r"\d+", t)
+    if nums:
+        return True, int(nums[0])
+
+    return False, 0
+
+
+def bench(fn, texts) -> float:
+    start = time.perf_counter()
+    for text in texts:
+        fn(text)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", type=int, default=200_000, help="texts per case")
+    args = parser.parse_args()
+
+    texts = (SAMPLES * (args.n // len(SAMPLES) + 1))[: args.n]
+
+    legacy = bench(legacy_parse_indian_number, texts)
+    compiled = bench(parse_indian_number, texts)
+
+    start = time.perf_counter()
+    parse_many(texts)
+    batch = args.n / (time.perf_counter() - start)
+
+    print(f"{'legacy':<12}{legacy:>14,.0f} texts/s")
+    print(f"{'compiled':<12}{compiled:>14,.0f} texts/s  ({compiled / legacy:.2f}x)")
+    print(f"{'parse_many':<12}{batch:>14,.0f} texts/s  ({batch / legacy:.2f}x)")
+
+    print("\nresults that differ:")
+    for text in SAMPLES:
+        old, new = legacy_parse_indian_number(text), parse_indian_number(text)
+        if old != new:
+            print(f"  {text!r}: legacy {old[1]:,} -> {new[1]:,}")
+
+    wrong = {text: parse_indian_number(text)[1] for text, value in EXPECTED.items()
+             if parse_indian_number(text) != (True, value)}
+    for text, got in wrong.items():
+        print(f"  WRONG {text!r}: {got:,}, expected {EXPECTED[text]:,}")
+    if wrong:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
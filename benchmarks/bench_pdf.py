@@ -0,0 +1,100 @@
+# benchmarks/bench_pdf.py
+"""
+Sanction letter rendering: letters/second and allocations.
+
+Compares the original file-writing path (generate_sanction_letter), a
+full FPDF layout rendered to bytes, and the compiled template
+(render_sanction_letter).
+
+    python -m benchmarks.bench_pdf -n 500
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from core.pdf_generator import (
+    _build_letter,
+    _letter_fields,
+    _pdf_bytes,
+    generate_sanction_letter,
+    get_template,
+    render_sanction_letter,
+)
+
+
+def sample_application(i: int) -> dict:
+    return {
+        "name": f"Applicant {i}",
+        "pan": "ABCDE1234F",
+        "approved_amount": 100_000 + i,
+        "tenure": 12,
+        "emi": round((100_000 + i) / 12, 2),
+        "sanction_timestamp": "2026-01-01T00:00:00",
+    }
+
+
+def _file_path(data: dict):
+    generate_sanction_letter(data)
+
+
+def _layout_bytes(data: dict):
+    _pdf_bytes(_build_letter(_letter_fields(data)))
+
+
+CASES = {
+    "file (current)": _file_path,
+    "layout -> bytes": _layout_bytes,
+    "template -> bytes": render_sanction_letter,
+}
+
+
+def measure(fn, n: int) -> dict:
+    apps = [sample_application(i) for i in range(n)]
+
+    start = time.perf_counter()
+    for data in apps:
+        fn(data)
+    elapsed = time.perf_counter() - start
+
+    # allocations measured on a separate, smaller pass (tracemalloc is slow):
+    # peak extra memory while rendering one letter, averaged
+    sample = apps[: max(1, n // 10)]
+    peaks = []
+    tracemalloc.start()
+    for data in sample:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn(data)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    return {
+        "letters_per_sec": n / elapsed,
+        "peak_kib_per_letter": sum(peaks) / len(peaks) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", type=int, default=500, help="letters per case")
+    args = parser.parse_args()
+
+    get_template()  # compile once up front, like a warm server process
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            results = {name: measure(fn, args.n) for name, fn in CASES.items()}
+        finally:
+            os.chdir(cwd)
+
+    print(f"{'case':<20}{'letters/s':>12}{'peak KiB/letter':>18}")
+    for name, r in results.items():
+        print(f"{name:<20}{r['letters_per_sec']:>12.0f}{r['peak_kib_per_letter']:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
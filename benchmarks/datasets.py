@@ -0,0 +1,115 @@
+# benchmarks/datasets.py
+"""
+Fixed benchmark inputs.
+
+Everything here is built from literals and a seeded RNG, so every run of
+the suite (on any machine) sees exactly the same data. Bump
+DATASET_VERSION whenever the data changes; results from different
+versions are not compared.
+"""
+import random
+
+DATASET_VERSION = 1
+SEED = 20260101
+
+
+# ---------------------------------------------------------
+# PARSER TEXTS
+# ---------------------------------------------------------
+AMOUNT_TEXTS = [
+    "50000",
+    "2.5 lakh",
+    "50k",
+    "₹1,00,000",
+    "I want a loan of 2 lakhs",
+    "1 crore",
+    "2.3cr",
+    "10000rs",
+    "Rs. 7,50,000 please",
+    "around 3 lakh 50 thousand",
+    "one lakh",
+    "not sure yet",
+]
+
+INCOME_TEXTS = [
+    "35000",
+    "My salary is 35000 per month",
+    "I earn around 20k monthly",
+    "1.2 lakh",
+    "₹ 45,500 take home",
+    "60k",
+    "salary 80,000",
+    "no idea",
+]
+
+
+def parser_texts(texts, n: int):
+    """`n` texts cycling through `texts`."""
+    return (texts * (n // len(texts) + 1))[:n]
+
+
+# ---------------------------------------------------------
+# APPLICATIONS (underwriting, negotiation, letters)
+# ---------------------------------------------------------
+def applications(n: int) -> list:
+    """Session data dicts as they stand after verification."""
+    rng = random.Random(SEED)
+    apps = []
+    for i in range(n):
+        income = rng.randrange(15_000, 250_000, 500)
+        requested = rng.randrange(50_000, income * 30, 1_000)
+        hard = income * 20
+        approved = min(requested, int(hard * 0.85)) if requested > hard else requested
+        apps.append({
+            "name": f"Applicant {i}",
+            "pan": "ABCDE1234F",
+            "income": income,
+            "requested_amount": requested,
+            "hard_limit": hard,
+            "soft_limit": int(hard * 0.85),
+            "suggested_amount": int(hard * 0.85) if requested > hard else None,
+            "approved_amount": approved,
+            "tenure": rng.choice((12, 24, 36)),
+            "annual_rate": None,
+            "emi": round(approved / 12, 2),
+            "sanction_timestamp": "2026-01-01T00:00:00",
+        })
+    return apps
+
+
+NEGOTIATION_REPLIES = [
+    "yes",
+    "what if 24 months?",
+    "max I can get with emi under 10k",
+    "300000",
+    "maybe",
+]
+
+PAN_INPUTS = ["ABCDE1234F", "abcde1234f", " AbCdE 1234 f ", "ABC123", "ZZZZZ9999Z"]
+
+
+# ---------------------------------------------------------
+# SCRIPTED CONVERSATIONS (MASTER -> POST_SANCTION_QUERY)
+# ---------------------------------------------------------
+CONVERSATIONS = [
+    # eligible straight away
+    ["hi", "loan", "Asha Rao", "5 lakh", "50000", "yes", "ABCDE1234F"],
+    # over the limit, counter offer accepted
+    ["I need a loan", "Vikram Singh", "15 lakh", "my salary is 60k", "yes", "PQRST6789K"],
+    # invalid inputs on the way, tenure question in negotiation
+    ["loan", "R", "Meera Iyer", "some money", "2.5 lakh", "not sure", "40000",
+     "what if 24 months?", "yes", "bad pan", "LMNOP4321Q"],
+    # changes the amount during negotiation
+    ["loan", "Dev Patel", "8 lakh", "35000", "600000", "yes", "ABCDE1234F"],
+]
+
+STUB_PROMPTS = {
+    "name": "May I have your full name?",
+    "loan_amount": "What loan amount are you looking for?",
+    "monthly_income": "What is your monthly income (numbers only)?",
+}
+
+
+def stub_llm(history: str, missing_field: str) -> str:
+    """LLM stand-in: the canned prompt, no I/O."""
+    return STUB_PROMPTS.get(missing_field)
@@ -0,0 +1,250 @@
+# benchmarks/load_api.py
+"""
+Concurrent-session load test of the ASGI API (api.py).
+
+Drives N simulated customers at once through api.app in this process,
+over REST or WebSocket, by calling the ASGI app directly: what is
+measured is the API, the engine and the (stub) services behind it, not
+a network stack or an ASGI server. The LLM is the local Groq stand-in
+(services.groq_stub), as in benchmarks.load_app.
+
+    python -m benchmarks.load_api --sessions 100,1000,5000 --llm-latency 0.1
+    python -m benchmarks.load_api --transport ws --sessions 1000
+
+For every concurrency level it reports throughput, p50/p95/p99 latency
+of one customer turn and memory per live session, and optionally writes
+everything as JSON (--out).
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.datasets import CONVERSATIONS
+
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# ---------------------------------------------------------
+# IN-PROCESS ASGI CLIENT
+# ---------------------------------------------------------
+async def http(app, method: str, path: str, payload: dict = None) -> tuple:
+    """(status, decoded JSON or raw bytes) of one request."""
+    body = json.dumps(payload).encode() if payload is not None else b""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0), "server": ("loadtest", 80),
+    }
+    requested = asyncio.Event()
+    response = {"body": []}
+
+    async def receive():
+        if not requested.is_set():
+            requested.set()
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = dict(message["headers"])
+        else:
+            response["body"].append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    raw = b"".join(response["body"])
+    if response["headers"].get(b"content-type") == b"application/json":
+        return response["status"], json.loads(raw)
+    return response["status"], raw
+
+
+class WebSocket:
+    """One in-process WebSocket connection to the app."""
+
+    def __init__(self, app, path: str):
+        self._incoming = asyncio.Queue()
+        self._outgoing = asyncio.Queue()
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws",
+            "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+            "headers": [], "client": ("127.0.0.1", 0), "server": ("loadtest", 80), "subprotocols": [],
+        }
+        self._incoming.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.ensure_future(app(scope, self._incoming.get, self._outgoing.put))
+
+    async def receive(self) -> dict:
+        while True:
+            message = await self._outgoing.get()
+            if message["type"] == "websocket.send":
+                return json.loads(message["text"])
+            if message["type"] == "websocket.close":
+                raise ConnectionError(f"closed with code {message.get('code')}")
+
+    async def send(self, payload: dict):
+        await self._incoming.put({"type": "websocket.receive", "text": json.dumps(payload)})
+
+    async def close(self):
+        await self._incoming.put({"type": "websocket.disconnect", "code": 1000})
+        await self._task
+
+
+# ---------------------------------------------------------
+# CUSTOMERS
+# ---------------------------------------------------------
+async def customer(app, script: list, transport: str, think: float, turn_times: list) -> str:
+    """Runs one conversation; returns the final state."""
+    if transport == "ws":
+        ws = WebSocket(app, "/sessions/ws")
+        view = await ws.receive()
+        for text in script:
+            if think:
+                await asyncio.sleep(think)
+            start = time.perf_counter()
+            await ws.send({"text": text})
+            view = await ws.receive()
+            turn_times.append(time.perf_counter() - start)
+        await ws.close()
+        return view["state"]
+
+    status, view = await http(app, "POST", "/sessions")
+    session_id = view["session_id"]
+    for text in script:
+        if think:
+            await asyncio.sleep(think)
+        start = time.perf_counter()
+        status, view = await http(app, "POST", f"/sessions/{session_id}/messages", {"text": text})
+        turn_times.append(time.perf_counter() - start)
+        if status != 200:
+            raise RuntimeError(f"HTTP {status}: {view}")
+    if view["letter"]:
+        status, pdf = await http(app, "GET", view["letter"])
+        if status != 200 or not pdf.startswith(b"%PDF"):
+            raise RuntimeError(f"letter: HTTP {status}")
+    return view["state"]
+
+
+async def run_level(app, sessions: int, transport: str, ramp: float, think: float, trace_memory: bool) -> dict:
+    if trace_memory:
+        tracemalloc.start()
+    live_before = len(app.sessions)
+
+    turn_times, errors = [], []
+
+    async def one(i):
+        await asyncio.sleep(ramp * i / max(1, sessions))
+        try:
+            await customer(app, CONVERSATIONS[i % len(CONVERSATIONS)], transport, think, turn_times)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    traced = tracemalloc.get_traced_memory()[0] if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+
+    turns = sorted(turn_times)
+    live = len(app.sessions) - live_before
+    return {
+        "sessions": sessions,
+        "completed": sessions - len(errors),
+        "errors": len(errors),
+        "first_errors": errors[:3],
+        "elapsed_s": elapsed,
+        "turns": len(turns),
+        "turns_per_sec": len(turns) / elapsed,
+        "turn_p50_ms": _percentile(turns, 50) * 1000,
+        "turn_p95_ms": _percentile(turns, 95) * 1000,
+        "turn_p99_ms": _percentile(turns, 99) * 1000,
+        "live_sessions": live,
+        "traced_kib_per_session": traced / 1024 / max(1, live) if traced is not None else None,
+    }
+
+
+async def main_async(args) -> list:
+    import api
+
+    app = api.LoanAPI(workers=args.workers)
+    await http(app, "GET", "/healthz")
+
+    # one unreported customer first: imports, PDF template, client pools
+    await run_level(app, 1, args.transport, 0.0, 0.0, False)
+
+    results = []
+    print(f"{'sessions':>8}{'ok':>7}{'err':>5}{'turns/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'KiB/sess':>10}")
+    for sessions in [int(n) for n in args.sessions.split(",") if n.strip()]:
+        r = await run_level(app, sessions, args.transport, args.ramp, args.think, args.trace_memory)
+        results.append(r)
+        mem = r["traced_kib_per_session"]
+        print(f"{r['sessions']:>8}{r['completed']:>7}{r['errors']:>5}{r['turns_per_sec']:>10.1f}"
+              f"{r['turn_p50_ms']:>9.0f}{r['turn_p95_ms']:>9.0f}{r['turn_p99_ms']:>9.0f}"
+              + (f"{mem:>10.1f}" if mem is not None else f"{'-':>10}"))
+        for e in r["first_errors"]:
+            print(f"    error: {e}", file=sys.stderr)
+
+    app.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", default="100,500,1000", help="comma-separated concurrency levels")
+    parser.add_argument("--transport", default="rest", choices=("rest", "ws"))
+    parser.add_argument("--workers", type=int, default=32, help="API_WORKERS: threads running engine turns")
+    parser.add_argument("--ramp", type=float, default=1.0, help="seconds over which sessions start")
+    parser.add_argument("--think", type=float, default=0.0, help="customer think time between turns (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.1, help="stub LLM latency (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.05, help="extra stub latency, up to (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub LLM requests that fail")
+    parser.add_argument("--session-backend", default="memory", choices=("memory", "sqlite", "none"))
+    parser.add_argument("--trace-memory", action="store_true", help="tracemalloc per level (slow, more precise)")
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    from services.groq_stub import start_stub_server
+
+    server, url = start_stub_server(latency=args.llm_latency, jitter=args.llm_jitter,
+                                    error_rate=args.error_rate, seed=1)
+
+    # customers fetch their letters: keep them on disk, not just in the hot cache
+    letter_dir = tempfile.mkdtemp(prefix="load_api_letters_")
+
+    # read by the engine when the app builds it
+    os.environ.update({
+        "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "stub"),
+        "GROQ_BASE_URL": url,
+        "SESSION_BACKEND": args.session_backend,
+        "LETTER_DIR": letter_dir,
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "error"),
+    })
+    if args.session_backend == "sqlite":
+        os.environ.setdefault("SESSION_DB", os.path.join(os.getcwd(), "load_sessions.db"))
+
+    results = asyncio.run(main_async(args))
+
+    server.shutdown()
+    shutil.rmtree(letter_dir, ignore_errors=True)
+    print(f"stub LLM: {server.requests} requests, {server.errors} injected failures, "
+          f"{server.connections} connections", file=sys.stderr)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"args": vars(args), "levels": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
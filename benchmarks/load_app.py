@@ -0,0 +1,240 @@
+# benchmarks/load_app.py
+"""
+Concurrent-session load test of app.py.
+
+Drives N simulated customers at once through the real Streamlit script
+with streamlit.testing.v1.AppTest: one AppTest (one browser session) per
+customer, all sharing this process's cached engine, exactly like
+sessions on one server instance. The LLM is the local Groq stand-in
+(services.groq_stub) with configurable latency and error rate.
+
+    python -m benchmarks.load_app --sessions 10,25,50,100 --llm-latency 0.15 --error-rate 0.05
+
+For every concurrency level it reports throughput, p50/p95/p99 latency
+of one customer turn (a full script run including reruns) and memory
+per session, and optionally writes everything as JSON (--out).
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+from benchmarks.datasets import CONVERSATIONS
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _rss_kib() -> int:
+    # ru_maxrss is KiB on Linux (bytes on macOS); only deltas are reported
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def share_runtime():
+    """
+    AppTest is built for one test at a time: each run installs a fresh
+    mock Runtime as the process-wide singleton (and clears it afterwards)
+    and compiles the script into a fresh cache. Concurrent AppTests would
+    tear the runtime down under each other's scripts and compile app.py
+    in parallel. Share one runtime and one script cache instead, as the
+    real server does for all its sessions.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+
+    pinned = []
+
+    def instance(cls):
+        if not pinned and cls._instance is not None:
+            pinned.append(cls._instance)
+        if not pinned:
+            raise RuntimeError("Runtime hasn't been created!")
+        return pinned[0]
+
+    def exists(cls):
+        return bool(pinned) or cls._instance is not None
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+
+
+class Customer(threading.Thread):
+    """One browser session working through a scripted conversation."""
+
+    def __init__(self, index: int, script: list, start_at: float, think: float, timeout: float):
+        super().__init__(name=f"customer-{index}", daemon=True)
+        self.script = script
+        self.start_at = start_at
+        self.think = think
+        self.timeout = timeout
+        self.turn_times = []
+        self.errors = []
+        self.app = None
+
+    def run(self):
+        from streamlit.testing.v1 import AppTest
+
+        time.sleep(max(0.0, self.start_at - time.perf_counter()))
+        try:
+            self.app = AppTest.from_file(APP_PATH, default_timeout=self.timeout)
+            self._timed(self.app.run)
+
+            for text in self.script:
+                if self.think:
+                    time.sleep(self.think)
+                if not self.app.chat_input:
+                    break
+                self._timed(self.app.chat_input[0].set_value(text).run)
+
+            if self.app.exception:
+                self.errors.append(self.app.exception[0].message)
+        except Exception as e:
+            self.errors.append(f"{type(e).__name__}: {e}")
+
+    def _timed(self, action):
+        start = time.perf_counter()
+        action()
+        self.turn_times.append(time.perf_counter() - start)
+
+    def session_bytes(self) -> int:
+        """
+        Encoded size (core.session_store.encode) of this customer's state,
+        data and in-memory history window: what one session holds, without
+        the backend handles attached to it.
+        """
+        from core.session_store import encode
+
+        session = self.app.session_state["session"]
+        history = session.get_history()
+        return len(encode({
+            "state": session.get_state(),
+            "data": session.all_data(),
+            "history": history.tail(history.window),
+        }))
+
+
+def run_level(sessions: int, ramp: float, think: float, timeout: float, trace_memory: bool) -> dict:
+    if trace_memory:
+        tracemalloc.start()
+    traced_before = tracemalloc.get_traced_memory()[0] if trace_memory else 0
+    rss_before = _rss_kib()
+
+    start = time.perf_counter()
+    customers = [
+        Customer(i, CONVERSATIONS[i % len(CONVERSATIONS)], start + ramp * i / max(1, sessions), think, timeout)
+        for i in range(sessions)
+    ]
+    for c in customers:
+        c.start()
+    for c in customers:
+        c.join()
+    elapsed = time.perf_counter() - start
+
+    # every AppTest is still alive here, so this is memory held per session
+    traced = (tracemalloc.get_traced_memory()[0] - traced_before) if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+
+    turns = sorted(t for c in customers for t in c.turn_times)
+    errors = [e for c in customers for e in c.errors]
+    completed = sum(1 for c in customers if not c.errors)
+    session_sizes = [c.session_bytes() for c in customers if c.app is not None]
+
+    return {
+        "sessions": sessions,
+        "completed": completed,
+        "errors": len(errors),
+        "first_errors": errors[:3],
+        "elapsed_s": elapsed,
+        "turns": len(turns),
+        "turns_per_sec": len(turns) / elapsed,
+        "conversations_per_sec": completed / elapsed,
+        "turn_p50_ms": _percentile(turns, 50) * 1000,
+        "turn_p95_ms": _percentile(turns, 95) * 1000,
+        "turn_p99_ms": _percentile(turns, 99) * 1000,
+        "turn_max_ms": (turns[-1] if turns else 0) * 1000,
+        "rss_growth_kib_per_session": (_rss_kib() - rss_before) / sessions,
+        "traced_kib_per_session": traced / 1024 / sessions if traced is not None else None,
+        "session_state_bytes": sum(session_sizes) / len(session_sizes) if session_sizes else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", default="10,25,50", help="comma-separated concurrency levels")
+    parser.add_argument("--ramp", type=float, default=1.0, help="seconds over which sessions start")
+    parser.add_argument("--think", type=float, default=0.0, help="customer think time between turns (s)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-run AppTest timeout (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.1, help="stub LLM latency (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.05, help="extra stub latency, up to (s)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="stub gap between streamed tokens (s)")
+    parser.add_argument("--stream", action="store_true", help="stream sales prompts (LLM_STREAM=1)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub LLM requests that fail")
+    parser.add_argument("--flush-mode", default="batch", choices=("batch", "single"))
+    parser.add_argument("--session-backend", default="memory", choices=("memory", "sqlite", "none"))
+    parser.add_argument("--trace-memory", action="store_true", help="tracemalloc per level (slow, more precise)")
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    from services.groq_stub import start_stub_server
+
+    server, url = start_stub_server(latency=args.llm_latency, jitter=args.llm_jitter,
+                                    error_rate=args.error_rate, seed=1, token_delay=args.token_delay)
+
+    # app.py and its engine read these when first imported / first run
+    os.environ.update({
+        "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "stub"),
+        "GROQ_BASE_URL": url,
+        "FLUSH_MODE": args.flush_mode,
+        "SESSION_BACKEND": args.session_backend,
+        "LETTER_DIR": "",
+        "LLM_STREAM": "1" if args.stream else "0",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "error"),
+    })
+    if args.session_backend == "sqlite":
+        os.environ.setdefault("SESSION_DB", os.path.join(os.getcwd(), "load_sessions.db"))
+
+    share_runtime()
+    levels = [int(n) for n in args.sessions.split(",") if n.strip()]
+    results = []
+
+    # one unreported customer first: imports, engine, PDF template, script cache
+    run_level(1, 0.0, 0.0, args.timeout, False)
+
+    print(f"{'sessions':>8}{'ok':>6}{'err':>5}{'turns/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'KiB/sess':>10}{'state B':>9}")
+    for sessions in levels:
+        r = run_level(sessions, args.ramp, args.think, args.timeout, args.trace_memory)
+        results.append(r)
+        mem = r["traced_kib_per_session"] if r["traced_kib_per_session"] is not None else r["rss_growth_kib_per_session"]
+        print(f"{r['sessions']:>8}{r['completed']:>6}{r['errors']:>5}{r['turns_per_sec']:>10.1f}"
+              f"{r['turn_p50_ms']:>9.0f}{r['turn_p95_ms']:>9.0f}{r['turn_p99_ms']:>9.0f}"
+              f"{mem:>10.0f}{r['session_state_bytes']:>9.0f}")
+        for e in r["first_errors"]:
+            print(f"    error: {e}", file=sys.stderr)
+
+    server.shutdown()
+    print(f"stub LLM: {server.requests} requests, {server.errors} injected failures, "
+          f"{server.connections} connections", file=sys.stderr)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"args": vars(args), "levels": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
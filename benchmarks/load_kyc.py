@@ -0,0 +1,134 @@
+# benchmarks/load_kyc.py
+"""
+Load test of the PAN/KYC verification stage (services.kyc) against the
+local stand-in (services.kyc_stub), fully offline.
+
+    python -m benchmarks.load_kyc --concurrency 10,100,500 --requests 2000 \
+        --latency 0.05 --jitter 0.05 --slow bureau=0.1 --repeat-rate 0.3
+
+Every level uses a fresh verifier (cold cache) and `--requests`
+verifications, at most `--concurrency` in flight on one asyncio loop.
+A fraction `--repeat-rate` of them re-verify a PAN already asked for,
+which exercises the cache and the sharing of in-flight checks. Besides
+the latency of a verification it reports "serial p50": what the same
+checks would take one after another.
+"""
+import argparse
+import asyncio
+import json
+import random
+import string
+import sys
+import time
+
+from benchmarks.datasets import SEED
+
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def applicants(n: int, repeat_rate: float) -> list:
+    """(pan, name) pairs; repeats reuse an earlier applicant."""
+    rng = random.Random(SEED)
+    out = []
+    for i in range(n):
+        if out and rng.random() < repeat_rate:
+            out.append(rng.choice(out))
+            continue
+        pan = ("".join(rng.choices(string.ascii_uppercase, k=5))
+               + f"{rng.randrange(10_000):04d}" + rng.choice(string.ascii_uppercase))
+        out.append((pan, f"Applicant {i}"))
+    return out
+
+
+async def run_level(verifier, concurrency: int, requests: int, repeat_rate: float) -> dict:
+    gate = asyncio.Semaphore(concurrency)
+    wall, serial, statuses = [], [], {}
+
+    async def one(pan, name):
+        async with gate:
+            start = time.perf_counter()
+            v = await verifier.verify(pan, name)
+            wall.append(time.perf_counter() - start)
+            statuses[v.status] = statuses.get(v.status, 0) + 1
+            if not v.cached:
+                serial.append(sum(c.ms for c in v.checks.values()) / 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(pan, name) for pan, name in applicants(requests, repeat_rate)))
+    elapsed = time.perf_counter() - start
+
+    wall.sort()
+    serial.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "elapsed_s": elapsed,
+        "verifications_per_sec": requests / elapsed,
+        "p50_ms": _percentile(wall, 50) * 1000,
+        "p95_ms": _percentile(wall, 95) * 1000,
+        "p99_ms": _percentile(wall, 99) * 1000,
+        "serial_p50_ms": _percentile(serial, 50) * 1000,
+        "statuses": statuses,
+        "cache": verifier.stats(),
+    }
+
+
+async def main_async(args, url: str) -> list:
+    from services.kyc import KYCVerifier
+
+    results = []
+    for concurrency in [int(n) for n in args.concurrency.split(",") if n.strip()]:
+        verifier = KYCVerifier(url, timeout=args.timeout, timeouts={"bureau": args.bureau_timeout},
+                               pool_size=args.pool_size, queue_timeout=args.queue_timeout)
+        r = await run_level(verifier, concurrency, args.requests, args.repeat_rate)
+        await verifier.aclose()
+        results.append(r)
+
+        print(f"{r['concurrency']:>11}{r['verifications_per_sec']:>10.0f}{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}"
+              f"{r['p99_ms']:>9.0f}{r['serial_p50_ms']:>11.0f}  {r['statuses']}  "
+              f"hits={r['cache']['hits']} shared={r['cache']['shared']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", default="10,100,500", help="comma-separated in-flight limits")
+    parser.add_argument("--requests", type=int, default=2000, help="verifications per level")
+    parser.add_argument("--repeat-rate", type=float, default=0.2, help="fraction re-verifying a known PAN")
+    parser.add_argument("--timeout", type=float, default=0.8, help="per-check timeout (s)")
+    parser.add_argument("--bureau-timeout", type=float, default=1.6, help="bureau check timeout (s)")
+    parser.add_argument("--pool-size", type=int, default=100, help="max connections per verifier")
+    parser.add_argument("--queue-timeout", type=float, default=5.0, help="wait for a free connection (s)")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.05, help="extra stub latency, up to (s)")
+    parser.add_argument("--slow", action="append", help="extra latency for one service, e.g. bureau=0.1")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub requests that fail")
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    from core import jsonlog
+    from services.kyc_stub import parse_slow, start_stub_server
+
+    jsonlog.configure(level="off")
+    server, url = start_stub_server(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                    seed=1, slow=parse_slow(args.slow))
+
+    print(f"{'concurrency':>11}{'verif/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'serial p50':>11}")
+    results = asyncio.run(main_async(args, url))
+
+    server.shutdown()
+    print(f"stub: {server.requests} requests {server.by_service}, {server.errors} injected failures, "
+          f"{server.connections} connections", file=sys.stderr)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"args": vars(args), "levels": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
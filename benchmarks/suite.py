@@ -0,0 +1,337 @@
+# benchmarks/suite.py
+"""
+Benchmark suite: parsers, agent handlers, sanction letters and scripted
+end-to-end conversations, on the fixed data in benchmarks.datasets.
+
+    python -m benchmarks.suite                      # run, save JSON
+    python -m benchmarks.suite --only parsers       # cases starting with "parsers"
+    python -m benchmarks.suite --compare benchmarks/results/baseline.json
+
+Results go to benchmarks/results/<timestamp>.json (or --out). With
+--compare, every case is checked against the baseline and the exit code
+is 1 if any throughput dropped, or any memory peak grew, by more than
+--threshold (default 15%). Record the baseline on the same machine;
+throughput is not comparable across hosts.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks import datasets
+from core import agents, jsonlog
+from core.engine import ConversationEngine
+from core.letter_store import LetterStore
+from core.pdf_generator import generate_sanction_letter, get_template, render_sanction_letter
+from core.state import Session, SANCTION, POST_SANCTION_QUERY
+from services.nlp_parsers import parse_indian_number, parse_loan_amount, parse_monthly_income
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+# ---------------------------------------------------------
+# CASE REGISTRY
+# ---------------------------------------------------------
+# name -> (factory, n, unit, memory). factory(n) returns run(), which does
+# the work once and returns the number of operations, or
+# (operations, extra results) for cases that report more than throughput.
+CASES = {}
+
+
+def case(name: str, n: int, unit: str, memory: bool = False):
+    def register(factory):
+        CASES[name] = (factory, n, unit, memory)
+        return factory
+    return register
+
+
+def _calls(fn, args_list):
+    def run():
+        for args in args_list:
+            fn(*args)
+        return len(args_list)
+    return run
+
+
+# --------- Parsers ---------
+
+@case("parsers.parse_indian_number", 100_000, "texts")
+def _parse_indian_number(n):
+    return _calls(parse_indian_number, [(t,) for t in datasets.parser_texts(datasets.AMOUNT_TEXTS, n)])
+
+
+@case("parsers.parse_loan_amount", 100_000, "texts")
+def _parse_loan_amount(n):
+    return _calls(parse_loan_amount, [(t,) for t in datasets.parser_texts(datasets.AMOUNT_TEXTS, n)])
+
+
+@case("parsers.parse_monthly_income", 100_000, "texts")
+def _parse_monthly_income(n):
+    return _calls(parse_monthly_income, [(t,) for t in datasets.parser_texts(datasets.INCOME_TEXTS, n)])
+
+
+# --------- Agent handlers ---------
+
+@case("agents.handle_master", 50_000, "calls")
+def _handle_master(n):
+    texts = datasets.parser_texts(["loan", "hi", "I need a loan please", "help"], n)
+    return _calls(agents.handle_master, [(t,) for t in texts])
+
+
+@case("agents.handle_sales", 50_000, "calls")
+def _handle_sales(n):
+    texts = datasets.parser_texts(["Asha Rao", "R", "  Vikram   Singh ", "Meera Iyer"], n)
+    return _calls(agents.handle_sales, [(t,) for t in texts])
+
+
+@case("agents.handle_initial_underwriting", 50_000, "calls")
+def _handle_initial_underwriting(n):
+    return _calls(agents.handle_initial_underwriting, [(app,) for app in datasets.applications(n)])
+
+
+@case("agents.handle_negotiation", 20_000, "calls")
+def _handle_negotiation(n):
+    apps = datasets.applications(64)
+    for app in apps:
+        app.update(agents.handle_initial_underwriting(app)["store"])
+    replies = datasets.parser_texts(datasets.NEGOTIATION_REPLIES, n)
+    return _calls(agents.handle_negotiation, [(r, apps[i % len(apps)]) for i, r in enumerate(replies)])
+
+
+@case("agents.handle_verification", 50_000, "calls")
+def _handle_verification(n):
+    return _calls(agents.handle_verification, [(p,) for p in datasets.parser_texts(datasets.PAN_INPUTS, n)])
+
+
+@case("agents.handle_final_underwriting", 50_000, "calls")
+def _handle_final_underwriting(n):
+    apps = datasets.applications(64)
+    return _calls(agents.handle_final_underwriting, [(apps[i % 64],) for i in range(n)])
+
+
+@case("agents.handle_sanction", 50_000, "calls")
+def _handle_sanction(n):
+    apps = datasets.applications(64)
+    return _calls(agents.handle_sanction, [(apps[i % 64],) for i in range(n)])
+
+
+# --------- Sanction letters ---------
+
+@case("pdf.generate_sanction_letter", 200, "letters", memory=True)
+def _generate_sanction_letter(n):
+    # writes to the current directory; the runner chdirs to a temp dir
+    return _calls(generate_sanction_letter, [(app,) for app in datasets.applications(n)])
+
+
+@case("pdf.render_sanction_letter", 2_000, "letters", memory=True)
+def _render_sanction_letter(n):
+    get_template()
+    return _calls(render_sanction_letter, [(app,) for app in datasets.applications(n)])
+
+
+# --------- End-to-end conversations ---------
+
+@case("conversation.scripted", 200, "conversations")
+def _scripted(n):
+    engine = ConversationEngine(llm=datasets.stub_llm, letter_store=LetterStore(root=None))
+    scripts = datasets.parser_texts(datasets.CONVERSATIONS, n)
+    get_template()
+
+    def run():
+        turn_times = []
+        for script in scripts:
+            session = Session()
+            engine.greet(session)
+            engine.flush(session)
+            for text in script:
+                start = time.perf_counter()
+                engine.handle_message(session, text)
+                turn_times.append(time.perf_counter() - start)
+
+            state = session.get_state()
+            if state not in (SANCTION, POST_SANCTION_QUERY):
+                raise AssertionError(f"script ended in {state}: {script}")
+
+        turn_times.sort()
+        return len(scripts), {
+            "turns": len(turn_times),
+            "turn_p50_ms": _percentile(turn_times, 50) * 1000,
+            "turn_p95_ms": _percentile(turn_times, 95) * 1000,
+            "turn_max_ms": turn_times[-1] * 1000,
+        }
+    return run
+
+
+def _percentile(sorted_values, pct: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# ---------------------------------------------------------
+# RUNNER
+# ---------------------------------------------------------
+def _peak_kib(run_one, samples: int) -> float:
+    """Average peak of extra memory (KiB) per operation."""
+    peaks = []
+    tracemalloc.start()
+    for _ in range(samples):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        run_one()
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+    return sum(peaks) / len(peaks) / 1024
+
+
+def run_case(name: str, repeat: int, scale: float) -> dict:
+    factory, n, unit, memory = CASES[name]
+    n = max(1, int(n * scale))
+
+    factory(max(1, n // 10))()  # warm-up: imports, compiled regexes, templates
+
+    rounds = []
+    for _ in range(repeat):
+        run = factory(n)
+        start = time.perf_counter()
+        out = run()
+        elapsed = time.perf_counter() - start
+        ops, extra = out if isinstance(out, tuple) else (out, {})
+        rounds.append((ops / elapsed, extra))
+
+    rounds.sort(key=lambda r: r[0])
+    median_rate, median_extra = rounds[len(rounds) // 2]
+    result = {
+        "n": n,
+        "unit": unit,
+        "ops_per_sec": median_rate,
+        "best_ops_per_sec": rounds[-1][0],
+        "spread": (rounds[-1][0] - rounds[0][0]) / median_rate,
+    }
+    result.update(median_extra)
+
+    if memory:
+        result["peak_kib_per_op"] = _peak_kib(factory(1), samples=max(1, min(20, n // 10)))
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=os.path.dirname(__file__), timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def run_suite(names, repeat: int, scale: float) -> dict:
+    jsonlog.configure(level="off")  # measure the code, not the log writer
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            for name in names:
+                results[name] = run_case(name, repeat, scale)
+                r = results[name]
+                print(f"{name:<40}{r['ops_per_sec']:>14,.0f} {r['unit']}/s  (±{r['spread'] * 50:.0f}%)",
+                      file=sys.stderr)
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dataset_version": datasets.DATASET_VERSION,
+            "repeat": repeat,
+            "scale": scale,
+        },
+        "results": results,
+    }
+
+
+# ---------------------------------------------------------
+# COMPARISON
+# ---------------------------------------------------------
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Rows of (case, metric, baseline, current, change, regressed). Throughput
+    regresses when it drops by more than `threshold`, memory when it grows
+    by more than `threshold`.
+    """
+    if baseline["meta"].get("dataset_version") != current["meta"]["dataset_version"]:
+        raise SystemExit("baseline was recorded on a different dataset version")
+
+    rows = []
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+
+        # best round, not median: noise on a shared machine only ever slows a round down
+        change = new["best_ops_per_sec"] / old["best_ops_per_sec"] - 1
+        rows.append((name, "best_ops_per_sec", old["best_ops_per_sec"], new["best_ops_per_sec"],
+                     change, change < -threshold))
+
+        if "peak_kib_per_op" in new and "peak_kib_per_op" in old:
+            change = new["peak_kib_per_op"] / old["peak_kib_per_op"] - 1
+            rows.append((name, "peak_kib_per_op", old["peak_kib_per_op"], new["peak_kib_per_op"],
+                         change, change > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", action="append", help="run cases whose name starts with this (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed rounds per case (median is reported)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every case's size (e.g. 0.1 for a smoke run)")
+    parser.add_argument("--out", help="result file (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="baseline result file to check against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative regression")
+    parser.add_argument("--list", action="store_true", help="list cases and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (_, n, unit, _) in CASES.items():
+            print(f"{name:<40}{n:>8} {unit}")
+        return
+
+    names = [name for name in CASES if not args.only or any(name.startswith(p) for p in args.only)]
+    current = run_suite(names, args.repeat, args.scale)
+
+    out = args.out
+    if not out:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(out, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"results written to {out}", file=sys.stderr)
+
+    if not args.compare:
+        return
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+
+    rows = compare(current, baseline, args.threshold)
+    print(f"\n{'case':<40}{'metric':<18}{'baseline':>14}{'current':>14}{'change':>9}")
+    for name, metric, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<40}{metric:<18}{old:>14,.1f}{new:>14,.1f}{change:>+9.1%}{flag}")
+
+    if any(row[-1] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,14 @@
 from datetime import datetime
 from typing import Dict, Any
 from core import state as STATES
+from core.jsonlog import get_logger
+from core.metrics import HANDLER_SECONDS, timed
 from core.calculator import compute_hard_limit, compute_soft_limit, compute_emi
-from core.validators import parse_int, is_valid_pan, normalize_pan, is_reasonable_loan_request, sanitize_text
+from core.emi import DEFAULT_ANNUAL_RATE
+from core.offers import build_offer_grid, max_amount_for_emi, parse_counter_offer, quote
+from core.validators import parse_int, is_valid_pan, mask_pan, normalize_pan, is_reasonable_loan_request, sanitize_text
+
+log = get_logger("core.agents")
 
 
 def _base_result(messages=None, next_state=None, store=None):
@@ -14,6 +20,12 @@ def _base_result(messages=None, next_state=None, store=None):
     }
 
 
+def _instrumented(fn):
+    """Record the handler's wall time as loan_handler_seconds{handler=...}."""
+    return timed(HANDLER_SECONDS, handler=fn.__name__)(fn)
+
+
+@_instrumented
 def handle_master(user_msg: str) -> Dict[str, Any]:
     m = (user_msg or "").strip().lower()
     if "loan" in m:
@@ -27,6 +39,7 @@ def handle_master(user_msg: str) -> Dict[str, Any]:
     )
 
 
+@_instrumented
 def handle_sales(user_msg: str) -> dict:
     text = sanitize_text(user_msg)
 
@@ -45,22 +58,30 @@ def handle_sales(user_msg: str) -> dict:
     )
 
 
+@_instrumented
 def handle_initial_underwriting(session_data: dict) -> Dict[str, Any]:
     requested = session_data.get("requested_amount")
     income = session_data.get("income")
 
     if requested is None or income is None:
+        log.info("underwriting_initial", decision="missing")
         return _base_result(["Required data missing."], STATES.SALES_REQUIREMENTS)
 
     hard = compute_hard_limit(income)
     soft = compute_soft_limit(income)
 
     if not is_reasonable_loan_request(requested, hard):
+        log.info("underwriting_initial", decision="unreasonable", requested=requested, hard_limit=hard)
         return _base_result(
             [f"Requested amount Rs. {requested:,} is unreasonably high."],
             STATES.SALES_REQUIREMENTS,
         )
 
+    # every counter-offer in negotiation is answered from this grid
+    grid = build_offer_grid(hard, session_data.get("annual_rate"))
+    log.info("underwriting_initial", decision="eligible" if requested <= hard else "counter_offer",
+             requested=requested, hard_limit=hard, soft_limit=soft)
+
     if requested <= hard:
         messages = [
             "Checking eligibility...",
@@ -68,7 +89,7 @@ def handle_initial_underwriting(session_data: dict) -> Dict[str, Any]:
             "Would you like to proceed? (yes/change)"
         ]
         return _base_result(messages, STATES.SALES_NEGOTIATION,
-                            store={"hard_limit": hard, "soft_limit": soft})
+                            store={"hard_limit": hard, "soft_limit": soft, "offer_grid": grid})
 
     else:
         messages = [
@@ -78,9 +99,10 @@ def handle_initial_underwriting(session_data: dict) -> Dict[str, Any]:
         ]
         return _base_result(messages, STATES.SALES_NEGOTIATION,
                             store={"hard_limit": hard, "soft_limit": soft,
-                                   "suggested_amount": soft})
+                                   "suggested_amount": soft, "offer_grid": grid})
 
 
+@_instrumented
 def handle_negotiation(user_msg: str, session_data: dict) -> Dict[str, Any]:
     t = (user_msg or "").strip().lower()
     suggested = session_data.get("suggested_amount")
@@ -92,7 +114,10 @@ def handle_negotiation(user_msg: str, session_data: dict) -> Dict[str, Any]:
         approved = min(approved, hard)
 
         tenure = session_data.get("tenure") or 12
-        emi = compute_emi(approved, tenure)
+        rate = session_data.get("annual_rate")
+        rate = DEFAULT_ANNUAL_RATE if rate is None else rate
+        emi = compute_emi(approved, tenure, rate)
+        log.info("offer_accepted", approved=approved, tenure=tenure, emi=emi)
 
         return _base_result(
             [
@@ -101,7 +126,7 @@ def handle_negotiation(user_msg: str, session_data: dict) -> Dict[str, Any]:
                 "Please provide your PAN number (ABCDE1234F)."
             ],
             STATES.VERIFICATION,
-            store={"approved_amount": approved, "tenure": tenure, "emi": emi}
+            store={"approved_amount": approved, "tenure": tenure, "emi": emi, "annual_rate": rate}
         )
 
     if t in ("change", "edit", "no", "n"):
@@ -111,13 +136,26 @@ def handle_negotiation(user_msg: str, session_data: dict) -> Dict[str, Any]:
             store={"requested_amount": None}
         )
 
-    if t.replace(",", "").isdigit():
+    grid = session_data.get("offer_grid")
+
+    intent = parse_counter_offer(t) if grid else {}
+    amt = intent.get("amount")
+    if amt is None and t.replace(",", "").isdigit():
         amt = int(t.replace(",", ""))
-        if not is_reasonable_loan_request(amt, hard):
-            return _base_result(
-                [f"Rs. {amt:,} is still too high."],
-                STATES.SALES_NEGOTIATION
-            )
+
+    if amt is not None and not is_reasonable_loan_request(amt, hard):
+        return _base_result(
+            [f"Rs. {amt:,} is still too high."],
+            STATES.SALES_NEGOTIATION
+        )
+
+    if intent and set(intent) != {"amount"}:
+        log.debug("counter_offer", **intent)
+        return _counter_offer(intent, session_data, grid)
+
+    if amt is not None:
+        if grid:
+            return _reprice(amt, session_data, grid)
         return _base_result(
             [f"Noted. Rechecking eligibility..."],
             STATES.UNDERWRITING_INITIAL,
@@ -130,9 +168,83 @@ def handle_negotiation(user_msg: str, session_data: dict) -> Dict[str, Any]:
     )
 
 
+def _reprice(amount: int, session_data: dict, grid: dict) -> Dict[str, Any]:
+    """New amount during negotiation, decided from the grid (no re-underwriting)."""
+    tenure = session_data.get("tenure") or 12
+    soft = session_data.get("soft_limit")
+
+    if amount <= grid["hard"]:
+        return _base_result(
+            [
+                f"Good news — Rs. {amount:,} is eligible.",
+                f"Estimated EMI: Rs. {quote(grid, amount, tenure):,} for {tenure} months.",
+                "Would you like to proceed? (yes/change)"
+            ],
+            STATES.SALES_NEGOTIATION,
+            store={"requested_amount": amount, "suggested_amount": None}
+        )
+
+    return _base_result(
+        [
+            f"Rs. {amount:,} exceeds your limit.",
+            f"We can offer Rs. {soft:,}. Proceed? (yes/no/change)"
+        ],
+        STATES.SALES_NEGOTIATION,
+        store={"requested_amount": amount, "suggested_amount": soft}
+    )
+
+
+def _counter_offer(intent: dict, session_data: dict, grid: dict) -> Dict[str, Any]:
+    """Answer "what if 24 months?", "50000 for 24 months" or "max with EMI under 10k" from the grid."""
+    tenure = intent.get("tenure") or session_data.get("tenure") or 12
+    offered = [t for t, _ in grid["factors"]]
+    notes = []
+
+    if tenure not in offered:
+        return _base_result(
+            [f"We offer tenures of {', '.join(map(str, offered))} months."],
+            STATES.SALES_NEGOTIATION
+        )
+
+    if "emi_cap" in intent:
+        cap = intent["emi_cap"]
+        best = max_amount_for_emi(grid, cap, intent.get("tenure"))
+        if best is None:
+            return _base_result(
+                [f"No offer fits an EMI under Rs. {cap:,}. Try a longer tenure or a higher EMI."],
+                STATES.SALES_NEGOTIATION
+            )
+        amount, tenure, emi = best
+        message = f"With an EMI under Rs. {cap:,}, the most we can offer is Rs. {amount:,} over {tenure} months (EMI Rs. {emi:,})."
+
+    elif intent.get("max"):
+        amount = grid["hard"]
+        message = f"The most we can offer is Rs. {amount:,} over {tenure} months (EMI Rs. {quote(grid, amount, tenure):,})."
+
+    else:
+        amount = intent.get("amount")
+        if amount is None:
+            suggested = session_data.get("suggested_amount")
+            requested = session_data.get("requested_amount")
+            amount = suggested if suggested and suggested < requested else requested
+        if amount > grid["hard"]:
+            notes = [f"Rs. {amount:,} exceeds your limit."]
+            amount = grid["hard"]
+        message = f"Over {tenure} months your EMI on Rs. {amount:,} would be Rs. {quote(grid, amount, tenure):,}."
+
+    return _base_result(
+        notes + [message, "Would you like to proceed? (yes/change)"],
+        STATES.SALES_NEGOTIATION,
+        store={"requested_amount": amount, "suggested_amount": None, "tenure": tenure}
+    )
+
+
+@_instrumented
 def handle_verification(user_msg: str) -> Dict[str, Any]:
     pan = normalize_pan(user_msg)
-    if is_valid_pan(pan):
+    valid = is_valid_pan(pan)
+    log.info("pan_check", valid=valid, pan=mask_pan(pan))
+    if valid:
         return _base_result(
             ["PAN verified successfully."],
             STATES.UNDERWRITING_FINAL,
@@ -144,14 +256,48 @@ def handle_verification(user_msg: str) -> Dict[str, Any]:
     )
 
 
+KYC_FAILURES = {
+    "kyc": "this PAN could not be found in KYC records",
+    "pan_name": "the name on this PAN does not match your name",
+    "bureau": "your credit bureau check did not meet our policy",
+}
+
+
+@_instrumented
+def handle_kyc(pan: str, kyc: dict) -> Dict[str, Any]:
+    """Outcome of the external PAN/KYC checks (services.kyc summary) for a well-formed PAN."""
+    log.info("kyc_check", pan=mask_pan(pan), status=kyc["status"], failed=kyc["failed"],
+             unavailable=kyc["unavailable"], cached=kyc["cached"])
+
+    if kyc["status"] == "passed":
+        return _base_result(
+            ["PAN verified successfully."],
+            STATES.UNDERWRITING_FINAL,
+            store={"pan": pan, "bureau_score": kyc["bureau_score"]}
+        )
+    if kyc["status"] == "failed":
+        reasons = "; ".join(KYC_FAILURES.get(name, name) for name in kyc["failed"])
+        return _base_result(
+            [f"We couldn't verify your PAN: {reasons}. Please check it and enter it again."],
+            STATES.VERIFICATION
+        )
+    return _base_result(
+        ["Our verification service is slow to respond right now. Please send your PAN again in a moment."],
+        STATES.VERIFICATION
+    )
+
+
+@_instrumented
 def handle_final_underwriting(session_data: dict) -> Dict[str, Any]:
     approved = session_data.get("approved_amount")
     hard = session_data.get("hard_limit")
     name = session_data.get("name", "Applicant")
 
     if approved is None or hard is None:
+        log.warning("underwriting_final", approved=False, reason="missing_data")
         return _base_result(["Missing data."], STATES.SALES_REQUIREMENTS)
 
+    log.info("underwriting_final", approved=approved <= hard, amount=approved, name=name)
     if approved <= hard:
         return _base_result(
             [
@@ -168,6 +314,7 @@ def handle_final_underwriting(session_data: dict) -> Dict[str, Any]:
     )
 
 
+@_instrumented
 def handle_sanction(session_data: dict) -> Dict[str, Any]:
     approved = session_data.get("approved_amount")
     if approved is None:
@@ -1,3 +1,6 @@
+from core.emi import emi
+
+
 def compute_hard_limit(income: int) -> int:
     """
     Hard limit rule: income * 20
@@ -12,11 +15,10 @@ def compute_soft_limit(income: int) -> int:
     return int(compute_hard_limit(income) * 0.85)
 
 
-def compute_emi(amount: int, tenure_months: int) -> float:
+def compute_emi(amount: int, tenure_months: int, annual_rate: float = None) -> float:
     """
-    EMI is simplified for prototype:
-    EMI = amount / tenure
-
-    (No interest calculation to avoid LLM inconsistency issues.)
+    Reducing-balance EMI (see core.emi).
+    annual_rate is in percent and defaults to LOAN_ANNUAL_RATE; at 0 this
+    is the prototype's interest-free EMI = amount / tenure.
     """
-    return round(amount / tenure_months, 2)
+    return emi(amount, tenure_months, annual_rate)
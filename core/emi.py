@@ -0,0 +1,93 @@
+# core/emi.py
+"""
+Reducing-balance EMI engine.
+
+    EMI = P * r * (1 + r)^n / ((1 + r)^n - 1),  r = annual_rate / 12 / 100
+
+Annuity factors are memoized per (annual rate, tenure), so quoting many
+amounts or tenures never recomputes the powers. A rate of 0 gives the
+interest-free EMI the prototype has always used (amount / tenure).
+"""
+import csv
+import os
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional
+
+
+# annual interest rate in percent, e.g. 12.5
+DEFAULT_ANNUAL_RATE = float(os.getenv("LOAN_ANNUAL_RATE", "0"))
+
+
+def _rate(annual_rate: Optional[float]) -> float:
+    return DEFAULT_ANNUAL_RATE if annual_rate is None else float(annual_rate)
+
+
+@lru_cache(maxsize=4096)
+def annuity_factor(annual_rate: float, tenure_months: int) -> float:
+    """EMI per rupee borrowed."""
+    r = annual_rate / 1200
+    if r == 0:
+        return 1 / tenure_months
+    growth = (1 + r) ** tenure_months
+    return r * growth / (growth - 1)
+
+
+def emi(amount: float, tenure_months: int, annual_rate: Optional[float] = None) -> float:
+    rate = _rate(annual_rate)
+    if rate == 0:
+        return round(amount / tenure_months, 2)
+    return round(amount * annuity_factor(rate, tenure_months), 2)
+
+
+def emi_many(amounts, tenures, annual_rate: Optional[float] = None):
+    """Vectorized emi() for NumPy arrays of amounts and tenures."""
+    import numpy as np
+
+    amounts = np.asarray(amounts, dtype=np.float64)
+    tenures = np.broadcast_to(np.asarray(tenures, dtype=np.int64), amounts.shape)
+    rate = _rate(annual_rate)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if rate == 0:
+            return np.round(amounts / tenures, 2)
+
+        # one cached factor per distinct tenure
+        unique, inverse = np.unique(tenures, return_inverse=True)
+        factors = np.array([annuity_factor(rate, int(t)) if t > 0 else np.nan for t in unique])
+        return np.round(amounts * factors[inverse.reshape(amounts.shape)], 2)
+
+
+def amortization_schedule(amount: float, tenure_months: int, annual_rate: Optional[float] = None) -> Iterator[dict]:
+    """
+    Lazily yield one row per month:
+    {"month", "emi", "interest", "principal", "balance"}.
+    The last instalment absorbs rounding so the balance ends at 0.
+    """
+    rate = _rate(annual_rate)
+    r = rate / 1200
+    payment = emi(amount, tenure_months, rate)
+    balance = round(float(amount), 2)
+
+    for month in range(1, tenure_months + 1):
+        interest = round(balance * r, 2)
+        if month == tenure_months:
+            principal = balance
+        else:
+            principal = min(round(payment - interest, 2), balance)
+        balance = round(balance - principal, 2)
+
+        yield {
+            "month": month,
+            "emi": round(principal + interest, 2),
+            "interest": interest,
+            "principal": principal,
+            "balance": balance,
+        }
+
+
+def export_schedule_csv(rows: Iterable[dict], fileobj):
+    """Stream schedule rows into an open text file as CSV."""
+    writer = csv.DictWriter(fileobj, fieldnames=["month", "emi", "interest", "principal", "balance"])
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
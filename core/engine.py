@@ -0,0 +1,425 @@
+# core/engine.py
+import time
+import weakref
+from concurrent.futures import Executor, TimeoutError
+from typing import Callable, Iterator, List, Optional
+
+from core import state as STATES
+from core.state import Session
+from core.history import PROMPT_TURNS, format_entry
+from core.agents import handle_kyc, handle_sales, handle_verification
+from core.pdf_generator import render_sanction_letter
+from core.metrics import PDF_FAILURES, PDF_SECONDS, PROMPT_TEMPLATES, STATE_SECONDS, TURN_SECONDS
+from core.letter_store import LetterStore, get_letter_store
+from core.session_store import SessionBackend
+from core.transitions import MAX_CHAIN, Turn, transition_for
+from services.nlp_parsers import parse_loan_amount, parse_monthly_income
+from services.llm_sales_agent import llm_sales_response
+from services.prefetch import PromptPrefetcher
+from services.kyc import KYCVerifier
+
+
+GREETING = "Hello! I can assist you with a Personal Loan. Type 'loan' to begin."
+
+# Used whenever the LLM is unavailable or returns nothing
+FALLBACK_PROMPTS = {
+    "name": "May I have your full name?",
+    "loan_amount": "What loan amount are you looking for?",
+    "monthly_income": "What is your monthly income?",
+}
+
+# Sales step → the field whose prompt is shown after the customer answers it
+NEXT_PROMPT_FIELD = {
+    "name": "loan_amount",
+    "requested_amount": "monthly_income",
+}
+
+
+def get_recent_history(session: Session, n: int = PROMPT_TURNS) -> str:
+    return session.get_history().recent_text(n)
+
+
+def apply_agent_result(session: Session, result: dict):
+    """Store data, move state and queue the result's messages on the session."""
+    if not result:
+        return
+
+    for k, v in (result.get("store") or {}).items():
+        session.set_data(k, v)
+
+    if result.get("next_state") is not None:
+        session.set_state(result["next_state"])
+
+    pending = list(session.get_data("pending_messages") or [])
+    pending.extend(result.get("pending_messages") or [])
+    session.set_data("pending_messages", pending)
+
+
+class ConversationEngine:
+    """
+    Runs the loan conversation without any UI.
+
+    `process()` handles one user message and queues the bot replies on
+    `session.data["pending_messages"]`; `flush()` moves them into history.
+    `handle_message()` does both and returns the replies.
+    """
+
+    def __init__(
+        self,
+        llm: Callable[[str, str], Optional[str]] = llm_sales_response,
+        pdf_generator: Callable[[dict], bytes] = render_sanction_letter,
+        prefetcher: Optional[PromptPrefetcher] = None,
+        prefetch_wait: float = 0.0,
+        pdf_executor: Optional[Executor] = None,
+        letter_store: Optional[LetterStore] = None,
+        store: Optional[SessionBackend] = None,
+        stream_llm: Optional[Callable[[str, str], Optional[Iterator[str]]]] = None,
+        verifier: Optional[KYCVerifier] = None,
+    ):
+        self.llm = llm
+        self.pdf_generator = pdf_generator
+        # When set, the next sales prompt is generated in the background
+        # while the customer types; a template is used if it isn't ready.
+        self.prefetcher = prefetcher
+        self.prefetch_wait = prefetch_wait
+        # When set, sanction letters render on this thread/process pool and
+        # poll_letter() finishes the SANCTION step once the job is done.
+        self.pdf_executor = pdf_executor
+        self._letter_jobs = weakref.WeakKeyDictionary()
+        # issued letters live here; the session only keeps the letter_id
+        self.letter_store = letter_store or get_letter_store()
+        # when set, each turn's changes are persisted (see core.session_store)
+        self.store = store
+        # When set, sales prompts are not generated inside the turn: they are
+        # left for stream_reply(), which the UI renders token by token.
+        self.stream_llm = stream_llm
+        # When set, a well-formed PAN is also run through the external
+        # KYC / name match / bureau checks (see services.kyc)
+        self.verifier = verifier
+
+    # ---------------------------------------------------------
+    # PUBLIC API
+    # ---------------------------------------------------------
+    def greet(self, session: Session) -> bool:
+        """Queue the greeting on an empty chat. Returns True if queued."""
+        if session.get_history() or session.get_data("pending_messages"):
+            return False
+        apply_agent_result(session, {"pending_messages": [GREETING]})
+        self.persist(session)
+        return True
+
+    def process(self, session: Session, user_input: str) -> List[str]:
+        """Handle one user message. Returns the newly queued bot messages."""
+        with TURN_SECONDS.time():
+            return self._process(session, user_input)
+
+    def _process(self, session: Session, user_input: str) -> List[str]:
+        self.poll_letter(session)
+        self._settle_stream(session)
+        before = len(session.get_data("pending_messages") or [])
+
+        session.add_user_message(user_input)
+        lower = user_input.strip().lower()
+
+        # EXIT
+        if lower in ("exit", "quit", "stop"):
+            result = {
+                "pending_messages": ["Session ended. Type 'start' to restart."],
+                "next_state": STATES.END,
+            }
+
+        # RESET
+        elif lower == "start":
+            session.reset()
+            before = 0
+            result = {"pending_messages": ["Restarted! Type 'loan' to begin."]}
+
+        else:
+            result = self._dispatch(session, user_input)
+
+        apply_agent_result(session, result)
+        self._advance(session)
+        self._prefetch_next_prompt(session)
+        self.persist(session)
+
+        return list((session.get_data("pending_messages") or [])[before:])
+
+    def flush(self, session: Session, stream: bool = False) -> List[str]:
+        """
+        Move every pending message into history and return them. A prompt
+        left for streaming is generated here as well, unless `stream` is
+        set: then the caller renders stream_reply() next.
+        """
+        pending = list(session.get_data("pending_messages") or [])
+        for msg in pending:
+            session.add_bot_message(msg)
+        session.set_data("pending_messages", [])
+
+        if not stream and session.get_data("streaming_prompt"):
+            pending.append("".join(self.stream_reply(session)))
+
+        self.persist(session)
+        return pending
+
+    def stream_reply(self, session: Session) -> Optional[Iterator[str]]:
+        """
+        The prompt left for streaming, as an iterator over its text, or
+        None if there is none. The full text goes into history once the
+        iterator is exhausted.
+        """
+        deferred = session.get_data("streaming_prompt")
+        if not deferred:
+            return None
+        return self._stream(session, deferred)
+
+    def _stream(self, session: Session, deferred: dict) -> Iterator[str]:
+        parts = []
+        for token in self.stream_llm(deferred["history"], deferred["field"]) or ():
+            parts.append(token)
+            yield token
+
+        text = "".join(parts).strip()
+        if not text:
+            PROMPT_TEMPLATES.inc(field=deferred["field"])
+            text = deferred["template"]
+            yield text
+
+        session.set_data("streaming_prompt", None)
+        session.add_bot_message(text)
+        self.persist(session)
+
+    def _settle_stream(self, session: Session):
+        # the customer answered before the prompt finished streaming (the
+        # script run was interrupted): keep the order with the template
+        deferred = session.get_data("streaming_prompt")
+        if deferred:
+            PROMPT_TEMPLATES.inc(field=deferred["field"])
+            session.set_data("streaming_prompt", None)
+            session.add_bot_message(deferred["template"])
+
+    def persist(self, session: Session):
+        """Hand the session's changes to the session backend, if any."""
+        if self.store is not None:
+            self.store.save(session)
+
+    def letter_pending(self, session: Session) -> bool:
+        """True while a background sanction letter job is running."""
+        return session in self._letter_jobs
+
+    def poll_letter(self, session: Session, timeout: Optional[float] = 0) -> bool:
+        """
+        Collect a finished background letter job and queue its messages.
+        `timeout=None` blocks until the job is done. Returns True if the
+        job was collected.
+        """
+        job = self._letter_jobs.get(session)
+        if job is None:
+            return False
+        future, submitted = job
+
+        if timeout == 0 and not future.done():
+            return False
+
+        try:
+            pdf = future.result(timeout=timeout)
+        except TimeoutError:
+            return False
+        except Exception as e:
+            del self._letter_jobs[session]
+            PDF_SECONDS.observe(time.perf_counter() - submitted, mode="background")
+            apply_agent_result(session, self._letter_failed(session, e))
+        else:
+            del self._letter_jobs[session]
+            PDF_SECONDS.observe(time.perf_counter() - submitted, mode="background")
+            apply_agent_result(session, self._letter_ready(session, pdf))
+
+        self.persist(session)
+        return True
+
+    def get_letter(self, session: Session) -> Optional[bytes]:
+        """PDF bytes of the session's sanction letter, if one was issued."""
+        letter_id = session.get_data("letter_id")
+        return self.letter_store.get(letter_id) if letter_id else None
+
+    def handle_message(self, session: Session, user_input: str) -> List[str]:
+        """Process one user message and return the bot replies."""
+        self.process(session, user_input)
+        return self.flush(session)
+
+    # ---------------------------------------------------------
+    # STATE DISPATCH (see core.transitions)
+    # ---------------------------------------------------------
+    def _dispatch(self, session: Session, user_input: str) -> dict:
+        """Run the current state's handler for a user message."""
+        state = session.get_state()
+        with STATE_SECONDS.time(state=state):
+            return transition_for(state).handler(Turn(self, session, user_input)) or {}
+
+    def _advance(self, session: Session):
+        """Run automatic states, in this turn, until an interactive one is reached."""
+        for _ in range(MAX_CHAIN):
+            state = session.get_state()
+            transition = transition_for(state)
+            if not transition.automatic:
+                return
+
+            with STATE_SECONDS.time(state=state):
+                result = transition.handler(Turn(self, session))
+
+            # None: nothing to do yet (letter still rendering)
+            if not result:
+                return
+            apply_agent_result(session, result)
+            if session.get_state() == state:
+                return
+
+    # ---------------------------------------------------------
+    # SALES REQUIREMENTS (NAME → LOAN → INCOME)
+    # ---------------------------------------------------------
+    def collect_sales_requirements(self, session: Session, user_input: str) -> dict:
+        """SALES_REQUIREMENTS handler: name, then loan amount, then income."""
+        data = session.all_data()
+
+        # STEP 1 — NAME
+        if data.get("name") is None:
+            result = handle_sales(user_input)
+            apply_agent_result(session, {"store": result.get("store")})
+
+            # ask LLM for next missing field: loan_amount
+            return {
+                "pending_messages": self._sales_prompt(session, "loan_amount"),
+                "next_state": STATES.SALES_REQUIREMENTS
+            }
+
+        # STEP 2 — LOAN AMOUNT
+        if data.get("requested_amount") is None:
+            ok, amt = parse_loan_amount(user_input)
+
+            if ok and amt > 0:
+                # store loan amount first so the LLM sees it in context
+                session.set_data("requested_amount", amt)
+                return {
+                    "pending_messages": self._sales_prompt(session, "monthly_income"),
+                    "next_state": STATES.SALES_REQUIREMENTS
+                }
+
+            return {
+                "pending_messages": ["Enter a valid loan amount."],
+                "next_state": STATES.SALES_REQUIREMENTS
+            }
+
+        # STEP 3 — MONTHLY INCOME
+        if data.get("income") is None:
+            ok, inc = parse_monthly_income(user_input)
+
+            if ok and inc > 0:
+                # underwriting is automatic: it runs in this same turn
+                return {
+                    "pending_messages": [],
+                    "next_state": STATES.UNDERWRITING_INITIAL,
+                    "store": {"income": inc},
+                }
+
+            # invalid income → LLM can help here
+            return {
+                "pending_messages": ["Enter a valid monthly income."] + self._llm_prompt(
+                    session, "monthly_income", "Please re-enter your monthly income."
+                ),
+                "next_state": STATES.SALES_REQUIREMENTS
+            }
+
+        return {"pending_messages": [], "next_state": STATES.UNDERWRITING_INITIAL}
+
+    def _sales_prompt(self, session: Session, missing_field: str) -> List[str]:
+        if self.prefetcher:
+            started, llm_msg = self.prefetcher.take(session, missing_field, self.prefetch_wait)
+            if llm_msg:
+                return [llm_msg]
+            # a prefetch that isn't ready is not worth a second call; a stream is
+            if started and not self.stream_llm:
+                PROMPT_TEMPLATES.inc(field=missing_field)
+                return [FALLBACK_PROMPTS[missing_field]]
+
+        return self._llm_prompt(session, missing_field, FALLBACK_PROMPTS[missing_field])
+
+    def _llm_prompt(self, session: Session, missing_field: str, template: str) -> List[str]:
+        """The LLM's prompt, the template, or nothing when it is left for streaming."""
+        history = get_recent_history(session)
+        if self.stream_llm:
+            session.set_data("streaming_prompt", {"field": missing_field, "history": history, "template": template})
+            return []
+
+        llm_msg = self.llm(history, missing_field)
+        if llm_msg:
+            return [llm_msg]
+        PROMPT_TEMPLATES.inc(field=missing_field)
+        return [template]
+
+    def _prefetch_next_prompt(self, session: Session):
+        if not self.prefetcher or session.get_state() != STATES.SALES_REQUIREMENTS:
+            return
+
+        data = session.all_data()
+        step = next((k for k in ("name", "requested_amount", "income") if data.get(k) is None), None)
+        if step not in NEXT_PROMPT_FIELD:
+            return
+
+        # only what was really said (and is about to be shown): the answer
+        # is cached under this history, so it must not guess the reply
+        lines = [format_entry(sender, msg) for sender, msg in session.get_history().tail(PROMPT_TURNS)]
+        lines += [format_entry("bot", msg) for msg in session.get_data("pending_messages") or []]
+
+        self.prefetcher.start(session, NEXT_PROMPT_FIELD[step], "\n".join(lines[-PROMPT_TURNS:]))
+
+    # ---------------------------------------------------------
+    # VERIFICATION
+    # ---------------------------------------------------------
+    def verify_pan(self, session: Session, user_input: str) -> dict:
+        """VERIFICATION handler: PAN format check, then the external checks."""
+        result = handle_verification(user_input)
+        if self.verifier is None or result["next_state"] != STATES.UNDERWRITING_FINAL:
+            return result
+
+        pan = result["store"]["pan"]
+        verification = self.verifier.verify_blocking(pan, session.get_data("name"))
+        return handle_kyc(pan, verification.summary())
+
+    # ---------------------------------------------------------
+    # SANCTION LETTER
+    # ---------------------------------------------------------
+    def issue_letter(self, session: Session) -> Optional[dict]:
+        """
+        SANCTION handler: render the letter inline, or hand it to the PDF
+        executor and return None; poll_letter() finishes the step.
+        """
+        if self.pdf_executor:
+            # snapshot the data so the worker never sees later edits
+            future = self.pdf_executor.submit(self.pdf_generator, dict(session.all_data()))
+            self._letter_jobs[session] = (future, time.perf_counter())
+            return None
+
+        start = time.perf_counter()
+        try:
+            pdf = self.pdf_generator(session.all_data())
+        except Exception as e:
+            return self._letter_failed(session, e)
+        PDF_SECONDS.observe(time.perf_counter() - start, mode="inline")
+        return self._letter_ready(session, pdf)
+
+    def _letter_ready(self, session: Session, pdf: bytes) -> Optional[dict]:
+        # the session may have been restarted while the letter rendered
+        if session.get_state() != STATES.SANCTION:
+            return None
+
+        session.set_data("letter_id", self.letter_store.put(pdf))
+        return {
+            "pending_messages": ["Your sanction letter is ready. Do you need anything else? (yes/no)"],
+            "next_state": STATES.POST_SANCTION_QUERY,
+        }
+
+    def _letter_failed(self, session: Session, error: Exception) -> Optional[dict]:
+        PDF_FAILURES.inc()
+        if session.get_state() != STATES.SANCTION:
+            return None
+
+        return {"pending_messages": [f"Failed to generate PDF: {error}"]}
@@ -0,0 +1,138 @@
+# core/history.py
+"""
+Bounded chat history.
+
+Only the latest `window` entries are kept in memory. Older ones live in
+the session backend (core.session_store) and are read back through the
+history's `loader` when the UI asks for earlier messages; entries that
+leave the window before they were saved wait in a small buffer until the
+next save. Without a backend, entries older than the window are dropped.
+
+The last PROMPT_TURNS lines are kept pre-formatted, so the recent-history
+string sent to the LLM costs the same on turn 500 as on turn 5.
+"""
+import os
+from collections import deque
+from collections.abc import Sequence
+from itertools import islice
+from typing import Callable, Iterator, List, Optional, Tuple
+
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "200"))
+PROMPT_TURNS = 8  # lines of recent history given to the LLM
+
+Entry = Tuple[str, str]
+
+
+def format_entry(sender: str, msg: str) -> str:
+    return f"{sender}: {msg}"
+
+
+class ChatHistory:
+    """
+    Append-only history of (sender, msg) tuples.
+
+    Behaves like the list it replaces for len(), truth, iteration and
+    indexing; `tail()`, `since()` and `recent_text()` avoid touching the
+    archive.
+
+    `entries` are already saved and start at index `start` (a session
+    restored with only its last window); `loader(start, stop)` returns the
+    saved entries in that index range.
+    """
+
+    def __init__(self, entries=(), window: int = None, start: int = 0,
+                 loader: Optional[Callable[[int, int], List[Entry]]] = None):
+        entries = list(entries)
+        self.window = max(1, window or HISTORY_WINDOW)
+        self.loader = loader
+        self.start = start           # entries before the window
+        self.saved = start + len(entries)
+        self._unsaved: List[Entry] = []  # left the window, not saved yet
+        self.recent = deque(maxlen=self.window)
+        self._lines = deque(maxlen=PROMPT_TURNS)
+        self._text = ""
+        self._text_stale = False
+        for sender, msg in entries:
+            self.append((sender, msg))
+
+    def append(self, entry: Entry):
+        if len(self.recent) == self.window:
+            # the backend doesn't have it yet: hold on until the next save
+            if self.loader is not None and self.start >= self.saved:
+                self._unsaved.append(self.recent[0])
+            self.start += 1
+        self.recent.append(entry)
+        self._lines.append(format_entry(*entry))
+        self._text_stale = True
+
+    def mark_saved(self, count: int):
+        """The first `count` entries are in the backend now."""
+        self.saved = count
+        buffered = self.start - len(self._unsaved)
+        del self._unsaved[:max(0, count - buffered)]
+
+    # --------- List-like access ---------
+
+    def __len__(self) -> int:
+        return self.start + len(self.recent)
+
+    def __iter__(self) -> Iterator[Entry]:
+        yield from self._range(0, self.start)
+        yield from self.recent
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return self._range(start, stop)
+            return list(self)[index]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        if index >= self.start:
+            return self.recent[index - self.start]
+        entries = self._range(index, index + 1)
+        if not entries:
+            raise IndexError("history entry is no longer available")
+        return entries[0]
+
+    def __eq__(self, other):
+        if not isinstance(other, (ChatHistory, Sequence)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"ChatHistory({len(self)} entries, window={self.window})"
+
+    # --------- Windowed access ---------
+
+    def _range(self, start: int, stop: int) -> List[Entry]:
+        buffered = self.start - len(self._unsaved)
+        out = []
+        if start < buffered and self.loader is not None:
+            out = list(self.loader(start, min(stop, buffered)))
+        if start < self.start and stop > buffered:
+            out.extend(self._unsaved[max(start - buffered, 0):min(stop, self.start) - buffered])
+        if stop > self.start:
+            out.extend(islice(self.recent, max(start - self.start, 0), stop - self.start))
+        return out
+
+    def tail(self, n: int) -> List[Entry]:
+        """The last n entries (only touches the archive when n > window)."""
+        total = len(self)
+        return self._range(max(total - n, 0), total)
+
+    def since(self, index: int) -> List[Entry]:
+        """Entries appended after the first `index` ones."""
+        return self._range(index, len(self))
+
+    def recent_text(self, n: int = PROMPT_TURNS) -> str:
+        """Last n entries as "sender: msg" lines, as given to the LLM."""
+        if n != PROMPT_TURNS:
+            return "\n".join(format_entry(*entry) for entry in self.tail(n))
+        if self._text_stale:
+            self._text = "\n".join(self._lines)
+            self._text_stale = False
+        return self._text
@@ -0,0 +1,222 @@
+# core/jsonlog.py
+"""
+Non-blocking structured logging (JSON lines).
+
+    log = get_logger("llm")
+    log.info("llm_call", field="loan_amount", ms=41.2)
+
+A call only checks the level and sampling rate and puts a tuple on a
+bounded queue; a background thread redacts, serializes and writes. When
+the queue is full the record is dropped and counted, never waited on.
+
+Settings (env):
+- LOG_LEVEL    debug | info | warning | error | off (default info)
+- LOG_SAMPLE   fraction of debug/info records kept (default 1.0);
+               warnings and errors are always kept
+- LOG_FILE     path to append to; default stderr
+- LOG_REDACT   0 to disable redaction (local debugging only)
+
+Redaction: values of REDACT_FIELDS (names, PANs, history...) are
+replaced by a salted hash, so records about the same customer can still
+be correlated within one process, and anything shaped like a PAN in
+other string values is masked.
+"""
+import atexit
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+DEBUG, INFO, WARNING, ERROR, OFF = 10, 20, 30, 40, 100
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR, "off": OFF}
+LEVEL_NAMES = {v: k for k, v in LEVELS.items()}
+
+REDACT_FIELDS = frozenset({"name", "full_name", "pan", "history", "message", "user_input"})
+_PAN_RE = re.compile(r"\b[A-Z]{5}[0-9]{4}[A-Z]\b", re.IGNORECASE)
+_SALT = os.urandom(8)
+
+QUEUE_SIZE = 10_000
+
+# read on every call, so kept as plain module globals
+_threshold = LEVELS.get(os.getenv("LOG_LEVEL", "info").lower(), INFO)
+_sample = float(os.getenv("LOG_SAMPLE", "1.0"))
+_redact = os.getenv("LOG_REDACT", "1") != "0"
+
+
+# ---------------------------------------------------------
+# REDACTION
+# ---------------------------------------------------------
+def _mask(value) -> str:
+    digest = hashlib.sha256(_SALT + str(value).encode()).hexdigest()[:10]
+    return f"<redacted:{digest}>"
+
+
+def redact(fields: dict) -> dict:
+    out = {}
+    for key, value in fields.items():
+        if value is None:
+            out[key] = None
+        elif key in REDACT_FIELDS:
+            out[key] = _mask(value)
+        elif isinstance(value, str):
+            out[key] = _PAN_RE.sub("<pan>", value)
+        else:
+            out[key] = value
+    return out
+
+
+# ---------------------------------------------------------
+# BACKGROUND WRITER
+# ---------------------------------------------------------
+class _Writer:
+    """Drains the record queue on a daemon thread."""
+
+    def __init__(self, stream=None, maxsize: int = QUEUE_SIZE):
+        self.stream = stream
+        self.maxsize = maxsize
+        # SimpleQueue: a lock-free put in C, far cheaper than queue.Queue
+        self.queue = queue.SimpleQueue()
+        self.dropped = 0
+        self._busy = False
+        self.written = 0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._dropped_lock = threading.Lock()  # += isn't atomic across threads
+
+    def submit(self, record: tuple):
+        if self._thread is None:
+            self._start()
+        if self.queue.qsize() >= self.maxsize:
+            self._drop(1)
+            return
+        self.queue.put(record)
+
+    def _drop(self, n: int):
+        with self._dropped_lock:
+            self.dropped += n
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="jsonlog", daemon=True)
+                self._thread.start()
+
+    def _stream(self):
+        if self.stream is None:
+            path = os.getenv("LOG_FILE")
+            self.stream = open(path, "a", buffering=1 << 16) if path else sys.stderr
+        return self.stream
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            self._busy = True
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+            self._busy = False
+
+    def _write(self, batch):
+        lines = []
+        for ts, level, logger, event, fields in batch:
+            entry = {
+                "ts": datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="milliseconds"),
+                "level": LEVEL_NAMES[level],
+                "logger": logger,
+                "event": event,
+            }
+            entry.update(redact(fields) if _redact else fields)
+            lines.append(json.dumps(entry, default=str, ensure_ascii=False))
+        try:
+            stream = self._stream()
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+            self.written += len(lines)
+        except (OSError, ValueError):
+            self._drop(len(lines))
+
+    def flush(self, timeout: float = 2.0):
+        """Wait (up to `timeout`) until everything queued so far is written."""
+        deadline = time.monotonic() + timeout
+        while (self._busy or not self.queue.empty()) and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+
+_writer = _Writer()
+atexit.register(_writer.flush)
+
+
+# ---------------------------------------------------------
+# LOGGER
+# ---------------------------------------------------------
+class JsonLogger:
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def enabled(self, level: int = INFO) -> bool:
+        """Guard for records whose fields are expensive to build."""
+        return level >= _threshold
+
+    def _log(self, level: int, event: str, fields: dict):
+        if level < WARNING and _sample < 1.0 and random.random() >= _sample:
+            return
+        _writer.submit((time.time(), level, self.name, event, fields))
+
+    def debug(self, event: str, **fields):
+        if DEBUG >= _threshold:
+            self._log(DEBUG, event, fields)
+
+    def info(self, event: str, **fields):
+        if INFO >= _threshold:
+            self._log(INFO, event, fields)
+
+    def warning(self, event: str, **fields):
+        if WARNING >= _threshold:
+            self._log(WARNING, event, fields)
+
+    def error(self, event: str, **fields):
+        if ERROR >= _threshold:
+            self._log(ERROR, event, fields)
+
+
+_loggers = {}
+
+
+def get_logger(name: str) -> JsonLogger:
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = _loggers.setdefault(name, JsonLogger(name))
+    return logger
+
+
+def configure(level=None, sample: float = None, stream=None, redact_fields: bool = None):
+    """Override the LOG_* settings at runtime (benchmarks, tests, CLIs)."""
+    global _threshold, _sample, _redact
+    if level is not None:
+        _threshold = LEVELS[level] if isinstance(level, str) else level
+    if sample is not None:
+        _sample = sample
+    if stream is not None:
+        _writer.flush()
+        _writer.stream = stream
+    if redact_fields is not None:
+        _redact = redact_fields
+
+
+def flush(timeout: float = 2.0):
+    _writer.flush(timeout)
+
+
+def stats() -> dict:
+    return {"written": _writer.written, "dropped": _writer.dropped, "queued": _writer.queue.qsize()}
@@ -0,0 +1,191 @@
+# core/letter_store.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class LetterStore:
+    """
+    Content-addressed store for sanction letter PDFs.
+
+    Letters are keyed by the SHA-256 of their bytes, so two applicants with
+    the same name never overwrite each other and identical letters are kept
+    once. Recently issued letters stay in an in-memory LRU (`hot_size`
+    entries) so repeated downloads don't touch the disk.
+
+    Retention: letters older than `max_age` seconds are removed, and the
+    oldest ones go first once the store exceeds `max_bytes`. With
+    `root=None` the store is memory-only (headless runs, load tests).
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = "letters",
+        max_bytes: int = 512 * 1024 * 1024,
+        max_age: float = 30 * 24 * 3600,
+        hot_size: int = 128,
+        sweep_interval: float = 60.0,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hot_size = hot_size
+        self.sweep_interval = sweep_interval
+
+        self._hot = OrderedDict()
+        self._index = OrderedDict()  # letter_id -> (size, mtime), oldest first
+        self._total = 0
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_reads = 0
+        self.evictions = 0
+
+        if root:
+            os.makedirs(root, exist_ok=True)
+            self._load_index()
+
+    # ---------------------------------------------------------
+    # PUBLIC API
+    # ---------------------------------------------------------
+    def put(self, pdf: bytes) -> str:
+        """Store a letter and return its id."""
+        letter_id = hashlib.sha256(pdf).hexdigest()
+
+        with self._lock:
+            self._remember(letter_id, pdf)
+
+            if letter_id in self._index:
+                self._index.move_to_end(letter_id)
+                return letter_id
+
+            if self.root:
+                path = self._path(letter_id)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(pdf)
+                os.replace(tmp, path)
+
+            self._index[letter_id] = (len(pdf), time.time())
+            self._total += len(pdf)
+            self._evict()
+
+        return letter_id
+
+    def get(self, letter_id: str) -> Optional[bytes]:
+        """Letter bytes, or None if unknown or evicted."""
+        with self._lock:
+            pdf = self._hot.get(letter_id)
+            if pdf is not None:
+                self._hot.move_to_end(letter_id)
+                self.hits += 1
+                return pdf
+
+            if not self.root or letter_id not in self._index:
+                return None
+
+            try:
+                with open(self._path(letter_id), "rb") as f:
+                    pdf = f.read()
+            except FileNotFoundError:
+                self._drop(letter_id)
+                return None
+
+            self.disk_reads += 1
+            self._remember(letter_id, pdf)
+            return pdf
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "letters": len(self._index),
+                "bytes": self._total,
+                "hot": len(self._hot),
+                "hits": self.hits,
+                "disk_reads": self.disk_reads,
+                "evictions": self.evictions,
+            }
+
+    # ---------------------------------------------------------
+    # INTERNALS (callers hold self._lock)
+    # ---------------------------------------------------------
+    def _path(self, letter_id: str) -> str:
+        return os.path.join(self.root, f"{letter_id}.pdf")
+
+    def _remember(self, letter_id: str, pdf: bytes):
+        self._hot[letter_id] = pdf
+        self._hot.move_to_end(letter_id)
+        while len(self._hot) > self.hot_size:
+            evicted, _ = self._hot.popitem(last=False)
+            # memory-only stores have nowhere else to keep it
+            if not self.root:
+                self._drop(evicted)
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith(".pdf"):
+                st = os.stat(os.path.join(self.root, name))
+                entries.append((st.st_mtime, name[:-4], st.st_size))
+
+        for mtime, letter_id, size in sorted(entries):
+            self._index[letter_id] = (size, mtime)
+            self._total += size
+
+        self._evict()
+
+    def _drop(self, letter_id: str):
+        size, _ = self._index.pop(letter_id, (0, 0))
+        self._total -= size
+        self._hot.pop(letter_id, None)
+
+        if self.root:
+            try:
+                os.remove(self._path(letter_id))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        now = time.time()
+
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            expired = [k for k, (_, mtime) in self._index.items() if now - mtime > self.max_age]
+            for letter_id in expired:
+                self._drop(letter_id)
+                self.evictions += 1
+
+        while self._total > self.max_bytes and len(self._index) > 1:
+            letter_id = next(iter(self._index))
+            self._drop(letter_id)
+            self.evictions += 1
+
+
+# ---------------------------------------------------------
+# SHARED (PROCESS-WIDE) STORE
+# ---------------------------------------------------------
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_letter_store() -> LetterStore:
+    """
+    Store shared by every session in this process, configured from
+    LETTER_DIR (empty for memory-only), LETTER_STORE_MAX_MB,
+    LETTER_MAX_AGE_DAYS and LETTER_HOT_CACHE.
+    """
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = LetterStore(
+                    root=os.getenv("LETTER_DIR", "letters") or None,
+                    max_bytes=int(float(os.getenv("LETTER_STORE_MAX_MB", "512")) * 1024 * 1024),
+                    max_age=float(os.getenv("LETTER_MAX_AGE_DAYS", "30")) * 24 * 3600,
+                    hot_size=int(os.getenv("LETTER_HOT_CACHE", "128")),
+                )
+    return _store
@@ -0,0 +1,296 @@
+# core/metrics.py
+"""
+In-process metrics with a Prometheus text export.
+
+Counters, gauges and histograms are kept per label set in this process. render()
+returns them in the Prometheus text exposition format; the exporter
+either serves that on http://<host>:METRICS_PORT/metrics or rewrites
+METRICS_FILE every METRICS_INTERVAL seconds for a sidecar (e.g. the
+node_exporter textfile collector) to scrape.
+
+What is recorded where:
+- core.agents: wall time of every handler
+- core.engine: wall time per conversation state, per turn, PDF rendering
+- services.llm_sales_agent: LLM latency by outcome, fallbacks by reason
+- services.llm_guard: circuit breaker state and openings, hedged requests
+- app.py: Streamlit reruns, rerun duration, reruns per user turn
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from core.jsonlog import get_logger
+
+log = get_logger("core.metrics")
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+
+
+def _label_key(labels: dict) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: Tuple, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ---------------------------------------------------------
+# METRIC TYPES
+# ---------------------------------------------------------
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str):
+        self.name = name
+        self.doc = doc
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, key, "", value
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(_label_key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                yield self.name + "_bucket", key, f'le="{_format_value(bound)}"', cumulative
+            yield self.name + "_sum", key, "", total
+            yield self.name + "_count", key, "", cumulative
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+# ---------------------------------------------------------
+# REGISTRY
+# ---------------------------------------------------------
+_registry: Dict[str, object] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(metric):
+    with _registry_lock:
+        return _registry.setdefault(metric.name, metric)
+
+
+def counter(name: str, doc: str) -> Counter:
+    return _register(Counter(name, doc))
+
+
+def gauge(name: str, doc: str) -> Gauge:
+    return _register(Gauge(name, doc))
+
+
+def histogram(name: str, doc: str, buckets=LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram(name, doc, buckets))
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.doc}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, key, extra, value in metric.samples():
+            lines.append(f"{name}{_format_labels(key, extra)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Zero every metric (benchmarks, tests)."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        metric.reset()
+
+
+def timed(hist: Histogram, **labels):
+    """Decorator: observe the wrapped function's wall time on `hist`."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - start, **labels)
+        return wrapper
+    return decorate
+
+
+# ---------------------------------------------------------
+# LOAN ASSISTANT METRICS
+# ---------------------------------------------------------
+HANDLER_SECONDS = histogram("loan_handler_seconds", "Wall time of core.agents handlers.")
+STATE_SECONDS = histogram("loan_state_seconds", "Wall time spent handling each conversation state.")
+TURN_SECONDS = histogram("loan_turn_seconds", "Wall time of ConversationEngine.process per user message.")
+
+LLM_SECONDS = histogram("loan_llm_seconds", "LLM prompt latency by field and outcome.")
+LLM_FIRST_TOKEN_SECONDS = histogram("loan_llm_first_token_seconds", "Time to the first streamed LLM token by field.")
+LLM_FALLBACKS = counter("loan_llm_fallbacks_total", "LLM calls that returned no text, by reason.")
+LLM_BREAKER_STATE = gauge("loan_llm_breaker_state", "LLM circuit breaker state: 0 closed, 1 half-open, 2 open.")
+LLM_BREAKER_OPENED = counter("loan_llm_breaker_opened_total", "Times the LLM circuit breaker opened.")
+LLM_HEDGES = counter("loan_llm_hedges_total", "Second (hedged) LLM requests fired after hedge_after.")
+PROMPT_TEMPLATES = counter("loan_prompt_template_total", "Sales prompts answered from the fallback template.")
+
+KYC_SECONDS = histogram("loan_kyc_seconds", "PAN/KYC verification latency (all checks) by status.")
+KYC_CHECK_SECONDS = histogram("loan_kyc_check_seconds", "Latency of each external KYC check by check and outcome.")
+KYC_CACHE = counter("loan_kyc_cache_total", "KYC verification lookups: cache hit, miss or shared in-flight.")
+
+PDF_SECONDS = histogram("loan_pdf_seconds", "Sanction letter latency (inline render or background job).")
+PDF_FAILURES = counter("loan_pdf_failures_total", "Sanction letters that failed to render.")
+
+API_REQUESTS = counter("loan_api_requests_total", "ASGI API requests (and WebSocket messages) by route, method and status.")
+API_SECONDS = histogram("loan_api_seconds", "ASGI API request latency by route.")
+
+RERUNS = counter("loan_reruns_total", "Streamlit script runs.")
+RERUN_SECONDS = histogram("loan_rerun_seconds", "Wall time of one Streamlit script run.")
+RERUNS_PER_TURN = histogram("loan_reruns_per_turn", "Streamlit script runs per user message.", COUNT_BUCKETS)
+
+
+# ---------------------------------------------------------
+# EXPORT
+# ---------------------------------------------------------
+def write_file(path: str):
+    """Atomically replace `path` with the current metrics."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_exporter(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def start_file_exporter(path: str, interval: float = 15.0) -> threading.Thread:
+    def run():
+        while True:
+            try:
+                write_file(path)
+            except OSError as e:
+                log.error("metrics_export_failed", path=path, error=str(e))
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="metrics-file", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_exporter_from_env() -> Optional[object]:
+    """
+    METRICS_PORT serves /metrics over HTTP; otherwise METRICS_FILE is
+    rewritten every METRICS_INTERVAL seconds (default 15). Neither set:
+    metrics are only recorded.
+    """
+    port = os.getenv("METRICS_PORT")
+    if port:
+        return start_http_exporter(int(port))
+
+    path = os.getenv("METRICS_FILE")
+    if path:
+        return start_file_exporter(path, float(os.getenv("METRICS_INTERVAL", "15")))
+    return None
@@ -0,0 +1,97 @@
+# core/offers.py
+"""
+Offer grid for negotiation.
+
+Built once right after initial underwriting, the grid holds the hard
+limit, the rate and the annuity factor per offered tenure: a handful of
+numbers, cheap to build and to persist with the session. Counter-offers
+such as "what if 24 months?", "50000 for 24 months" or "max I can get
+with EMI under 10k" are answered from it, without another underwriting
+round trip; any (amount, tenure) EMI is one multiplication away.
+"""
+import re
+from typing import Optional
+
+from core.emi import DEFAULT_ANNUAL_RATE, annuity_factor, emi
+from services.nlp_parsers import parse_indian_number
+
+
+TENURES = (6, 12, 18, 24, 36, 48, 60)
+AMOUNT_ROUNDING = 1000  # offers are quoted in whole thousands
+
+# not the tail of another number: "2.5 years" is 30 months, never "5 years"
+_TENURE_RE = re.compile(r"(?<![\d.])(\d*\.?\d+)\s*(months?|mons?|mths?|mos?|years?|yrs?)\b")
+_MAX_RE = re.compile(r"\b(max|maximum|most|highest)\b")
+
+
+def build_offer_grid(hard: int, annual_rate: Optional[float] = None, tenures=TENURES) -> dict:
+    """Grid for one applicant. Plain lists/numbers only, so it can be stored in session data."""
+    rate = DEFAULT_ANNUAL_RATE if annual_rate is None else annual_rate
+    return {
+        "hard": hard,
+        "rate": rate,
+        "factors": [[t, annuity_factor(rate, t)] for t in tenures],
+    }
+
+
+def quote(grid: dict, amount: int, tenure: int) -> Optional[float]:
+    """EMI for (amount, tenure); None if the tenure isn't offered."""
+    for t, _ in grid["factors"]:
+        if t == tenure:
+            return emi(amount, tenure, grid["rate"])
+    return None
+
+
+def max_amount_for_emi(grid: dict, emi_cap: float, tenure: Optional[int] = None) -> Optional[tuple]:
+    """
+    Largest (amount, tenure, emi) with EMI <= emi_cap, optionally for one
+    tenure. None if not even the smallest offer fits.
+    """
+    best = None
+    for t, factor in grid["factors"]:
+        if tenure is not None and t != tenure:
+            continue
+
+        amount = min(grid["hard"], int(emi_cap / factor) // AMOUNT_ROUNDING * AMOUNT_ROUNDING)
+        # EMI rounding can push the exact boundary a paisa over the cap
+        while amount > 0 and emi(amount, t, grid["rate"]) > emi_cap:
+            amount -= AMOUNT_ROUNDING
+        if amount <= 0:
+            continue
+
+        if best is None or amount > best[0]:
+            best = (amount, t, emi(amount, t, grid["rate"]))
+    return best
+
+
+def parse_counter_offer(text: str) -> dict:
+    """
+    Pull counter-offer intents out of free text:
+    {"tenure": months, "emi_cap": rupees, "amount": rupees, "max": True},
+    any subset. Decimal years become months ("1.5 years" is 18); a tenure
+    that isn't a whole number of months is kept as is, and fails the
+    offered-tenure check. An amount only counts from AMOUNT_ROUNDING up, so "option 2"
+    is not a loan of Rs. 2.
+    """
+    t = (text or "").strip().lower()
+    intent = {}
+
+    match = _TENURE_RE.search(t)
+    if match:
+        months = float(match.group(1))
+        if match.group(2).startswith("y"):
+            months = round(months * 12, 6)
+        intent["tenure"] = int(months) if months.is_integer() else months
+        t = t[:match.start()] + t[match.end():]
+
+    ok, value = parse_indian_number(t)
+    if ok and value > 0:
+        if "emi" in t:
+            intent["emi_cap"] = value
+        elif value >= AMOUNT_ROUNDING:
+            intent["amount"] = value
+
+    if _MAX_RE.search(t):
+        intent["max"] = True
+
+    return intent
@@ -1,26 +1,44 @@
 import os
+import re
+import threading
+import zlib
 from fpdf import FPDF
 from datetime import datetime
 
+from core.emi import amortization_schedule
 
-def generate_sanction_letter(data: dict) -> str:
-    """
-    Generate a clean sanction letter PDF from user + loan data.
-    Returns the file path of the generated PDF.
-    """
 
-    # Extract necessary fields
-    name = data.get("name", "Applicant")
-    approved_amount = data.get("approved_amount", 0)
-    tenure = data.get("tenure", 12)
-    emi = data.get("emi", 0)
-    pan = data.get("pan", "")
-    timestamp = data.get("sanction_timestamp") or datetime.utcnow().isoformat()
+def _letter_fields(data: dict) -> dict:
+    """Variable text of a sanction letter, formatted for display (all str)."""
+    def get(key, default):
+        # a key present with a null value gets the default too
+        value = data.get(key)
+        return default if value is None else value
+
+    return {
+        "name": str(get("name", "Applicant")),
+        "pan": str(get("pan", "")),
+        "amount": f"{get('approved_amount', 0):,}",
+        "tenure": str(get("tenure", 12)),
+        "emi": f"{get('emi', 0):,}",
+        "date": str(data.get("sanction_timestamp") or datetime.utcnow().isoformat()),
+    }
+
 
-    # Output file
-    filename = f"sanction_letter_{name.replace(' ', '_')}.pdf"
-    filepath = os.path.join(os.getcwd(), filename)
+# whitespace, path separators, quotes and characters Windows rejects
+_UNSAFE_FILENAME_RE = re.compile(r'[\s/\\:*?"<>|\x00-\x1f]+')
 
+
+def filename_safe(text: str, default: str = "Applicant") -> str:
+    """`text` as one path component: "Ravi Kumar" -> "Ravi_Kumar", "../x" -> "x"."""
+    return _UNSAFE_FILENAME_RE.sub("_", str(text)).strip("._")[:100] or default
+
+
+def letter_filename(data: dict) -> str:
+    return f"sanction_letter_{filename_safe(data.get('name', 'Applicant'))}.pdf"
+
+
+def _build_letter(fields: dict, schedule=None) -> FPDF:
     pdf = FPDF()
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
@@ -32,12 +50,12 @@ def generate_sanction_letter(data: dict) -> str:
     pdf.ln(8)
     pdf.set_font("Arial", size=12)
 
-    pdf.multi_cell(0, 8, f"Date of Issue: {timestamp}")
-    pdf.multi_cell(0, 8, f"Borrower Name: {name}")
-    pdf.multi_cell(0, 8, f"PAN: {pan}")
-    pdf.multi_cell(0, 8, f"Approved Loan Amount: Rs.    {approved_amount:,}")
-    pdf.multi_cell(0, 8, f"Loan Tenure: {tenure} months")
-    pdf.multi_cell(0, 8, f"Monthly EMI: Rs. {emi:,}")
+    pdf.multi_cell(0, 8, f"Date of Issue: {fields['date']}")
+    pdf.multi_cell(0, 8, f"Borrower Name: {fields['name']}")
+    pdf.multi_cell(0, 8, f"PAN: {fields['pan']}")
+    pdf.multi_cell(0, 8, f"Approved Loan Amount: Rs.    {fields['amount']}")
+    pdf.multi_cell(0, 8, f"Loan Tenure: {fields['tenure']} months")
+    pdf.multi_cell(0, 8, f"Monthly EMI: Rs. {fields['emi']}")
 
     pdf.ln(10)
     pdf.multi_cell(
@@ -55,5 +73,181 @@ def generate_sanction_letter(data: dict) -> str:
         "This is a system-generated sanction letter and does not require a signature.",
     )
 
-    pdf.output(filepath)
+    # Optional repayment schedule, written row by row from the generator
+    if schedule is not None:
+        pdf.add_page()
+        pdf.set_font("Arial", "B", 14)
+        pdf.cell(0, 10, "Repayment Schedule", ln=True, align="C")
+        pdf.ln(4)
+
+        widths = (20, 40, 40, 40, 45)
+        pdf.set_font("Arial", "B", 10)
+        for width, title in zip(widths, ("Month", "EMI (Rs.)", "Interest", "Principal", "Balance")):
+            pdf.cell(width, 7, title, border=1, align="C")
+        pdf.ln()
+
+        pdf.set_font("Arial", size=10)
+        for row in schedule:
+            pdf.cell(widths[0], 6, str(row["month"]), border=1, align="C")
+            for width, key in zip(widths[1:], ("emi", "interest", "principal", "balance")):
+                pdf.cell(width, 6, f"{row[key]:,.2f}", border=1, align="R")
+            pdf.ln()
+
+    return pdf
+
+
+def _pdf_bytes(pdf: FPDF) -> bytes:
+    out = pdf.output(dest="S")
+    # PyFPDF returns a latin-1 str, fpdf2 a bytearray
+    return out.encode("latin-1") if isinstance(out, str) else bytes(out)
+
+
+def generate_sanction_letter(data: dict) -> str:
+    """
+    Generate a clean sanction letter PDF from user + loan data.
+    Returns the file path of the generated PDF.
+    """
+    filepath = os.path.join(os.getcwd(), letter_filename(data))
+    _build_letter(_letter_fields(data)).output(filepath)
     return filepath
+
+
+# ---------------------------------------------------------
+# COMPILED TEMPLATE (static layout built once per process)
+# ---------------------------------------------------------
+_OBJ_RE = re.compile(rb"(\d+) 0 obj\n(.*?)\nendobj\n", re.S)
+_STREAM_RE = re.compile(rb"<<(.*?)>>\nstream\n(.*?)\nendstream", re.S)
+_DATE_RE = re.compile(rb"/CreationDate \(D:\d+\)")
+
+
+def _pdf_escape(text: str) -> bytes:
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return text.encode("latin-1")
+
+
+class SanctionLetterTemplate:
+    """
+    The letter rendered once with placeholder fields and split into PDF
+    objects. Filling it only substitutes the placeholders in the page
+    content stream and rewrites the xref table, instead of laying out a
+    new FPDF document.
+
+    `fill()` returns None when the template can't be used for the data
+    (a value would wrap onto another line, or isn't latin-1), in which
+    case the caller renders the letter normally.
+    """
+
+    def __init__(self):
+        placeholders = {key: f"@@{key}@@" for key in _letter_fields({})}
+
+        pdf = _build_letter(placeholders)
+        pdf.set_compression(False)
+        raw = _pdf_bytes(pdf)
+
+        self.usable = False
+        self.header = raw[:raw.index(b"\n") + 1]
+        self.trailer = raw[raw.index(b"trailer\n"):raw.index(b"startxref")]
+        self.objects = [(int(num), body) for num, body in _OBJ_RE.findall(raw)]
+
+        # widest single line multi_cell(0, ...) fits without wrapping
+        self.max_width = pdf.w - pdf.l_margin - pdf.r_margin - 2 * pdf.c_margin
+        self.measure = FPDF()
+        self.measure.set_font("Arial", size=12)
+
+        self.lines = {
+            "date": "Date of Issue: @@date@@",
+            "name": "Borrower Name: @@name@@",
+            "pan": "PAN: @@pan@@",
+            "amount": "Approved Loan Amount: Rs.    @@amount@@",
+            "tenure": "Loan Tenure: @@tenure@@ months",
+            "emi": "Monthly EMI: Rs. @@emi@@",
+        }
+
+        for i, (num, body) in enumerate(self.objects):
+            match = _STREAM_RE.search(body)
+            if match and all(body.count(p.encode()) == 1 for p in placeholders.values()):
+                self.content_index = i
+                self.content = match.group(2)
+                self.usable = True
+                break
+
+    def fill(self, fields: dict):
+        if not self.usable:
+            return None
+
+        content = self.content
+        for key, value in fields.items():
+            if "\n" in value or "\r" in value:
+                return None
+            if self.measure.get_string_width(self.lines[key].replace(f"@@{key}@@", value)) > self.max_width:
+                return None
+            try:
+                content = content.replace(f"@@{key}@@".encode(), _pdf_escape(value))
+            except UnicodeEncodeError:
+                return None
+
+        # the page stream is ~1 KB, so a small window/memLevel keeps the
+        # deflate state tiny instead of zlib's default ~256 KB
+        deflate = zlib.compressobj(6, zlib.DEFLATED, 12, 4)
+        stream = deflate.compress(content) + deflate.flush()
+        objects = list(self.objects)
+        num = objects[self.content_index][0]
+        objects[self.content_index] = (
+            num,
+            b"<</Filter /FlateDecode /Length %d>>\nstream\n%s\nendstream" % (len(stream), stream),
+        )
+
+        now = datetime.now().strftime("D:%Y%m%d%H%M%S").encode()
+
+        out = [self.header]
+        offset = len(self.header)
+        offsets = {}
+        for num, body in objects:
+            if b"/CreationDate" in body:
+                body = _DATE_RE.sub(b"/CreationDate (" + now + b")", body)
+            chunk = b"%d 0 obj\n%s\nendobj\n" % (num, body)
+            offsets[num] = offset
+            offset += len(chunk)
+            out.append(chunk)
+
+        size = max(offsets) + 1
+        out.append(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+        out.extend(b"%010d 00000 n \n" % offsets[n] for n in range(1, size))
+        out.append(self.trailer)
+        out.append(b"startxref\n%d\n%%%%EOF\n" % offset)
+        return b"".join(out)
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def get_template() -> SanctionLetterTemplate:
+    global _template
+
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = SanctionLetterTemplate()
+    return _template
+
+
+def render_sanction_letter(data: dict, include_schedule: bool = False) -> bytes:
+    """
+    Render a sanction letter straight to PDF bytes (no file on disk).
+    Uses the compiled template, falling back to a full layout when the
+    data doesn't fit it. `include_schedule` appends the month-by-month
+    repayment schedule (always a full layout).
+    """
+    fields = _letter_fields(data)
+
+    if include_schedule:
+        schedule = amortization_schedule(
+            data.get("approved_amount", 0), data.get("tenure", 12), data.get("annual_rate")
+        )
+        return _pdf_bytes(_build_letter(fields, schedule))
+
+    pdf = get_template().fill(fields)
+    if pdf is None:
+        pdf = _pdf_bytes(_build_letter(fields))
+    return pdf
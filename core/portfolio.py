@@ -0,0 +1,94 @@
+# core/portfolio.py
+"""
+Vectorized underwriting for whole portfolios (pre-approval campaigns).
+
+Applies the same rules as core.calculator / core.validators and
+handle_initial_underwriting to NumPy arrays in one pass, instead of a
+Python loop over applicants.
+"""
+import numpy as np
+
+from core import state as STATES
+from core.emi import emi_many
+
+
+# decision codes, one per applicant
+MISSING = 0        # income or requested amount not given (NaN)
+UNREASONABLE = 1   # requested > 2 x hard limit
+ELIGIBLE = 2       # requested <= hard limit
+COUNTER_OFFER = 3  # over the hard limit, soft limit offered instead
+
+DECISION_NAMES = {
+    MISSING: "missing",
+    UNREASONABLE: "unreasonable",
+    ELIGIBLE: "eligible",
+    COUNTER_OFFER: "counter_offer",
+}
+
+# state handle_initial_underwriting moves to for each decision
+DECISION_STATES = {
+    MISSING: STATES.SALES_REQUIREMENTS,
+    UNREASONABLE: STATES.SALES_REQUIREMENTS,
+    ELIGIBLE: STATES.SALES_NEGOTIATION,
+    COUNTER_OFFER: STATES.SALES_NEGOTIATION,
+}
+
+
+def underwrite_portfolio(incomes, requested, tenures=None, annual_rate=None) -> dict:
+    """
+    Underwrite many applicants at once.
+
+    `incomes` and `requested` are array-likes of equal length; NaN marks a
+    missing value. `tenures` (months) defaults to 12, like
+    handle_negotiation; `annual_rate` (percent) defaults to LOAN_ANNUAL_RATE.
+
+    Returns a dict of arrays:
+    - hard_limit, soft_limit: compute_hard_limit / compute_soft_limit
+    - decision: one of MISSING / UNREASONABLE / ELIGIBLE / COUNTER_OFFER
+    - eligible: the requested amount fits the hard limit as is
+    - suggested_amount: the soft limit for counter offers, else 0
+    - approved_amount: what a 'yes' in negotiation approves, else 0
+    - emi: compute_emi(approved_amount, tenure, annual_rate), NaN where
+      nothing is approved
+    """
+    incomes = np.asarray(incomes, dtype=np.float64)
+    requested = np.asarray(requested, dtype=np.float64)
+    if tenures is None:
+        tenures = np.full(incomes.shape, 12, dtype=np.int64)
+    else:
+        tenures = np.broadcast_to(np.asarray(tenures, dtype=np.int64), incomes.shape)
+
+    missing = np.isnan(incomes) | np.isnan(requested)
+    # float64 throughout, like the scalar rules on fractional inputs
+    income = np.where(missing, 0.0, incomes)
+    req = np.where(missing, 0.0, requested)
+
+    hard = income * 20
+    # the one cast the scalar path makes: int(hard * 0.85) truncates,
+    # exactly like astype on positive floats
+    soft = (hard * 0.85).astype(np.int64)
+
+    decision = np.full(income.shape, COUNTER_OFFER, dtype=np.int8)
+    decision[req <= hard] = ELIGIBLE
+    decision[req > 2 * hard] = UNREASONABLE
+    decision[missing] = MISSING
+
+    eligible = decision == ELIGIBLE
+    offered = decision == COUNTER_OFFER
+
+    suggested = np.where(offered, soft, 0)
+    approved = np.where(eligible, req, 0)
+    approved = np.where(offered, np.minimum(np.where(suggested < req, suggested, req), hard), approved)
+
+    emi = emi_many(approved, tenures, annual_rate)
+    emi[~(eligible | offered)] = np.nan
+
+    return {
+        "hard_limit": hard,
+        "soft_limit": soft,
+        "decision": decision,
+        "eligible": eligible,
+        "suggested_amount": suggested,
+        "approved_amount": approved,
+        "emi": emi,
+    }
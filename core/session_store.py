@@ -0,0 +1,322 @@
+# core/session_store.py
+"""
+Pluggable session persistence.
+
+A backend stores what Session.take_changes() reports: the state, the
+changed data keys and the newly appended history entries, never the
+whole session again. Loading a session only reads the latest
+HISTORY_WINDOW history entries; older ones are read on demand through
+load_history(). MemoryBackend keeps sessions in this process;
+SQLiteBackend survives restarts.
+
+Writes are buffered per process (write-behind), so each session must
+have a single writer: several app processes may share one SQLite file
+only if every session is routed to the same process (sticky sessions).
+Another process reading the session can see it up to `flush_interval`
+seconds stale. Call close() on shutdown to write out what is buffered.
+"""
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from functools import partial
+from typing import List, Optional
+
+from core.history import HISTORY_WINDOW
+from core.jsonlog import get_logger
+from core.state import Session
+
+
+log = get_logger("core.session_store")
+
+
+# ---------------------------------------------------------
+# COMPACT SERIALIZATION
+# ---------------------------------------------------------
+_COMPRESS_OVER = 512  # bytes; small values aren't worth deflating
+
+
+def encode(value) -> bytes:
+    raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+    if len(raw) > _COMPRESS_OVER:
+        return b"z" + zlib.compress(raw)
+    return b"j" + raw
+
+
+def decode(blob: bytes):
+    blob = bytes(blob)
+    raw = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+    return json.loads(raw)
+
+
+# ---------------------------------------------------------
+# BACKEND INTERFACE
+# ---------------------------------------------------------
+class SessionBackend(ABC):
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[Session]:
+        """The saved session, or None."""
+
+    @abstractmethod
+    def save(self, session: Session):
+        """Store the session's changes since its last save."""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Forget the session."""
+
+    @abstractmethod
+    def load_history(self, session_id: str, start: int, stop: int) -> List[tuple]:
+        """Saved history entries start..stop-1 of a session."""
+
+    def _attach(self, session: Session):
+        # once saved here, turns that leave the window are read back from here
+        if session.history.loader is None:
+            session.history.loader = partial(self.load_history, session.session_id)
+
+    def flush(self):
+        """Write out anything buffered."""
+
+    def close(self):
+        self.flush()
+
+
+class MemoryBackend(SessionBackend):
+    """Sessions kept in a dict (tests, single-process deployments)."""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            record = self._sessions.get(session_id)
+            if record is None:
+                return None
+            start = max(len(record["history"]) - HISTORY_WINDOW, 0)
+            return Session.restore(session_id, record["state"], dict(record["data"]),
+                                   record["history"][start:], start, partial(self.load_history, session_id))
+
+    def load_history(self, session_id: str, start: int, stop: int) -> List[tuple]:
+        with self._lock:
+            record = self._sessions.get(session_id)
+            return record["history"][start:stop] if record else []
+
+    def save(self, session: Session):
+        self._attach(session)
+        changes = session.take_changes()
+        with self._lock:
+            record = self._sessions.get(session.session_id)
+            if record is None or changes["reset"]:
+                record = self._sessions[session.session_id] = {"state": None, "data": {}, "history": []}
+            if changes["state"] is not None:
+                record["state"] = changes["state"]
+            record["data"].update(changes["data"])
+            record["history"].extend(changes["history"])
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+# ---------------------------------------------------------
+# SQLITE (WAL) WITH WRITE-BEHIND
+# ---------------------------------------------------------
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_fields (
+    session_id TEXT NOT NULL,
+    field      TEXT NOT NULL,
+    value      BLOB,
+    PRIMARY KEY (session_id, field)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS session_history (
+    session_id TEXT NOT NULL,
+    seq        INTEGER NOT NULL,
+    sender     TEXT NOT NULL,
+    message    TEXT,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+"""
+
+# the state is stored as a field row next to the data keys
+_STATE_FIELD = "__state__"
+
+
+class SQLiteBackend(SessionBackend):
+    """
+    SQLite in WAL mode, so readers in other processes never block the writer.
+
+    save() only queues the changed fields; a background thread writes
+    everything queued in one transaction every `flush_interval` seconds,
+    or as soon as `batch_size` writes are waiting. Repeated writes to the
+    same field between flushes are coalesced. load() flushes first, so
+    it always sees this process's latest writes, but only this process's:
+    one writer per session (see the module docstring). The writer thread
+    is a daemon, so close() must run on shutdown or the queue is lost.
+    """
+
+    def __init__(self, path: str = "sessions.db", flush_interval: float = 0.05, batch_size: int = 500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._conn = self._connect()
+        self._conn.executescript(_SCHEMA)
+
+        self._lock = threading.Lock()        # guards the queues below
+        self._db_lock = threading.Lock()     # one statement stream on _conn
+        self._fields = {}                    # (session_id, field) -> encoded value
+        self._history = []                   # (session_id, seq, sender, message)
+        self._resets = set()
+        self._deletes = set()
+        self._queued = 0
+
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    # --------- Public API ---------
+
+    def load(self, session_id: str) -> Optional[Session]:
+        self.flush()
+
+        with self._db_lock:
+            fields = self._conn.execute(
+                "SELECT field, value FROM session_fields WHERE session_id = ?", (session_id,)
+            ).fetchall()
+            if not fields:
+                return None
+            latest = self._conn.execute(
+                "SELECT seq, sender, message FROM session_history WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                (session_id, HISTORY_WINDOW),
+            ).fetchall()
+
+        latest.reverse()
+        start = latest[0][0] if latest else 0
+        history = [(sender, msg) for _, sender, msg in latest]
+        data = {field: decode(value) for field, value in fields}
+        state = data.pop(_STATE_FIELD)
+        return Session.restore(session_id, state, data, history, start, partial(self.load_history, session_id))
+
+    def load_history(self, session_id: str, start: int, stop: int) -> List[tuple]:
+        self.flush()
+        with self._db_lock:
+            return self._conn.execute(
+                "SELECT sender, message FROM session_history WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (session_id, start, stop),
+            ).fetchall()
+
+    def save(self, session: Session):
+        self._attach(session)
+        changes = session.take_changes()
+        sid = session.session_id
+
+        with self._lock:
+            if changes["reset"]:
+                self._resets.add(sid)
+                self._fields = {k: v for k, v in self._fields.items() if k[0] != sid}
+                self._history = [h for h in self._history if h[0] != sid]
+
+            if changes["state"] is not None:
+                self._fields[(sid, _STATE_FIELD)] = encode(changes["state"])
+            for key, value in changes["data"].items():
+                self._fields[(sid, key)] = encode(value)
+
+            start = changes["history_start"]
+            self._history.extend(
+                (sid, start + i, sender, msg) for i, (sender, msg) in enumerate(changes["history"])
+            )
+
+            self._queued += len(changes["data"]) + len(changes["history"]) + 1
+            if self._queued >= self.batch_size:
+                self._wake.set()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._deletes.add(session_id)
+            self._fields = {k: v for k, v in self._fields.items() if k[0] != session_id}
+            self._history = [h for h in self._history if h[0] != session_id]
+
+    def flush(self):
+        # _db_lock is held across swap and write so batches commit in order
+        with self._db_lock:
+            with self._lock:
+                fields, self._fields = self._fields, {}
+                history, self._history = self._history, []
+                resets, self._resets = self._resets, set()
+                deletes, self._deletes = self._deletes, set()
+                self._queued = 0
+
+            if not (fields or history or resets or deletes):
+                return
+
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                for sid in resets | deletes:
+                    cur.execute("DELETE FROM session_fields WHERE session_id = ?", (sid,))
+                    cur.execute("DELETE FROM session_history WHERE session_id = ?", (sid,))
+                cur.executemany(
+                    "INSERT OR REPLACE INTO session_fields (session_id, field, value) VALUES (?, ?, ?)",
+                    [(sid, field, value) for (sid, field), value in fields.items()],
+                )
+                cur.executemany(
+                    "INSERT OR REPLACE INTO session_history (session_id, seq, sender, message) VALUES (?, ?, ?, ?)",
+                    history,
+                )
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                self._requeue(fields, history, resets, deletes)
+                raise
+
+    def _requeue(self, fields, history, resets, deletes):
+        # put a failed batch back in front of anything queued since
+        with self._lock:
+            fields.update(self._fields)
+            self._fields = fields
+            self._history = history + self._history
+            self._resets = resets | self._resets
+            self._deletes = deletes | self._deletes
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._conn.close()
+
+    # --------- Background writer ---------
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                log.error("session_flush_failed", error=str(e))
+
+
+def backend_from_env() -> Optional[SessionBackend]:
+    """
+    SESSION_BACKEND=sqlite (default) | memory | none;
+    SESSION_DB is the SQLite file (default sessions.db).
+    """
+    kind = os.getenv("SESSION_BACKEND", "sqlite")
+    if kind == "sqlite":
+        return SQLiteBackend(os.getenv("SESSION_DB", "sessions.db"))
+    if kind == "memory":
+        return MemoryBackend()
+    return None
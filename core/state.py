@@ -1,4 +1,11 @@
-import streamlit as st
+import uuid
+
+from core.history import ChatHistory
+
+try:
+    import streamlit as st
+except ImportError:  # headless use (engine, batch jobs) runs without Streamlit
+    st = None
 
 # ---- ALL allowed states in the system ----
 MASTER = "MASTER"
@@ -13,76 +20,200 @@ POST_SANCTION_HELP = "POST_SANCTION_HELP"
 END = "END"
 
 
+def initial_data() -> dict:
+    """Fresh data dict for a new application."""
+    return {
+        "name": None,
+        "requested_amount": None,
+        "income": None,
+        "hard_limit": None,
+        "soft_limit": None,
+        "suggested_amount": None,
+        "approved_amount": None,
+        "emi": None,
+        "tenure": None,
+        "annual_rate": None,
+        "offer_grid": None,
+        "pan": None,
+        "bureau_score": None,
+        "letter_id": None,
+        "pending_messages": [],
+        # {"field", "history", "template"} of a sales prompt still to stream
+        "streaming_prompt": None,
+    }
+
+
+class Session:
+    """
+    Plain in-memory session: conversation state, chat history and data dict.
+    Used directly by the headless engine and wrapped by SessionState in the UI.
+
+    Changes are tracked so a session backend (core.session_store) only
+    persists what changed since the last save.
+    """
+
+    def __init__(self, session_id: str = None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.reset()
+
+    # --------- Conversation State Management ---------
+
+    def set_state(self, new_state: str):
+        self.state = new_state
+        self._dirty.add("state")
+
+    def get_state(self) -> str:
+        return self.state
+
+    # --------- Chat History ---------
+
+    def add_bot_message(self, msg: str):
+        self.history.append(("bot", msg))
+
+    def add_user_message(self, msg: str):
+        self.history.append(("user", msg))
+
+    def get_history(self) -> ChatHistory:
+        return self.history
+
+    # --------- Data Store Accessors ---------
+
+    def set_data(self, key: str, value):
+        self.data[key] = value
+        self._dirty.add(key)
+
+    def get_data(self, key: str):
+        return self.data.get(key, None)
+
+    def all_data(self):
+        return self.data
+
+    # --------- Reset Everything ---------
+
+    def reset(self):
+        self.state = MASTER
+        self.history = ChatHistory()
+        self.data = initial_data()
+        self._dirty = set()
+        self._reset = True
+        self._saved_history = 0
+
+    # --------- Change Tracking ---------
+
+    def take_changes(self) -> dict:
+        """
+        Everything changed since the last call, and mark it saved:
+        {"reset": bool, "state": str or None, "data": {key: value},
+         "history": [(sender, msg), ...], "history_start": index}
+        After a reset the whole session is returned.
+        """
+        reset = self._reset
+        keys = self.data.keys() if reset else self._dirty - {"state"}
+
+        changes = {
+            "reset": reset,
+            "state": self.state if reset or "state" in self._dirty else None,
+            "data": {k: self.data[k] for k in keys if k in self.data},
+            "history": self.history.since(self._saved_history),
+            "history_start": self._saved_history,
+        }
+
+        self._dirty = set()
+        self._reset = False
+        self._saved_history = len(self.history)
+        self.history.mark_saved(self._saved_history)
+        return changes
+
+    @classmethod
+    def restore(cls, session_id: str, state: str, data: dict, history: list,
+                history_start: int = 0, loader=None) -> "Session":
+        """
+        Rebuild a persisted session (nothing marked as changed). `history`
+        may be just the latest entries, starting at index `history_start`;
+        `loader(start, stop)` reads older ones from the backend.
+        """
+        session = cls(session_id)
+        session.state = state
+        session.data.update(data)
+        session.history = ChatHistory(history, start=history_start, loader=loader)
+        session._reset = False
+        session._saved_history = len(session.history)
+        return session
+
+
 class SessionState:
     """
     Wrapper around Streamlit session_state.
-    Stores everything we need across the entire chat flow.
+    Keeps one Session per browser session for the entire chat flow.
     """
 
     @staticmethod
-    def init():
-        if "state" not in st.session_state:
-            st.session_state.state = MASTER
-
-        if "history" not in st.session_state:
-            st.session_state.history = []
-
-        if "data" not in st.session_state:
-            st.session_state.data = {
-                "name": None,
-                "requested_amount": None,
-                "income": None,
-                "hard_limit": None,
-                "soft_limit": None,
-                "suggested_amount": None,   # <-- MISSING, ADD THIS
-                "approved_amount": None,
-                "emi": None,
-                "tenure": None,
-                "pan": None,
-                "pdf_path": None,
-            }
+    def init(store=None):
+        """
+        With a session backend, the session id lives in the ?sid= query
+        parameter, so a reload, restart or another app process behind the
+        load balancer picks the same conversation back up.
+        """
+        if "session" in st.session_state:
+            return
+
+        session = None
+        if store is not None:
+            sid = st.query_params.get("sid")
+            session = store.load(sid) if sid else None
+
+        if session is None:
+            session = Session()
+            if store is not None:
+                st.query_params["sid"] = session.session_id
+
+        st.session_state.session = session
 
+    @staticmethod
+    def session() -> Session:
+        return st.session_state.session
 
     # --------- Conversation State Management ---------
 
     @staticmethod
     def set_state(new_state: str):
-        st.session_state.state = new_state
+        SessionState.session().set_state(new_state)
 
     @staticmethod
     def get_state() -> str:
-        return st.session_state.state
+        return SessionState.session().get_state()
 
     # --------- Chat History ---------
 
     @staticmethod
     def add_bot_message(msg: str):
-        st.session_state.history.append(("bot", msg))
+        SessionState.session().add_bot_message(msg)
 
     @staticmethod
     def add_user_message(msg: str):
-        st.session_state.history.append(("user", msg))
+        SessionState.session().add_user_message(msg)
 
     @staticmethod
     def get_history():
-        return st.session_state.history
+        return SessionState.session().get_history()
 
     # --------- Data Store Accessors ---------
 
     @staticmethod
     def set_data(key: str, value):
-        st.session_state.data[key] = value
+        SessionState.session().set_data(key, value)
 
     @staticmethod
     def get_data(key: str):
-        return st.session_state.data.get(key, None)
+        return SessionState.session().get_data(key)
 
     @staticmethod
     def all_data():
-        return st.session_state.data
+        return SessionState.session().all_data()
 
     # --------- Reset Everything ---------
 
     @staticmethod
     def reset():
         st.session_state.clear()
+        st.query_params.pop("sid", None)
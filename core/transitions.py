@@ -0,0 +1,121 @@
+# core/transitions.py
+"""
+The conversation state machine as a table.
+
+Every state maps to one handler and is either interactive (it waits for
+the customer's next message) or automatic (it runs as soon as it is
+entered). ConversationEngine runs the current state's handler for a user
+message, then keeps running automatic states in the same turn until an
+interactive one is reached, so underwriting and the sanction letter need
+no extra message or rerun.
+
+A handler takes a Turn and returns an agent result
+({"pending_messages", "next_state", "store"}), or None when an automatic
+state has nothing to do yet (e.g. the letter is still rendering).
+"""
+from typing import Callable, Dict, Optional
+
+from core import state as STATES
+from core.agents import (
+    handle_master,
+    handle_initial_underwriting,
+    handle_negotiation,
+    handle_final_underwriting,
+    handle_sanction,
+)
+
+# guard against a pair of automatic states sending each other back and forth
+MAX_CHAIN = 10
+
+
+class Turn:
+    """What a handler sees. `text` is None when the state was chained to."""
+
+    __slots__ = ("engine", "session", "text")
+
+    def __init__(self, engine, session, text: Optional[str] = None):
+        self.engine = engine
+        self.session = session
+        self.text = text
+
+    @property
+    def data(self) -> dict:
+        return self.session.all_data()
+
+    @property
+    def lower(self) -> str:
+        return (self.text or "").strip().lower()
+
+
+class Transition:
+    __slots__ = ("handler", "automatic")
+
+    def __init__(self, handler: Callable[[Turn], Optional[dict]], automatic: bool):
+        self.handler = handler
+        self.automatic = automatic
+
+
+def interactive(handler) -> Transition:
+    return Transition(handler, automatic=False)
+
+
+def automatic(handler) -> Transition:
+    return Transition(handler, automatic=True)
+
+
+# ---------------------------------------------------------
+# HANDLERS THAT AREN'T PLAIN AGENT CALLS
+# ---------------------------------------------------------
+def _sanction(turn: Turn) -> Optional[dict]:
+    # a message while the letter renders just gets a "still working" reply
+    if turn.text is not None:
+        return handle_sanction(turn.data)
+    if turn.session.get_data("letter_id") or turn.engine.letter_pending(turn.session):
+        return None
+    return turn.engine.issue_letter(turn.session)
+
+
+def _post_sanction_query(turn: Turn) -> dict:
+    if turn.lower in ("yes", "y"):
+        return {
+            "pending_messages": ["Sure — what else can I help you with?"],
+            "next_state": STATES.POST_SANCTION_HELP
+        }
+    if turn.lower in ("no", "n"):
+        return {
+            "pending_messages": ["Alright! Thank you for using the Loan Assistant."],
+            "next_state": STATES.END
+        }
+    return {
+        "pending_messages": ["Please reply 'yes' or 'no'."],
+        "next_state": STATES.POST_SANCTION_QUERY
+    }
+
+
+def _end(turn: Turn) -> dict:
+    return {"pending_messages": ["Session closed. Type 'start' to restart."], "next_state": STATES.END}
+
+
+def unexpected_state(turn: Turn) -> dict:
+    return {"pending_messages": ["Unexpected state."], "next_state": STATES.MASTER}
+
+
+# ---------------------------------------------------------
+# THE TABLE
+# ---------------------------------------------------------
+TRANSITIONS: Dict[str, Transition] = {
+    STATES.MASTER:               interactive(lambda t: handle_master(t.text)),
+    STATES.SALES_REQUIREMENTS:   interactive(lambda t: t.engine.collect_sales_requirements(t.session, t.text)),
+    STATES.UNDERWRITING_INITIAL: automatic(lambda t: handle_initial_underwriting(t.data)),
+    STATES.SALES_NEGOTIATION:    interactive(lambda t: handle_negotiation(t.text, t.data)),
+    STATES.VERIFICATION:         interactive(lambda t: t.engine.verify_pan(t.session, t.text)),
+    STATES.UNDERWRITING_FINAL:   automatic(lambda t: handle_final_underwriting(t.data)),
+    STATES.SANCTION:             automatic(_sanction),
+    STATES.POST_SANCTION_QUERY:  interactive(_post_sanction_query),
+    STATES.END:                  interactive(_end),
+}
+
+
+def transition_for(state: str) -> Transition:
+    """The state's transition; unknown states send the customer back to MASTER."""
+    return TRANSITIONS.get(state) or interactive(unexpected_state)
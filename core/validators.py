@@ -12,6 +12,12 @@ def normalize_pan(pan: str) -> str:
     return pan.strip().upper()
 
 
+def mask_pan(pan: str) -> str:
+    """PAN with all but the last 4 characters hidden, for logs."""
+    pan = pan or ""
+    return "*" * max(len(pan) - 4, 0) + pan[-4:]
+
+
 def is_valid_pan(pan: str) -> bool:
     """Validate PAN using regex after normalization."""
     pan = normalize_pan(pan)
@@ -0,0 +1,203 @@
+# services/batch_letters.py
+"""
+Bulk (re)generate sanction letters.
+
+Reads applications from JSONL or CSV, renders the letters across a
+process pool and streams them into a directory or a single zip archive.
+An interrupted run picks up where it stopped when started again with
+the same arguments: a directory keeps a progress file next to it, a zip
+archive is its own record (letters already in it are skipped). Failed
+rows are listed in <target>.failures.jsonl, rewritten on every run; ids
+whose letters would get the same file name are failures too.
+
+    python -m services.batch_letters applications.jsonl --out letters/
+    python -m services.batch_letters applications.csv --zip letters.zip -j 8
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+import zipfile
+from multiprocessing import Pool
+
+from core.pdf_generator import filename_safe, render_sanction_letter
+
+
+NUMERIC_FIELDS = {"approved_amount": int, "tenure": int, "emi": float}
+
+
+# ----------------------------------------
+# INPUT
+# ----------------------------------------
+def read_applications(path: str):
+    """Yield (key, raw row). Key is the `id` column or the row number."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+
+        for i, row in enumerate(rows, start=1):
+            yield str(row.get("id") or i), row
+
+
+def parse_application(row: dict) -> dict:
+    """Row with its numeric fields cast; CSV cells arrive as strings ("1,50,000")."""
+    for field, cast in NUMERIC_FIELDS.items():
+        if isinstance(row.get(field), str) and row[field].strip():
+            row[field] = cast(float(row[field].replace(",", "")))
+    return row
+
+
+def letter_name(key: str) -> str:
+    return f"sanction_letter_{filename_safe(key, default='application')}.pdf"
+
+
+def _render(item):
+    # parsed here, so one bad row is a failure of its own, not of the run
+    key, row, error = item
+    if error:
+        return key, None, error
+    try:
+        return key, render_sanction_letter(parse_application(row)), None
+    except Exception as e:
+        return key, None, f"{type(e).__name__}: {e}"
+
+
+# ----------------------------------------
+# OUTPUT
+# ----------------------------------------
+class DirectoryWriter:
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+
+    def write(self, name: str, pdf: bytes, key: str):
+        with open(os.path.join(self.path, name), "wb") as f:
+            f.write(pdf)
+
+    def close(self):
+        pass
+
+
+class ZipWriter:
+    def __init__(self, path: str):
+        # append so a resumed run adds to the existing archive; entries
+        # only survive once close() writes the central directory, so the
+        # archive itself, not a progress file, says what is done
+        self.zip = zipfile.ZipFile(path, "a", compression=zipfile.ZIP_STORED)
+
+    def owners(self) -> dict:
+        """File name -> id of the letters already in the archive (None if unrecorded)."""
+        return {info.filename: info.comment.decode() or None for info in self.zip.infolist()}
+
+    def write(self, name: str, pdf: bytes, key: str):
+        # the id goes in the entry comment, so a resumed run can tell who owns a name
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        info.comment = key.encode()
+        self.zip.writestr(info, pdf)
+
+    def close(self):
+        self.zip.close()
+
+
+def load_progress(path: str) -> set:
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+# ----------------------------------------
+# RUN
+# ----------------------------------------
+def run(input_path: str, target: str, as_zip: bool, workers: int = None, chunksize: int = 64,
+        report_every: int = 1000) -> dict:
+    progress_path = target.rstrip("/\\") + ".progress"
+    failures_path = target.rstrip("/\\") + ".failures.jsonl"
+
+    if as_zip:
+        writer = ZipWriter(target)
+        owners = writer.owners()
+    else:
+        writer = DirectoryWriter(target)
+        owners = {letter_name(key): key for key in load_progress(progress_path)}
+    stats = {"rendered": 0, "failed": 0, "skipped": 0}
+
+    def todo():
+        # (key, row, error): a name clash fails in _render without rendering
+        seen = {}  # file name -> id, this run
+        for key, row in read_applications(input_path):
+            name = letter_name(key)
+            if name in seen:
+                yield key, None, f"letter name {name} already used by id {seen[name]!r}"
+                continue
+            seen[name] = key
+            if name not in owners:
+                yield key, row, None
+            elif owners[name] in (key, None):
+                stats["skipped"] += 1
+            else:
+                yield key, None, f"letter name {name} already used by id {owners[name]!r}"
+
+    start = time.perf_counter()
+
+    try:
+        with contextlib.ExitStack() as stack:
+            pool = stack.enter_context(Pool(workers))
+            # the zip is its own progress record
+            progress = None if as_zip else stack.enter_context(open(progress_path, "a", encoding="utf-8"))
+            # failures of this run only: rows that failed before are retried
+            failures = stack.enter_context(open(failures_path, "w", encoding="utf-8"))
+
+            for n, (key, pdf, error) in enumerate(pool.imap_unordered(_render, todo(), chunksize=chunksize), 1):
+                if error:
+                    stats["failed"] += 1
+                    failures.write(json.dumps({"id": key, "error": error}) + "\n")
+                else:
+                    writer.write(letter_name(key), pdf, key)
+                    if progress is not None:
+                        progress.write(key + "\n")
+                    stats["rendered"] += 1
+
+                # at most one chunk is rendered again after a crash
+                if n % chunksize == 0:
+                    if progress is not None:
+                        progress.flush()
+                    failures.flush()
+
+                if not error and stats["rendered"] % report_every == 0:
+                    rate = stats["rendered"] / (time.perf_counter() - start)
+                    print(f"{stats['rendered']} letters, {rate:.0f}/s", file=sys.stderr)
+    finally:
+        # keeps the zip's central directory valid if the run is interrupted
+        writer.close()
+
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    stats["letters_per_sec"] = round(stats["rendered"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-generate sanction letters")
+    parser.add_argument("input", help="applications as .jsonl or .csv")
+    out = parser.add_mutually_exclusive_group(required=True)
+    out.add_argument("--out", help="directory to write PDFs into")
+    out.add_argument("--zip", help="zip archive to write PDFs into")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=64)
+    args = parser.parse_args()
+
+    stats = run(args.input, args.zip or args.out, as_zip=bool(args.zip),
+                workers=args.workers, chunksize=args.chunksize)
+    print(json.dumps(stats))
+    if stats["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# services/groq_stub.py
+"""
+Local stand-in for the Groq chat completions endpoint.
+
+Serves POST /openai/v1/chat/completions with a canned OpenAI-style reply so
+the LLM path can be exercised offline. Point the client at it with
+GROQ_BASE_URL=http://127.0.0.1:<port> and any GROQ_API_KEY.
+
+    python -m services.groq_stub --port 8787 --latency 0.05
+    python -m services.groq_stub --latency 0.2 --jitter 0.1 --error-rate 0.05
+
+Latency is `latency` seconds plus up to `jitter` more, uniformly; a
+fraction `error_rate` of requests fails with `error_status` (503 by
+default, which the Groq SDK retries).
+
+Requests with "stream": true get server-sent events, one chunk per word;
+`latency` is then the time to the first token and `token_delay` the gap
+between tokens.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CANNED_REPLIES = {
+    "name": "May I have your full name?",
+    "loan_amount": "What loan amount are you looking for?",
+    "monthly_income": "What is your monthly income (numbers only)?",
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        with self.server.lock:
+            self.server.requests += 1
+            delay = self.server.latency + self.server.rng.random() * self.server.jitter
+            fail = self.server.rng.random() < self.server.error_rate
+            if fail:
+                self.server.errors += 1
+
+        if delay:
+            time.sleep(delay)
+
+        if fail:
+            self._send(self.server.error_status, {"error": {"message": "stub: injected failure", "type": "server_error"}})
+            return
+
+        if self.path.rstrip("/") != "/openai/v1/chat/completions":
+            self._send(404, {"error": {"message": "not found"}})
+            return
+
+        prompt = " ".join(m.get("content", "") for m in body.get("messages", []))
+        reply = "Could you tell me a bit more?"
+        for field, text in CANNED_REPLIES.items():
+            if f"Missing field: {field}" in prompt:
+                reply = text
+
+        if body.get("stream"):
+            self._stream(body, reply)
+            return
+
+        self._send(200, {
+            "id": f"chatcmpl-stub-{self.server.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def _stream(self, body: dict, reply: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        words = reply.split(" ")
+        tokens = [w if i == 0 else " " + w for i, w in enumerate(words)]
+        base = {
+            "id": f"chatcmpl-stub-{self.server.requests}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+        }
+        for i, token in enumerate(tokens):
+            if i and self.server.token_delay:
+                time.sleep(self.server.token_delay)
+            delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+            self._event({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None, "logprobs": None}]})
+        self._event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop", "logprobs": None}]})
+        self._event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _event(self, payload):
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        raw = f"data: {data}\n\n".encode()
+        self.wfile.write(f"{len(raw):x}\r\n".encode() + raw + b"\r\n")
+        self.wfile.flush()
+
+    def _send(self, status: int, payload: dict):
+        raw = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        try:
+            self.wfile.write(raw)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client's read timeout fired first
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                      jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                      seed: int = None, token_delay: float = 0.0):
+    """
+    Start the stand-in on a background thread.
+    Returns (server, base_url); call server.shutdown() when done.
+    `server.connections`, `server.requests` and `server.errors` count
+    accepted TCP connections, handled requests and injected failures.
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = 0
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.error_status = error_status
+    server.token_delay = token_delay
+    server.errors = 0
+    server.rng = random.Random(seed)
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Groq API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds, uniformly")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of injected failures")
+    parser.add_argument("--seed", type=int, help="seed for latency/failure draws")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed tokens")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.host, args.port, args.latency, args.jitter,
+                                    args.error_rate, args.error_status, args.seed, args.token_delay)
+    print(f"Groq stand-in listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+# services/kyc.py
+"""
+PAN / KYC verification stage.
+
+Once a PAN passes the format check (core.validators), three external
+services are asked at the same time, each under its own timeout:
+
+    kyc        KYC status of the PAN             fails if not "verified"
+    pan_name   name on the PAN vs the applicant  fails on a mismatch
+    bureau     credit bureau score               fails below KYC_MIN_SCORE
+
+so the stage takes as long as its slowest check, not the sum of all
+three. A check's timeout starts once it has a connection; waiting for
+one of the KYC_POOL_SIZE connections has its own, longer budget. A check
+that times out or errors makes the verification "unavailable" (the
+customer is asked to try again) rather than "failed".
+Passed verifications are cached for KYC_CACHE_TTL seconds, and
+concurrent verifications of the same PAN and name share one set of
+requests.
+
+    KYC_BASE_URL=http://127.0.0.1:8788        # python -m services.kyc_stub
+    KYC_TIMEOUT_MS=800  KYC_BUREAU_TIMEOUT_MS=1600    # bureau: twice the timeout by default
+    KYC_CACHE_TTL=600   KYC_CACHE_SIZE=1024   KYC_MIN_SCORE=650
+    KYC_POOL_SIZE=50                          # connections per verifier
+    KYC_QUEUE_TIMEOUT_MS=5000                 # wait for a free connection
+
+A verifier runs its checks on one asyncio loop: async callers await
+verify() (always from the same loop), threads such as Streamlit sessions
+call verify_blocking(), which runs them on the verifier's own loop thread.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import httpx
+
+from core.jsonlog import get_logger
+from core.metrics import KYC_CACHE, KYC_CHECK_SECONDS, KYC_SECONDS
+from core.validators import mask_pan
+
+log = get_logger("services.kyc")
+
+CHECKS = ("kyc", "pan_name", "bureau")
+
+PASSED = "passed"
+FAILED = "failed"
+UNAVAILABLE = "unavailable"
+
+
+class Check:
+    """Outcome of one external check: pass, fail, timeout or error."""
+
+    __slots__ = ("name", "outcome", "detail", "ms")
+
+    def __init__(self, name: str, outcome: str, detail: dict, ms: float):
+        self.name = name
+        self.outcome = outcome
+        self.detail = detail
+        self.ms = ms
+
+
+class Verification:
+    __slots__ = ("pan", "checks", "status", "ms", "cached")
+
+    def __init__(self, pan: str, checks: List[Check], ms: float, cached: bool = False):
+        self.pan = pan
+        self.checks = {c.name: c for c in checks}
+        self.ms = ms
+        self.cached = cached
+
+        outcomes = {c.outcome for c in checks}
+        if "fail" in outcomes:
+            self.status = FAILED
+        elif outcomes - {"pass"}:
+            self.status = UNAVAILABLE
+        else:
+            self.status = PASSED
+
+    @property
+    def passed(self) -> bool:
+        return self.status == PASSED
+
+    def summary(self) -> dict:
+        """Plain dict for the agent, the session and logs."""
+        bureau = self.checks.get("bureau")
+        return {
+            "status": self.status,
+            "failed": [c.name for c in self.checks.values() if c.outcome == "fail"],
+            "unavailable": [c.name for c in self.checks.values() if c.outcome in ("timeout", "error")],
+            "bureau_score": bureau.detail.get("score") if bureau else None,
+            "cached": self.cached,
+            "ms": round(self.ms, 1),
+        }
+
+
+def _name_key(name: Optional[str]) -> str:
+    return " ".join((name or "").lower().split())
+
+
+# ---------------------------------------------------------
+# HTTP CLIENT
+# ---------------------------------------------------------
+class ServiceError(Exception):
+    """A check's service answered with an error status."""
+
+
+class PoolBusy(Exception):
+    """No connection freed up within the client's queue_timeout."""
+
+
+class JSONClient:
+    """
+    JSON POSTs to the checks' gateway over one httpx.AsyncClient, with a
+    keep-alive pool of `pool_size` connections.
+
+    post()'s `timeout` bounds connecting and waiting for the response; it
+    only starts once the request has a connection slot. The wait for a
+    slot is bounded by `queue_timeout` (PoolBusy). The checks are
+    read-only lookups, so a request whose pooled connection was closed by
+    the service is sent once more.
+
+    httpx's pool checks every connection on every request, so with
+    hundreds in flight one big pool costs more CPU than the requests
+    themselves. The connections are split over clients of at most
+    SHARD_SIZE each; requests queue on one semaphore here, never inside
+    httpx, and take the least busy client.
+    """
+
+    SHARD_SIZE = 8
+
+    def __init__(self, base_url: str, pool_size: int = 50, queue_timeout: Optional[float] = None):
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(pool_size)
+        shards = -(-pool_size // self.SHARD_SIZE)
+        size = -(-pool_size // shards)
+        limits = httpx.Limits(max_connections=size, max_keepalive_connections=size)
+        self._shards = [httpx.AsyncClient(base_url=base_url, limits=limits) for _ in range(shards)]
+        self._busy = [0] * shards
+
+    async def post(self, path: str, payload: dict, timeout: Optional[float] = None) -> dict:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise PoolBusy(f"{path}: no free connection within {self.queue_timeout * 1000:.0f} ms") from None
+        # fewer than pool_size requests are running, so this one has room
+        shard = self._busy.index(min(self._busy))
+        self._busy[shard] += 1
+        try:
+            response = await self._send(self._shards[shard], path, payload, timeout)
+        finally:
+            self._busy[shard] -= 1
+            self._slots.release()
+
+
+        if response.status_code >= 400:
+            raise ServiceError(f"{path}: HTTP {response.status_code}")
+        return response.json()
+
+    @staticmethod
+    async def _send(http: httpx.AsyncClient, path: str, payload: dict, timeout: Optional[float]) -> httpx.Response:
+        for attempt in (1, 2):
+            try:
+                return await http.post(path, json=payload, timeout=timeout)
+            except httpx.TimeoutException as e:
+                raise asyncio.TimeoutError(str(e)) from e
+            except (httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError):
+                # a stale keep-alive connection, closed by the service
+                if attempt == 2:
+                    raise
+
+    async def aclose(self):
+        for http in self._shards:
+            await http.aclose()
+
+
+# ---------------------------------------------------------
+# VERIFIER
+# ---------------------------------------------------------
+class KYCVerifier:
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 0.8,
+        timeouts: Optional[Dict[str, float]] = None,
+        min_score: int = 650,
+        cache_ttl: float = 600.0,
+        cache_size: int = 1024,
+        pool_size: int = 50,
+        queue_timeout: float = 5.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = {name: timeout for name in CHECKS}
+        self.timeouts.update(timeouts or {})
+        self.min_score = min_score
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.pool_size = pool_size
+        self.queue_timeout = queue_timeout
+
+        # everything below belongs to the one loop the checks run on
+        self._cache = OrderedDict()  # (pan, name) -> (Verification, expires)
+        self._inflight = {}  # (pan, name) -> asyncio.Task
+        self._client = None
+        self._bound_loop = None
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+        self._thread_loop = None
+        self._thread_lock = threading.Lock()
+
+    # --------- Async API ---------
+
+    async def verify(self, pan: str, name: Optional[str]) -> Verification:
+        """Run every check concurrently (or answer from the cache)."""
+        loop = asyncio.get_running_loop()
+        if self._bound_loop is None:
+            self._bound_loop = loop
+        elif self._bound_loop is not loop:
+            raise RuntimeError("KYCVerifier used from two event loops")
+
+        key = (pan, _name_key(name))
+        cached = self._cache_get(key)
+        if cached is not None:
+            self.hits += 1
+            KYC_CACHE.inc(result="hit")
+            return Verification(pan, list(cached.checks.values()), 0.0, cached=True)
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            KYC_CACHE.inc(result="miss")
+            task = loop.create_task(self._verify(pan, name))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.shared += 1
+            KYC_CACHE.inc(result="shared")
+
+        # one waiter giving up must not cancel the checks for the others
+        return await asyncio.shield(task)
+
+    async def _verify(self, pan: str, name: Optional[str]) -> Verification:
+        start = time.perf_counter()
+        client = self._get_client()
+
+        checks = await asyncio.gather(
+            self._run("kyc", self._kyc, client, pan),
+            self._run("pan_name", self._pan_name, client, pan, name),
+            self._run("bureau", self._bureau, client, pan),
+        )
+
+        elapsed = time.perf_counter() - start
+        verification = Verification(pan, checks, elapsed * 1000)
+        if verification.passed:
+            self._cache_put((pan, _name_key(name)), verification)
+
+        KYC_SECONDS.observe(elapsed, status=verification.status)
+        log.info("kyc_verification", pan=mask_pan(pan), **verification.summary())
+        return verification
+
+    async def _run(self, name: str, check, *args) -> Check:
+        start = time.perf_counter()
+        try:
+            # the timeout is applied per request, after the wait for a connection
+            ok, detail = await check(*args, timeout=self.timeouts[name])
+            outcome = "pass" if ok else "fail"
+        except asyncio.TimeoutError:
+            outcome, detail = "timeout", {}
+        except Exception as e:
+            outcome, detail = "error", {"error": str(e)}
+
+        elapsed = time.perf_counter() - start
+        KYC_CHECK_SECONDS.observe(elapsed, check=name, outcome=outcome)
+        return Check(name, outcome, detail, elapsed * 1000)
+
+    # --------- Checks ---------
+
+    async def _kyc(self, client, pan: str, timeout: float):
+        body = await client.post("/kyc/v1/status", {"pan": pan}, timeout)
+        return body.get("status") == "verified", {"status": body.get("status")}
+
+    async def _pan_name(self, client, pan: str, name: Optional[str], timeout: float):
+        body = await client.post("/pan/v1/name-match", {"pan": pan, "name": name or ""}, timeout)
+        return bool(body.get("match")), {"score": body.get("score")}
+
+    async def _bureau(self, client, pan: str, timeout: float):
+        body = await client.post("/bureau/v1/score", {"pan": pan}, timeout)
+        score = int(body.get("score") or 0)
+        return score >= self.min_score, {"score": score}
+
+    def _get_client(self) -> JSONClient:
+        if self._client is None:
+            self._client = JSONClient(self.base_url, self.pool_size, self.queue_timeout)
+        return self._client
+
+    # --------- Cache ---------
+
+    def _cache_get(self, key) -> Optional[Verification]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry[0]
+
+    def _cache_put(self, key, verification: Verification):
+        if self.cache_ttl <= 0 or self.cache_size <= 0:
+            return
+        self._cache[key] = (verification, time.monotonic() + self.cache_ttl)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "cache_size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "inflight": len(self._inflight),
+        }
+
+    # --------- Blocking API (threads) ---------
+
+    def verify_blocking(self, pan: str, name: Optional[str]) -> Verification:
+        """verify() for synchronous callers, run on the verifier's loop thread."""
+        future = asyncio.run_coroutine_threadsafe(self.verify(pan, name), self._loop_thread())
+        return future.result()
+
+    def _loop_thread(self) -> asyncio.AbstractEventLoop:
+        if self._thread_loop is None:
+            with self._thread_lock:
+                if self._thread_loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="kyc-loop", daemon=True).start()
+                    self._thread_loop = loop
+        return self._thread_loop
+
+    async def aclose(self):
+        """Close the HTTP client (async callers, on the verifier's loop)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def close(self):
+        """Close the HTTP client and stop the loop thread, if any."""
+        loop = self._thread_loop
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self.aclose(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread_loop = None
+
+
+def verifier_from_env() -> Optional[KYCVerifier]:
+    """The verifier configured by KYC_* env vars, or None when KYC_BASE_URL is unset."""
+    base_url = os.getenv("KYC_BASE_URL")
+    if not base_url:
+        return None
+
+    timeout = float(os.getenv("KYC_TIMEOUT_MS", "800")) / 1000
+    return KYCVerifier(
+        base_url,
+        timeout=timeout,
+        timeouts={"bureau": float(os.getenv("KYC_BUREAU_TIMEOUT_MS", str(timeout * 1000 * 2))) / 1000},
+        min_score=int(os.getenv("KYC_MIN_SCORE", "650")),
+        cache_ttl=float(os.getenv("KYC_CACHE_TTL", "600")),
+        cache_size=int(os.getenv("KYC_CACHE_SIZE", "1024")),
+        pool_size=int(os.getenv("KYC_POOL_SIZE", "50")),
+        queue_timeout=float(os.getenv("KYC_QUEUE_TIMEOUT_MS", "5000")) / 1000,
+    )
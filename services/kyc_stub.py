@@ -0,0 +1,170 @@
+# services/kyc_stub.py
+"""
+Local stand-in for the KYC, PAN-name match and credit bureau services.
+
+    POST /kyc/v1/status         {"pan"}          -> {"pan", "status": "verified" | "not_found"}
+    POST /pan/v1/name-match     {"pan", "name"}  -> {"pan", "match": bool, "score": 0..1}
+    POST /bureau/v1/score       {"pan"}          -> {"pan", "score": 300..900}
+
+Answers are deterministic per PAN so runs are repeatable: PANs starting
+with "ZZZZZ" are unknown to KYC, names made of a single letter don't
+match, and the bureau score is derived from a hash of the PAN.
+
+    python -m services.kyc_stub --port 8788 --latency 0.05 --jitter 0.1
+    KYC_BASE_URL=http://127.0.0.1:8788 streamlit run app.py
+
+Latency and failure injection work as in services.groq_stub; --slow
+adds extra latency to one service (e.g. --slow bureau=0.5).
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _kyc(body: dict) -> dict:
+    pan = body.get("pan", "")
+    return {"pan": pan, "status": "not_found" if pan.startswith("ZZZZZ") else "verified"}
+
+
+def _name_match(body: dict) -> dict:
+    name = " ".join((body.get("name") or "").split())
+    match = len(name) > 1
+    return {"pan": body.get("pan", ""), "match": match, "score": 0.94 if match else 0.12}
+
+
+def _bureau(body: dict) -> dict:
+    pan = body.get("pan", "")
+    digest = int(hashlib.sha256(pan.encode()).hexdigest()[:8], 16)
+    return {"pan": pan, "score": 600 + digest % 250}
+
+
+ROUTES = {
+    "/kyc/v1/status": ("kyc", _kyc),
+    "/pan/v1/name-match": ("pan_name", _name_match),
+    "/bureau/v1/score": ("bureau", _bureau),
+}
+
+
+class KYCStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out as two writes; don't let Nagle hold the body
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        route = ROUTES.get(self.path.rstrip("/"))
+        service = route[0] if route else None
+
+        with self.server.lock:
+            self.server.requests += 1
+            if service:
+                self.server.by_service[service] += 1
+            delay = self.server.latency + self.server.rng.random() * self.server.jitter
+            delay += self.server.slow.get(service, 0.0)
+            fail = self.server.rng.random() < self.server.error_rate
+            if fail:
+                self.server.errors += 1
+
+        if delay:
+            time.sleep(delay)
+
+        if fail:
+            self._send(self.server.error_status, {"error": "stub: injected failure"})
+            return
+
+        if route is None:
+            self._send(404, {"error": "not found"})
+            return
+
+        self._send(200, route[1](body))
+
+    def _send(self, status: int, payload: dict):
+        raw = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        try:
+            self.wfile.write(raw)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the caller's timeout fired first
+
+    def log_message(self, format, *args):
+        pass
+
+
+class KYCStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # a burst of verifications opens many connections at once
+    request_queue_size = 1024
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                      jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                      seed: int = None, slow: dict = None):
+    """
+    Start the stand-in on a background thread.
+    Returns (server, base_url); call server.shutdown() when done.
+    `server.requests`, `server.by_service` and `server.errors` count
+    handled requests (overall and per service) and injected failures.
+    """
+    server = KYCStubServer((host, port), KYCStubHandler)
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = 0
+    server.by_service = {name: 0 for name, _ in ROUTES.values()}
+    server.latency = latency
+    server.jitter = jitter
+    server.slow = dict(slow or {})
+    server.error_rate = error_rate
+    server.error_status = error_status
+    server.errors = 0
+    server.rng = random.Random(seed)
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def parse_slow(values) -> dict:
+    """["bureau=0.5", ...] -> {"bureau": 0.5}"""
+    slow = {}
+    for value in values or ():
+        service, _, seconds = value.partition("=")
+        slow[service.strip()] = float(seconds)
+    return slow
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local KYC / PAN / bureau stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8788)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds, uniformly")
+    parser.add_argument("--slow", action="append", help="extra latency for one service, e.g. bureau=0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of injected failures")
+    parser.add_argument("--seed", type=int, help="seed for latency/failure draws")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.host, args.port, args.latency, args.jitter,
+                                    args.error_rate, args.error_status, args.seed, parse_slow(args.slow))
+    print(f"KYC stand-in listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# services/llm_cassette.py
+"""
+Record/replay of LLM calls for deterministic, offline perf runs.
+
+    LLM_CASSETTE=cassettes/sales.jsonl LLM_CASSETTE_MODE=record  ... # real (or stub) Groq
+    LLM_CASSETTE=cassettes/sales.jsonl LLM_CASSETTE_MODE=replay  ... # no network at all
+    LLM_CASSETTE_TIMING=zero                                         # replay without sleeping
+
+A cassette is a JSON-lines file, one compact record per completion:
+{"k": key, "m": model, "r": response text, "ms": observed latency}.
+Prompts themselves are not stored (they contain customer names), only
+the key: a hash of the prompt with whitespace collapsed and case folded.
+
+In replay mode a prompt recorded several times is answered with its
+recordings in order (the last one repeats), and a prompt that was never
+recorded is a miss: llm_sales_response falls back to the template, as
+for any other unavailable answer.
+
+    python -m services.llm_cassette cassettes/sales.jsonl   # summary
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Optional
+
+RECORD = "record"
+REPLAY = "replay"
+
+_SPACES = re.compile(r"\s+")
+
+
+def prompt_key(prompt: str, model: str = "") -> str:
+    normalized = _SPACES.sub(" ", (prompt or "").strip().lower())
+    return hashlib.sha256(f"{model}\n{normalized}".encode()).hexdigest()[:24]
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = REPLAY, timing: str = "original"):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"unknown cassette mode {mode!r}")
+        if timing not in ("original", "zero"):
+            raise ValueError(f"unknown cassette timing {timing!r}")
+
+        self.path = path
+        self.mode = mode
+        self.timing = timing
+        self._lock = threading.Lock()
+        self._entries = defaultdict(list)  # key -> [(response, seconds), ...]
+        self._cursor = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+        if mode == REPLAY:
+            self._load()
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self._entries[record["k"]].append((record["r"], record["ms"] / 1000))
+
+    # --------- Replay ---------
+
+    def lookup(self, prompt: str, model: str = "") -> Optional[tuple]:
+        """Next recorded (response, latency seconds) for this prompt, or None."""
+        key = prompt_key(prompt, model)
+        with self._lock:
+            recordings = self._entries.get(key)
+            if not recordings:
+                self.misses += 1
+                return None
+            i = self._cursor[key]
+            self._cursor[key] = i + 1
+            self.hits += 1
+            return recordings[min(i, len(recordings) - 1)]
+
+    def replay(self, entry: tuple) -> str:
+        response, seconds = entry
+        if self.timing == "original" and seconds > 0:
+            time.sleep(seconds)
+        return response
+
+    # --------- Record ---------
+
+    def record(self, prompt: str, model: str, fn: Callable[[], str]) -> str:
+        """Run the live call and append its response and latency."""
+        start = time.perf_counter()
+        response = fn()
+        self.add(prompt, model, response, time.perf_counter() - start)
+        return response
+
+    def add(self, prompt: str, model: str, response: str, seconds: float):
+        """Append one finished response (e.g. a fully read stream)."""
+        key = prompt_key(prompt, model)
+        line = json.dumps(
+            {"k": key, "m": model, "r": response, "ms": round(seconds * 1000, 1)},
+            separators=(",", ":"), ensure_ascii=False,
+        )
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._entries[key].append((response, seconds))
+            self.recorded += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "keys": len(self._entries),
+                "recordings": sum(len(v) for v in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "recorded": self.recorded,
+            }
+
+
+# ---------------------------------------------------------
+# PROCESS-WIDE CASSETTE (from env)
+# ---------------------------------------------------------
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """The cassette set by LLM_CASSETTE / LLM_CASSETTE_MODE / LLM_CASSETTE_TIMING, if any."""
+    global _cassette
+
+    path = os.getenv("LLM_CASSETTE")
+    if not path:
+        return None
+
+    if _cassette is None or _cassette.path != path:
+        with _cassette_lock:
+            if _cassette is None or _cassette.path != path:
+                _cassette = Cassette(
+                    path,
+                    mode=os.getenv("LLM_CASSETTE_MODE", REPLAY),
+                    timing=os.getenv("LLM_CASSETTE_TIMING", "original"),
+                )
+    return _cassette
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("usage: python -m services.llm_cassette CASSETTE.jsonl", file=sys.stderr)
+        sys.exit(2)
+
+    cassette = Cassette(sys.argv[1], mode=REPLAY)
+    latencies = sorted(s for recordings in cassette._entries.values() for _, s in recordings)
+    summary = cassette.stats()
+    if latencies:
+        summary["latency_ms"] = {
+            "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1),
+        }
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# services/llm_guard.py
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+from core.metrics import LLM_BREAKER_OPENED, LLM_BREAKER_STATE, LLM_HEDGES
+
+
+class LLMUnavailable(Exception):
+    """The LLM answer can't be used; callers should fall back to a template."""
+
+
+class DeadlineExceeded(LLMUnavailable):
+    pass
+
+
+class CircuitOpen(LLMUnavailable):
+    pass
+
+
+# ----------------------------------------
+# CIRCUIT BREAKER
+# ----------------------------------------
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `cooldown` seconds. After that one trial call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}  # loan_llm_breaker_state
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0, name: str = "llm"):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.name = name
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self.times_opened = 0
+        self._set_state(self.CLOSED)
+
+    def _set_state(self, state: str):
+        self._state = state
+        LLM_BREAKER_STATE.set(self.GAUGE[state], breaker=self.name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    return False
+                self._set_state(self.HALF_OPEN)
+
+            # half-open: only one trial call at a time
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                self._set_state(self.CLOSED)
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                    LLM_BREAKER_OPENED.inc(breaker=self.name)
+                self._set_state(self.OPEN)
+                self._opened_at = time.monotonic()
+
+
+# ----------------------------------------
+# DEADLINE + HEDGING
+# ----------------------------------------
+class LLMGuard:
+    """
+    Runs LLM calls under a latency budget.
+
+    - `deadline`: seconds to wait for an answer before giving up
+    - `hedge_after`: if set, a second identical request is fired when the
+      first hasn't answered after this many seconds; the first success wins
+    - a CircuitBreaker skips calls entirely during provider incidents
+    """
+
+    def __init__(
+        self,
+        deadline: float = 0.4,
+        hedge_after: Optional[float] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        max_workers: int = 16,
+    ):
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+        self.counts = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "short_circuits": 0,
+            "hedges": 0,
+            "fallbacks": 0,
+        }
+
+    def _count(self, *names):
+        with self._lock:
+            for name in names:
+                self.counts[name] += 1
+
+    def call(self, fn: Callable[[], str], discard: Optional[Callable] = None) -> str:
+        """
+        Return fn()'s result or raise LLMUnavailable.
+        `discard(result)` receives results that arrive after the guard
+        stopped waiting for them (deadline passed, or a hedge lost), e.g.
+        to close an open stream nobody will read.
+        """
+        self._count("calls")
+
+        if not self.breaker.allow():
+            self._count("short_circuits", "fallbacks")
+            raise CircuitOpen("LLM circuit is open")
+
+        start = time.monotonic()
+        futures = {self._executor.submit(fn)}
+        hedged = not self.hedge_after or self.hedge_after >= self.deadline
+        error = None
+
+        while futures:
+            elapsed = time.monotonic() - start
+            if elapsed >= self.deadline:
+                break
+
+            timeout = self.deadline - elapsed
+            if not hedged:
+                timeout = min(timeout, max(self.hedge_after - elapsed, 0))
+
+            done, futures = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                self._abandon((futures | done) - {future}, discard)
+                self.breaker.record_success()
+                self._count("successes")
+                return result
+
+            if not hedged and time.monotonic() - start >= self.hedge_after:
+                hedged = True
+                futures.add(self._executor.submit(fn))
+                self._count("hedges")
+                LLM_HEDGES.inc()
+
+        self._abandon(futures, discard)
+
+        self.breaker.record_failure()
+        if futures:
+            self._count("timeouts", "fallbacks")
+            raise DeadlineExceeded(f"no LLM answer within {self.deadline * 1000:.0f} ms")
+
+        self._count("failures", "fallbacks")
+        raise LLMUnavailable(str(error)) from error
+
+    def run(self, fn: Callable[[], str]) -> str:
+        """
+        Return fn()'s result or raise LLMUnavailable, without deadline or
+        hedging: fn runs in the calling thread, bounded only by the client's
+        own timeouts. For calls already off the critical path (prefetch),
+        which the interactive deadline would cut short for nothing. The
+        circuit breaker still applies and learns from the outcome.
+        """
+        self._count("calls")
+
+        if not self.breaker.allow():
+            self._count("short_circuits", "fallbacks")
+            raise CircuitOpen("LLM circuit is open")
+
+        try:
+            result = fn()
+        except Exception as e:
+            self.breaker.record_failure()
+            self._count("failures", "fallbacks")
+            raise LLMUnavailable(str(e)) from e
+
+        self.breaker.record_success()
+        self._count("successes")
+        return result
+
+    @staticmethod
+    def _abandon(futures, discard: Optional[Callable]):
+        for future in futures:
+            if not future.cancel() and discard is not None:
+                # already running: hand its result to `discard` when it lands
+                future.add_done_callback(lambda f: _discard(f, discard))
+
+    def metrics(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+        counts["breaker_state"] = self.breaker.state
+        counts["breaker_opened"] = self.breaker.times_opened
+        return counts
+
+
+def _discard(future, discard: Callable):
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        discard(future.result())
+    except Exception:
+        pass
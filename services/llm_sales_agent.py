@@ -1,12 +1,53 @@
 import os
+import threading
+import time
+from typing import Iterator, Optional
 from dotenv import load_dotenv
 load_dotenv()
 
 try:
+    import httpx
     from groq import Groq
 except ImportError:
     Groq = None
 
+from services.llm_cassette import REPLAY, get_cassette
+from services.prompt_cache import get_shared_cache
+from core.jsonlog import DEBUG, get_logger
+from core.metrics import LLM_FALLBACKS, LLM_FIRST_TOKEN_SECONDS, LLM_SECONDS
+from services.llm_guard import CircuitBreaker, CircuitOpen, DeadlineExceeded, LLMGuard
+
+
+# ----------------------------------------
+# SHARED CLIENT SETTINGS
+# ----------------------------------------
+POOL_SIZE = int(os.getenv("GROQ_POOL_SIZE", "20"))
+CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", "2.0"))
+READ_TIMEOUT = float(os.getenv("GROQ_READ_TIMEOUT", "10.0"))
+KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "60.0"))
+MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "1"))
+
+
+# ----------------------------------------
+# LATENCY BUDGET / CIRCUIT BREAKER
+# ----------------------------------------
+_hedge_ms = os.getenv("LLM_HEDGE_AFTER_MS")
+
+guard = LLMGuard(
+    deadline=float(os.getenv("LLM_DEADLINE_MS", "400")) / 1000,
+    hedge_after=float(_hedge_ms) / 1000 if _hedge_ms else None,
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "3")),
+        cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", "30")),
+    ),
+)
+
+
+log = get_logger("services.llm_sales_agent")
+
+
+MODEL = "llama-3.1-8b-instant"
+
 
 # STRICT LLM INSTRUCTIONS — FIXED
 SALES_PROMPT = """
@@ -29,28 +70,108 @@ Rules:
 """
 
 
-def llm_sales_response(history: str, missing_field: str) -> str:
-    print("\n========== LLM CALL ==========")
-    print("Missing field:", missing_field)
-    print("History:\n", history)
-    print("==============================")
+# ----------------------------------------
+# SHARED CLIENT (one per process)
+# ----------------------------------------
+_client = None
+_client_lock = threading.Lock()
 
-    if Groq is None:
-        print("NO GROQ MODULE")
-        return None
 
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        print("NO API KEY FOUND")
-        return None
+def get_client():
+    """
+    Return the process-wide Groq client, creating it on first use.
+    The client keeps a pool of keep-alive connections and is safe to share
+    between threads and Streamlit sessions. Returns None if Groq is not
+    installed or GROQ_API_KEY is not set.
+    """
+    global _client
 
-    try:
-        client = Groq(api_key=api_key)
-    except Exception as e:
-        print("CLIENT ERROR:", e)
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None and Groq is not None:
+            api_key = os.getenv("GROQ_API_KEY")
+            if not api_key:
+                return None
+
+            timeout = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+            http_client = httpx.Client(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=POOL_SIZE,
+                    max_keepalive_connections=POOL_SIZE,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+            )
+            _client = Groq(
+                api_key=api_key,
+                base_url=os.getenv("GROQ_BASE_URL"),
+                timeout=timeout,
+                max_retries=MAX_RETRIES,
+                http_client=http_client,
+            )
+
+    return _client
+
+
+def configure_client(pool_size=None, connect_timeout=None, read_timeout=None):
+    """Change pool size / timeouts. The shared client is rebuilt on next use."""
+    global POOL_SIZE, CONNECT_TIMEOUT, READ_TIMEOUT
+
+    if pool_size is not None:
+        POOL_SIZE = pool_size
+    if connect_timeout is not None:
+        CONNECT_TIMEOUT = connect_timeout
+    if read_timeout is not None:
+        READ_TIMEOUT = read_timeout
+
+    close_client()
+
+
+def close_client():
+    """Close the shared client and its connection pool."""
+    global _client
+
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+
+
+# fallbacks that repeat on every turn until the deployment changes
+_SETUP_REASONS = frozenset({"no_module", "no_api_key"})
+_warned = set()
+
+
+def _fallback(missing_field: str, start: float, reason: str, error: Exception = None):
+    elapsed = time.perf_counter() - start
+    LLM_FALLBACKS.inc(field=missing_field, reason=reason)
+    LLM_SECONDS.observe(elapsed, field=missing_field, outcome="fallback")
+    if reason in _SETUP_REASONS:
+        # warn once per process; loan_llm_fallbacks_total still counts each
+        if reason in _warned:
+            return None
+        _warned.add(reason)
+    log.warning("llm_fallback", field=missing_field, reason=reason,
+                error=str(error) if error else None, ms=round(elapsed * 1000, 1))
+    return None
+
+
+def _cached(cache, history: str, missing_field: str, start: float) -> Optional[str]:
+    if not cache:
         return None
+    cached = cache.get(missing_field, history)
+    if cached is not None:
+        LLM_SECONDS.observe(time.perf_counter() - start, field=missing_field, outcome="cached")
+        log.debug("llm_cache_hit", field=missing_field)
+    return cached
+
 
-    prompt = f"""
+def _prompt(history: str, missing_field: str) -> str:
+    if log.enabled(DEBUG):
+        log.debug("llm_call", field=missing_field, history=history, history_lines=history.count("\n") + 1)
+    return f"""
 {SALES_PROMPT}
 
 Missing field: {missing_field}
@@ -61,16 +182,207 @@ Conversation:
 Respond with ONLY one friendly sentence.
 """
 
+
+def llm_sales_response(history: str, missing_field: str, cache=None, background: bool = False) -> str:
+    """
+    Ask the LLM for the next sales prompt.
+    Answers are cached on (missing_field, history fingerprint). `cache`
+    defaults to the process-wide cache shared by all sessions; pass a
+    PromptCache to keep a separate one, or False to skip caching.
+    `background` calls (prefetch) skip the interactive deadline and run
+    in the caller's thread, within the client's own timeouts.
+    """
+    if cache is None:
+        cache = get_shared_cache()
+
+    start = time.perf_counter()
+
+    def fallback(reason: str, error: Exception = None):
+        return _fallback(missing_field, start, reason, error)
+
+    cached = _cached(cache, history, missing_field, start)
+    if cached is not None:
+        return cached
+
+    prompt = _prompt(history, missing_field)
+
+    # replay: answer from the recorded cassette, no client or network
+    cassette = get_cassette()
+    if cassette is not None and cassette.mode == REPLAY:
+        entry = cassette.lookup(prompt, MODEL)
+        if entry is None:
+            return fallback("cassette_miss")
+        complete = lambda: cassette.replay(entry)
+
+    else:
+        if Groq is None:
+            return fallback("no_module")
+
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            return fallback("no_api_key")
+
+        try:
+            client = get_client()
+        except Exception as e:
+            return fallback("client_error", e)
+
+        def call():
+            res = client.chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "system", "content": prompt}],
+                max_tokens=25,
+            )
+            return res.choices[0].message.content.strip()
+
+        complete = call if cassette is None else lambda: cassette.record(prompt, MODEL, call)
+
     try:
-        res = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "system", "content": prompt}],
-            max_tokens=25,
-        )
-        text = res.choices[0].message.content.strip()
-        print("LLM RESPONSE:", text)
+        # bounded by the latency budget; None makes callers use the template
+        text = guard.run(complete) if background else guard.call(complete)
+        elapsed = time.perf_counter() - start
+        LLM_SECONDS.observe(elapsed, field=missing_field, outcome="ok")
+        log.info("llm_response", field=missing_field, chars=len(text), ms=round(elapsed * 1000, 1))
+
+        if cache:
+            cache.put(missing_field, history, text)
         return text
 
+    except DeadlineExceeded as e:
+        return fallback("deadline", e)
+    except CircuitOpen as e:
+        return fallback("circuit_open", e)
     except Exception as e:
-        print("LLM ERROR:", e)
-        return None
+        return fallback("error", e)
+
+
+def llm_sales_prefetch(history: str, missing_field: str) -> Optional[str]:
+    """llm_sales_response for PromptPrefetcher: off the critical path, so no deadline."""
+    return llm_sales_response(history, missing_field, background=True)
+
+
+def llm_sales_stream(history: str, missing_field: str, cache=None) -> Optional[Iterator[str]]:
+    """
+    Streaming llm_sales_response: an iterator over the prompt's text as the
+    provider sends it, or None when the caller should use the template.
+
+    Only the wait for the first token counts against the latency budget
+    (deadline, hedging and circuit breaker); the rest arrives within the
+    client's read timeout. Cached and replayed answers come as one chunk.
+    """
+    if cache is None:
+        cache = get_shared_cache()
+
+    start = time.perf_counter()
+
+    def fallback(reason: str, error: Exception = None):
+        return _fallback(missing_field, start, reason, error)
+
+    cached = _cached(cache, history, missing_field, start)
+    if cached is not None:
+        return iter((cached,))
+
+    prompt = _prompt(history, missing_field)
+
+    # replay: cassettes keep whole responses, so no token pacing
+    cassette = get_cassette()
+    if cassette is not None and cassette.mode == REPLAY:
+        entry = cassette.lookup(prompt, MODEL)
+        if entry is None:
+            return fallback("cassette_miss")
+        first_token = lambda: (cassette.replay(entry), iter(()), None)
+
+    else:
+        if Groq is None:
+            return fallback("no_module")
+
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            return fallback("no_api_key")
+
+        try:
+            client = get_client()
+        except Exception as e:
+            return fallback("client_error", e)
+
+        def first_token():
+            # open the stream and read up to the first piece of text
+            stream = client.chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "system", "content": prompt}],
+                max_tokens=25,
+                stream=True,
+            )
+            try:
+                chunks = iter(stream)
+                for chunk in chunks:
+                    text = _delta(chunk)
+                    if text:
+                        return text, chunks, stream.close
+            except BaseException:
+                stream.close()
+                raise
+            stream.close()
+            return "", chunks, None
+
+    try:
+        # a stream opened after the deadline (or by a losing hedge) is
+        # closed as soon as it arrives, returning its pooled connection
+        first, rest, close = guard.call(first_token, discard=_close_late)
+    except DeadlineExceeded as e:
+        return fallback("deadline", e)
+    except CircuitOpen as e:
+        return fallback("circuit_open", e)
+    except Exception as e:
+        return fallback("error", e)
+
+    if not first.strip():
+        if close:
+            close()
+        return fallback("empty")
+
+    LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start, field=missing_field)
+    recorder = cassette if cassette is not None and cassette.mode != REPLAY else None
+    return _relay(first, rest, close, missing_field, start, cache, history, prompt, recorder)
+
+
+def _close_late(result):
+    close = result[2]
+    if close:
+        close()
+
+
+def _delta(chunk) -> str:
+    return (chunk.choices[0].delta.content or "") if chunk.choices else ""
+
+
+def _relay(first: str, rest, close, missing_field: str, start: float,
+           cache, history: str, prompt: str, recorder) -> Iterator[str]:
+    parts = [first.lstrip()]
+    yield parts[0]
+
+    outcome = "ok"
+    try:
+        for chunk in rest:
+            text = _delta(chunk)
+            if text:
+                parts.append(text)
+                yield text
+    except Exception as e:
+        # the customer keeps what was already shown
+        outcome = "partial"
+        log.warning("llm_stream_error", field=missing_field, error=str(e), chars=len("".join(parts)))
+    finally:
+        if close:
+            close()
+
+    text = "".join(parts).strip()
+    elapsed = time.perf_counter() - start
+    LLM_SECONDS.observe(elapsed, field=missing_field, outcome=outcome)
+    log.info("llm_response", field=missing_field, chars=len(text), ms=round(elapsed * 1000, 1), stream=True)
+
+    if outcome == "ok":
+        if cache:
+            cache.put(missing_field, history, text)
+        if recorder is not None:
+            recorder.add(prompt, MODEL, text, elapsed)
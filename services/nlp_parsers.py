@@ -9,6 +9,65 @@ def normalize(text: str) -> str:
     return text.lower().replace(",", "").strip()
 
 
+# ----------------------------------------
+# AMOUNT GRAMMAR (compiled once)
+# ----------------------------------------
+MULTIPLIERS = {
+    "k": 1_000,
+    "thousand": 1_000,
+    "lakh": 100_000,
+    "lac": 100_000,
+    "lack": 100_000,  # common misspelling
+    "cr": 10_000_000,
+    "crore": 10_000_000,
+}
+
+# <number> [unit], where the unit must directly follow the number and end
+# on a word boundary ("2 lakhs", "50k", "3cr" — but not "5 kids").
+# Commas are stripped by normalize() first, so "₹1,00,000" is "₹100000".
+# A number is not the tail of another one. A leading dot is a decimal
+# point (".5 lakh" is 50000) unless it ends a word, so currency marks
+# ("₹", "rs.", "inr.", "rupees") are skipped like any other word:
+# "rs.2 lakh" is 2 lakh.
+_AMOUNT_RE = re.compile(
+    r"((?<![\w.])\.\d+|(?<!\d)(?<!\d\.)\d+(?:\.\d+)?)"
+    r"(?:\s*(k|thousands?|lakhs?|lacs?|lacks?|crores?|cr)\b)?"
+)
+
+# only whitespace / "and" may sit between parts of "1 crore 20 lakh"
+_JOINER_RE = re.compile(r"\s*(?:and\s*)?")
+
+
+# plurals resolve to the same multiplier
+_UNITS = dict(MULTIPLIERS, **{f"{word}s": mul for word, mul in MULTIPLIERS.items()})
+
+
+def _scaled(number: str, mul: int) -> int:
+    """number * mul in exact integer arithmetic ("2.3" * 1 crore is 23000000)."""
+    whole, _, frac = number.partition(".")
+    value = int(whole or 0) * mul
+    if frac:
+        value += int(frac) * mul // 10 ** len(frac)
+    return value
+
+
+def _compound(t: str, match) -> int:
+    """The amount at `match` plus any strictly smaller units after it ("1 crore 20 lakh")."""
+    mul = _UNITS[match.group(2)]
+    total = _scaled(match.group(1), mul)
+
+    pos = match.end()
+    while pos < len(t):
+        nxt = _AMOUNT_RE.match(t, _JOINER_RE.match(t, pos).end())
+        if nxt is None or nxt.group(2) is None or _UNITS[nxt.group(2)] >= mul:
+            break
+        mul = _UNITS[nxt.group(2)]
+        total += _scaled(nxt.group(1), mul)
+        pos = nxt.end()
+
+    return total
+
+
 # ----------------------------------------
 # CORE NUMERIC EXTRACTOR (big brains)
 # ----------------------------------------
@@ -19,58 +78,40 @@ def parse_indian_number(text: str):
     - 50k, 2k, 5K
     - 1 lakh, 1 lac, 2.5 lakh, 1 lack
     - 1 crore, 1 cr, 2.3cr
-    - ₹50000, 10000rs
+    - ₹50000, 10000rs, ₹1,00,000
     - "I want a loan of 2 lakhs"
+    - "1 crore 20 lakh", "2 lakh and 50 thousand"
     - decimal numbers
+    The first amount with a unit wins, together with the smaller units
+    after it; without one, the largest plain number ("5 kids and 20000").
     """
 
     if not text:
         return False, 0
 
     t = normalize(text)
+    if t.isdigit():
+        return True, int(t)
 
-    # direct numeric only
-    if t.replace(".", "").isdigit():
-        return True, int(float(t))
-
-    # remove ₹ and rs
-    t = t.replace("₹", "").replace("rs", "").replace("rupees", "")
-
-    # multipliers
-    multipliers = {
-        "k": 1_000,
-        "k.": 1_000,
-        "thousand": 1_000,
-        "thousands": 1_000,
-
-        "lakh": 100_000,
-        "lakhs": 100_000,
-        "lac": 100_000,
-        "lacs": 100_000,
-        "lack": 100_000,  # common misspelling
-
-        "cr": 10_000_000,
-        "crore": 10_000_000,
-        "crores": 10_000_000,
-    }
-
-    # Handle formats like "2.5 lakh", "10k", "3 cr"
-    for word, mul in multipliers.items():
-        if word in t:
-            nums = re.findall(r"[\d\.]+", t)
-            if nums:
-                try:
-                    value = float(nums[0]) * mul
-                    return True, int(value)
-                except:
-                    pass
-
-    # Fallback — any lone number
-    nums = re.findall(r"\d+", t)
-    if nums:
-        return True, int(nums[0])
-
-    return False, 0
+    match = _AMOUNT_RE.search(t)
+    if match is None:
+        return False, 0
+    if match.group(2) is not None:
+        return True, _compound(t, match)
+
+    # no unit yet: a later amount with one wins, else the largest number
+    best = int(float(match.group(1)))
+    for match in _AMOUNT_RE.finditer(t, match.end()):
+        number, unit = match.groups()
+        if unit is not None:
+            return True, _compound(t, match)
+        best = max(best, int(float(number)))
+    return True, best
+
+
+def parse_many(texts):
+    """Parse an iterable of texts; returns a list of (ok, value) pairs."""
+    return list(map(parse_indian_number, texts))
 
 
 # ----------------------------------------
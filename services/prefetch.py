@@ -0,0 +1,63 @@
+# services/prefetch.py
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+class PromptPrefetcher:
+    """
+    Generates the next sales prompt on a background thread while the
+    customer is still typing their answer.
+
+    One pending prefetch is kept per session object; `take()` hands back
+    the result only if it was for the requested field and has finished.
+    """
+
+    def __init__(self, llm: Callable[[str, str], Optional[str]], max_workers: int = 4):
+        self.llm = llm
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._pending = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.used = 0
+        self.not_ready = 0
+
+    def start(self, session, missing_field: str, history: str):
+        """Begin generating the prompt for `missing_field` for this session."""
+        future = self._executor.submit(self.llm, history, missing_field)
+        with self._lock:
+            old = self._pending.get(session)
+            self._pending[session] = (missing_field, future)
+        if old:
+            old[1].cancel()
+
+    def take(self, session, missing_field: str, wait: float = 0.0) -> tuple:
+        """
+        Returns (started, text).
+        started is False if no prefetch was running for this field, and the
+        caller should call the LLM itself. text is None if the prefetch
+        failed or wasn't done within `wait` seconds.
+        """
+        with self._lock:
+            entry = self._pending.pop(session, None)
+
+        if entry is None or entry[0] != missing_field:
+            if entry:
+                entry[1].cancel()
+            return False, None
+
+        future: Future = entry[1]
+        try:
+            text = future.result(timeout=wait) if wait else (future.result() if future.done() else None)
+        except Exception:
+            text = None
+
+        if text is None:
+            future.cancel()
+            self.not_ready += 1
+        else:
+            self.used += 1
+        return True, text
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
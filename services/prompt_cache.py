@@ -0,0 +1,162 @@
+# services/prompt_cache.py
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+_DIGITS = re.compile(r"\d+")
+_SPACES = re.compile(r"\s+")
+_WORDS = re.compile(r"[^\W_]+")
+
+
+# ----------------------------------------
+# HISTORY FINGERPRINT
+# ----------------------------------------
+def history_fingerprint(history: str) -> str:
+    """
+    Normalize a get_recent_history() string so near-identical conversations
+    share one key.
+    - bot lines are kept, lowercased, with numbers masked as '#'
+    - user lines keep only their shape ('number' or 'text'), so names and
+      amounts typed by different customers don't split the cache
+    """
+    parts = []
+    for line in (history or "").splitlines():
+        sender, _, msg = line.partition(":")
+        msg = _SPACES.sub(" ", msg.strip().lower())
+
+        if sender.strip() == "user":
+            parts.append("user:number" if _DIGITS.search(msg) else "user:text")
+        else:
+            parts.append(f"{sender.strip()}:{_DIGITS.sub('#', msg)}")
+
+    return "\n".join(parts)
+
+
+def is_personal(text: str, history: str) -> bool:
+    """
+    True if `text` repeats anything the customer typed (their name, an
+    amount) that the bot didn't say itself. Such a reply was written for
+    one customer and must not be served to others under the shared key.
+    """
+    user, bot = set(), set()
+    for line in (history or "").splitlines():
+        sender, _, msg = line.partition(":")
+        (user if sender.strip() == "user" else bot).update(_WORDS.findall(msg.lower()))
+
+    typed = user - bot
+    return any(word in typed for word in _WORDS.findall(text.lower()))
+
+
+# ----------------------------------------
+# LRU + TTL CACHE
+# ----------------------------------------
+class PromptCache:
+    """
+    Bounded LRU cache for generated sales prompts, with per-entry TTL.
+    Thread-safe, so one instance can be shared by every session.
+    """
+
+    def __init__(self, max_size: int = 256, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(missing_field: str, history: str) -> tuple:
+        return (missing_field, history_fingerprint(history))
+
+    @staticmethod
+    def personal_key(missing_field: str, history: str) -> tuple:
+        # the exact conversation: only the same customer asks for it again
+        return (missing_field, "personal", _SPACES.sub(" ", (history or "").strip().lower()))
+
+    def get(self, missing_field: str, history: str) -> Optional[str]:
+        keys = (self.make_key(missing_field, history), self.personal_key(missing_field, history))
+
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[1] < time.monotonic():
+                    del self._entries[key]
+                    continue
+
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, missing_field: str, history: str, text: str):
+        """
+        Store a reply. One that repeats what the customer typed (e.g. "Thanks,
+        Ravi!") is kept under the exact conversation, never the shared key.
+        """
+        if not text or self.max_size <= 0:
+            return
+
+        if is_personal(text, history):
+            key = self.personal_key(missing_field, history)
+        else:
+            key = self.make_key(missing_field, history)
+
+        with self._lock:
+            self._entries[key] = (text, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# ----------------------------------------
+# SHARED (PROCESS-WIDE) CACHE
+# ----------------------------------------
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache() -> Optional[PromptCache]:
+    """
+    Cache shared across all sessions in this process.
+    PROMPT_CACHE_SIZE=0 disables it (returns None).
+    """
+    global _shared_cache
+
+    size = int(os.getenv("PROMPT_CACHE_SIZE", "256"))
+    if size <= 0:
+        return None
+
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = PromptCache(size, float(os.getenv("PROMPT_CACHE_TTL", "3600")))
+
+    return _shared_cache
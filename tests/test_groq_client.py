@@ -0,0 +1,111 @@
+# tests/test_groq_client.py
+"""
+The shared Groq client against the local stand-in (services.groq_stub):
+connections are pooled and reused, and the connect/read timeouts apply.
+
+    python -m pytest tests/test_groq_client.py
+"""
+import socket
+import time
+
+import pytest
+
+pytest.importorskip("groq")
+
+from services import llm_sales_agent as llm
+from services.groq_stub import start_stub_server
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    servers = []
+
+    def start(**kwargs):
+        server, url = start_stub_server(seed=1, **kwargs)
+        servers.append(server)
+        monkeypatch.setenv("GROQ_API_KEY", "stub")
+        monkeypatch.setenv("GROQ_BASE_URL", url)
+        monkeypatch.delenv("LLM_CASSETTE", raising=False)
+        llm.close_client()
+        return server
+
+    yield start
+
+    llm.close_client()
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def no_retries(monkeypatch):
+    # a retry would double the time a timeout takes to surface
+    monkeypatch.setattr(llm, "MAX_RETRIES", 0)
+    yield
+    llm.configure_client(connect_timeout=2.0, read_timeout=10.0)
+
+
+def _complete(client):
+    return client.chat.completions.create(
+        model=llm.MODEL,
+        messages=[{"role": "system", "content": "Missing field: loan_amount"}],
+        max_tokens=25,
+    )
+
+
+def test_calls_share_one_connection(stub):
+    server = stub()
+
+    replies = [llm.llm_sales_response(f"bot: hello\nuser: {i}", "loan_amount", cache=False) for i in range(5)]
+
+    assert replies == ["What loan amount are you looking for?"] * 5
+    assert server.requests == 5
+    assert server.connections == 1
+
+
+def test_client_is_shared_between_calls(stub):
+    stub()
+
+    assert llm.get_client() is llm.get_client()
+
+
+def test_read_timeout(stub, no_retries):
+    stub(latency=1.0)
+    llm.configure_client(read_timeout=0.2)
+
+    start = time.perf_counter()
+    with pytest.raises(Exception) as exc:
+        _complete(llm.get_client())
+
+    assert "timed out" in str(exc.value).lower()
+    assert time.perf_counter() - start < 0.9
+
+
+def test_connect_timeout(stub, monkeypatch, no_retries):
+    stub()
+
+    # a listener that never accepts: once its backlog is full, new
+    # connection attempts get no answer and hang until the client gives up
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(0)
+    port = listener.getsockname()[1]
+    fillers = []
+    for _ in range(4):
+        s = socket.socket()
+        s.setblocking(False)
+        s.connect_ex(("127.0.0.1", port))
+        fillers.append(s)
+
+    monkeypatch.setenv("GROQ_BASE_URL", f"http://127.0.0.1:{port}")
+    llm.configure_client(connect_timeout=0.2)
+
+    start = time.perf_counter()
+    try:
+        with pytest.raises(Exception) as exc:
+            _complete(llm.get_client())
+    finally:
+        for s in fillers + [listener]:
+            s.close()
+
+    assert "timed out" in str(exc.value).lower()
+    assert time.perf_counter() - start < 1.5
@@ -0,0 +1,42 @@
+# tests/test_kyc_client.py
+"""
+services.kyc.JSONClient against a service that drops idle keep-alive
+connections: the next request goes out on a fresh connection instead of
+failing the check.
+
+    python -m pytest tests/test_kyc_client.py
+"""
+import asyncio
+import json
+
+from services.kyc import JSONClient
+
+
+async def _drop_after_one(reader, writer):
+    # one keep-alive response, then the service closes the connection
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+    body = json.dumps({"status": "verified"}).encode()
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                 b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+    await writer.drain()
+    await asyncio.sleep(0.02)
+    writer.close()
+
+
+def test_stale_keepalive_connection_is_replaced():
+    async def run():
+        server = await asyncio.start_server(_drop_after_one, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = JSONClient(f"http://127.0.0.1:{port}", pool_size=2, queue_timeout=1.0)
+        try:
+            replies = []
+            for _ in range(3):
+                replies.append(await client.post("/kyc/v1/status", {"pan": "ABCDE1234F"}, timeout=1.0))
+                await asyncio.sleep(0.05)
+            return replies
+        finally:
+            await client.aclose()
+            server.close()
+
+    assert asyncio.run(run()) == [{"status": "verified"}] * 3
@@ -0,0 +1,21 @@
+# tests/test_nlp_parsers.py
+"""
+parse_indian_number on the regression cases of benchmarks.bench_parsers
+(currency marks, leading-dot decimals, compound units).
+
+    python -m pytest tests/test_nlp_parsers.py
+"""
+import pytest
+
+from benchmarks.bench_parsers import EXPECTED
+from services.nlp_parsers import parse_indian_number
+
+
+@pytest.mark.parametrize("text, value", sorted(EXPECTED.items()))
+def test_expected_amounts(text, value):
+    assert parse_indian_number(text) == (True, value)
+
+
+def test_no_amount():
+    assert parse_indian_number("no idea") == (False, 0)
+    assert parse_indian_number("") == (False, 0)
@@ -0,0 +1,23 @@
+# tests/test_offers.py
+"""
+Counter-offer parsing (core.offers.parse_counter_offer).
+
+    python -m pytest tests/test_offers.py
+"""
+import pytest
+
+from core.offers import parse_counter_offer
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("what if 24 months?", {"tenure": 24}),
+    ("2 years", {"tenure": 24}),
+    ("1.5 years", {"tenure": 18}),
+    ("2.5 years", {"tenure": 30}),          # never "5 years"
+    ("2.5 months", {"tenure": 2.5}),        # not offered: re-asked
+    ("50000 for 24 months", {"tenure": 24, "amount": 50000}),
+    ("max with emi under 10k", {"emi_cap": 10000, "max": True}),
+    ("option 2", {}),
+])
+def test_parse_counter_offer(text, intent):
+    assert parse_counter_offer(text) == intent
@@ -0,0 +1,66 @@
+# tests/test_portfolio.py
+"""
+core.portfolio against the scalar path it vectorizes: the same decision,
+limits, approved amount and EMI as handle_initial_underwriting followed
+by a 'yes' in handle_negotiation, applicant for applicant.
+
+    python -m pytest tests/test_portfolio.py
+"""
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core import state as STATES
+from core.agents import handle_initial_underwriting, handle_negotiation
+from core.calculator import compute_hard_limit, compute_soft_limit
+from core.portfolio import DECISION_STATES, ELIGIBLE, COUNTER_OFFER, underwrite_portfolio
+
+
+def _scalar(income, requested):
+    data = {"income": income, "requested_amount": requested}
+    result = handle_initial_underwriting(data)
+    data.update(result["store"])
+    if result["next_state"] != STATES.SALES_NEGOTIATION:
+        return result["next_state"], data, None
+    accepted = handle_negotiation("yes", data)
+    return result["next_state"], data, accepted["store"]
+
+
+CASES = [
+    (10.7, 214.0),       # the limit is 214.0, not 200
+    (10.7, 200.5),
+    (10.7, 214.5),       # just over: counter offer
+    (10.7, 428.0),       # exactly 2x the limit
+    (10.7, 428.1),       # unreasonable
+    (2500.25, 50000.0),
+    (2500.25, 50005.0),
+    (2500.25, 50005.5),
+    (99999.99, 1234567.89),
+    (50000, 1000000),
+    (50000, 1000001),
+]
+
+
+@pytest.mark.parametrize("income, requested", CASES)
+def test_matches_scalar_underwriting(income, requested):
+    out = underwrite_portfolio([income], [requested])
+    state, data, accepted = _scalar(income, requested)
+
+    decision = int(out["decision"][0])
+    assert DECISION_STATES[decision] == state
+    assert out["hard_limit"][0] == compute_hard_limit(income)
+    assert out["soft_limit"][0] == compute_soft_limit(income)
+
+    if decision in (ELIGIBLE, COUNTER_OFFER):
+        assert (decision == COUNTER_OFFER) == ("suggested_amount" in data)
+        assert out["approved_amount"][0] == accepted["approved_amount"]
+        assert math.isclose(out["emi"][0], accepted["emi"], abs_tol=0.01)
+    else:
+        assert math.isnan(out["emi"][0])
+
+
+def test_missing_values():
+    out = underwrite_portfolio([float("nan"), 10.0], [100.0, float("nan")])
+    assert list(out["decision"]) == [0, 0]